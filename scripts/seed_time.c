@@ -0,0 +1,31 @@
+/*
+ * LD_PRELOAD shim that makes the game's seed selectable.
+ *
+ * engine.c seeds with srand(time(NULL)), so every game started in the
+ * same second plays the same tiles (and, with -i, the same AI moves).
+ * With GAME_SEED set, time() returns that value instead; otherwise the
+ * real time() is used.
+ *
+ *   make seed-shim
+ *   GAME_SEED=42 LD_PRELOAD=./libseedtime.so ./2048 -i
+ */
+#define _GNU_SOURCE
+#include <dlfcn.h>
+#include <stdlib.h>
+#include <time.h>
+
+time_t time(time_t *tloc)
+{
+    const char *seed = getenv("GAME_SEED");
+    time_t value;
+
+    if (seed) {
+        value = (time_t) strtoll(seed, NULL, 10);
+    } else {
+        time_t (*real_time)(time_t *) = (time_t (*)(time_t *)) dlsym(RTLD_NEXT, "time");
+        value = real_time(NULL);
+    }
+    if (tloc)
+        *tloc = value;
+    return value;
+}
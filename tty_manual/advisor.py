@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Move Advisor for 2048 - Background expectimax while an inspection is open
+
+When ManualTestRunner stops for an inspection the CPU has nothing to do
+until the operator answers. The advisor uses that time: it searches every
+legal direction in worker processes, deepening one ply at a time, and
+reports each improved recommendation as it arrives.
+
+The search is expectimax over bitboard keys: a player node takes the best
+direction, a chance node averages over every spawn (2 at 3/4, 4 at 1/4,
+uniform over empty cells). Leaves are scored by a per-row heuristic
+table (empty cells, merges, monotonicity, tile sum). Unlikely branches
+(path probability below PROBABILITY_CUTOFF) are cut off. Each worker
+keeps its transposition table between tasks, so deeper passes reuse the
+shallower ones.
+
+Each finished direction also returns the best move for every board its
+spawn can produce. The advisor keeps these, so right after the operator's
+manual move lookup() has a recommendation for the board the engine drew,
+and a search started on one of those boards deepens from the known depth
+instead of depth 1. The cache only covers boards one move and one spawn
+past a searched board: the next inspection, check_interval spam moves
+later, almost never lands on one.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import click
+
+from .bitboard import legal_moves, move_key, spawn_outcomes, transpose
+from .board_io import pack_board, parse_board_text
+from .simulator import MOVES
+
+PROBABILITY_CUTOFF = 1e-4
+DEFAULT_MAX_DEPTH = 6
+KNOWN_LIMIT = 100000  # Boards kept in the advisor's subtree cache
+
+# Heuristic weights for one row or column of exponents; a lost board scores 0
+LOST_PENALTY = 200000.0  # Base score per line, so any live board beats a lost one
+EMPTY_WEIGHT = 270.0
+MERGES_WEIGHT = 700.0
+MONOTONICITY_POWER = 4
+MONOTONICITY_WEIGHT = 47.0
+SUM_POWER = 3.5
+SUM_WEIGHT = 11.0
+
+_ROW_SCORE: Optional[List[float]] = None
+_TABLE: Dict[Tuple[int, int], float] = {}  # Worker-local: (chance key, depth) -> value
+_TABLE_LIMIT = 2000000
+
+
+def _row_score(code: int) -> float:
+    cells = [(code >> (4 * i)) & 0xF for i in range(4)]
+    empty = cells.count(0)
+    merges, previous, run = 0, 0, 0
+    for cell in cells:
+        if not cell:
+            continue
+        if cell == previous:
+            run += 1
+        elif run:
+            merges += 1 + run
+            run = 0
+        previous = cell
+    if run:
+        merges += 1 + run
+    left = right = 0.0
+    for a, b in zip(cells, cells[1:]):
+        if a > b:
+            left += a ** MONOTONICITY_POWER - b ** MONOTONICITY_POWER
+        else:
+            right += b ** MONOTONICITY_POWER - a ** MONOTONICITY_POWER
+    total = sum(cell ** SUM_POWER for cell in cells)
+    return (LOST_PENALTY + EMPTY_WEIGHT * empty + MERGES_WEIGHT * merges
+            - MONOTONICITY_WEIGHT * min(left, right) - SUM_WEIGHT * total)
+
+
+def evaluate(key: int) -> float:
+    """Heuristic value of a board: the row table summed over rows and columns"""
+    global _ROW_SCORE
+    if _ROW_SCORE is None:
+        _ROW_SCORE = [_row_score(code) for code in range(65536)]
+    table = _ROW_SCORE
+    columns = transpose(key)
+    return (table[key & 0xFFFF] + table[(key >> 16) & 0xFFFF] + table[(key >> 32) & 0xFFFF]
+            + table[(key >> 48) & 0xFFFF] + table[columns & 0xFFFF] + table[(columns >> 16) & 0xFFFF]
+            + table[(columns >> 32) & 0xFFFF] + table[(columns >> 48) & 0xFFFF])
+
+
+def _best_move(key: int, depth: int, probability: float) -> Tuple[float, Optional[int]]:
+    """Player node: (value, direction) of the best move, (0, None) if none is legal"""
+    best, best_direction = 0.0, None
+    for direction, moved in legal_moves(key):
+        value = _expected(moved, depth - 1, probability)
+        if best_direction is None or value > best:
+            best, best_direction = value, direction
+    return best, best_direction
+
+
+def _expected(key: int, depth: int, probability: float) -> float:
+    """Chance node: value of a moved board averaged over every spawn"""
+    if depth <= 0 or probability < PROBABILITY_CUTOFF:
+        return evaluate(key)
+    cached = _TABLE.get((key, depth))
+    if cached is not None:
+        return cached
+    value = sum(p * _best_move(spawned, depth, probability * p)[0]
+                for spawned, p in spawn_outcomes(key))
+    if len(_TABLE) >= _TABLE_LIMIT:
+        _TABLE.clear()
+    _TABLE[(key, depth)] = value
+    return value
+
+
+def search_direction(key: int, direction: int, depth: int) -> Dict:
+    """Expectimax value of one root move searched `depth` moves deep
+
+    Also returns, for every board the move's spawn can produce, the best
+    direction and value `depth - 1` moves deep ('children').
+    """
+    start = time.perf_counter()
+    moved = move_key(key, direction)
+    children = {}
+    if depth <= 1:
+        value = evaluate(moved)
+    else:
+        value = 0.0
+        for spawned, p in spawn_outcomes(moved):
+            child_value, child_direction = _best_move(spawned, depth - 1, p)
+            children[spawned] = (child_value, child_direction)
+            value += p * child_value
+    return {'direction': direction, 'depth': depth, 'value': value, 'children': children,
+            'time_s': time.perf_counter() - start}
+
+
+class Advisor:
+    """Searches a board in background processes and streams recommendations
+
+    start() returns at once; on_update(recommendation) is called from a
+    background thread every time the recommended move or the searched
+    depth improves. stop() abandons the search (work already running
+    finishes in its worker and is discarded).
+    """
+
+    def __init__(self, max_depth: int = DEFAULT_MAX_DEPTH, workers: int = 0):
+        self.max_depth = max_depth
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending: List[Future] = []
+        self._known: Dict[int, Tuple[int, float, Optional[int]]] = {}  # key -> (depth, value, direction)
+        self.results: Dict[int, Dict[int, float]] = {}  # direction -> depth -> value
+        self.directions: List[int] = []  # Legal directions of the board being searched
+        self.reused: Optional[Tuple[int, float, Optional[int]]] = None
+        self.on_update: Optional[Callable[[Dict], None]] = None
+        self._reported = None
+
+    def start(self, board, on_update: Optional[Callable[[Dict], None]] = None) -> bool:
+        """Begin searching a 4x4 board; returns False if the board cannot be searched"""
+        try:
+            key = pack_board(board)
+        except ValueError:
+            return False
+        self.stop()
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self.key = key
+            self.started = time.perf_counter()
+            self.on_update = on_update
+            self.results = {}
+            self._reported = None
+            self.reused = self._known.get(key)
+            # Deepen from what an earlier search already knows about this board
+            first_depth = min(self.max_depth, self.reused[0] + 1) if self.reused else 1
+            self.directions = [direction for direction, _ in legal_moves(key)]
+            for direction in self.directions:
+                self._submit(generation, direction, first_depth)
+        if self.reused:
+            self._report()
+        return True
+
+    def _submit(self, generation: int, direction: int, depth: int) -> None:
+        future = self._pool.submit(search_direction, self.key, direction, depth)
+        future.add_done_callback(lambda f: self._finished(generation, f))
+        self._pending.append(future)
+
+    def _finished(self, generation: int, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        with self._lock:
+            if generation != self._generation:
+                return
+            depth = result['depth']
+            self.results.setdefault(result['direction'], {})[depth] = result['value']
+            for child, (value, direction) in result['children'].items():
+                known = self._known.get(child)
+                if known is None or known[0] < depth - 1:
+                    self._known[child] = (depth - 1, value, direction)
+            if len(self._known) > KNOWN_LIMIT:
+                self._known.clear()
+            if depth < self.max_depth:
+                self._submit(generation, result['direction'], depth + 1)
+        self._report()
+
+    def lookup(self, board) -> Optional[Dict]:
+        """Cached recommendation for a board an earlier search reached, without searching"""
+        try:
+            key = pack_board(board)
+        except ValueError:
+            return None
+        with self._lock:
+            known = self._known.get(key)
+        if known is None or known[2] is None:
+            return None
+        return {'move': MOVES[known[2]], 'depth': known[0], 'values': {}, 'reused': True, 'elapsed_s': 0.0}
+
+    def recommendation(self) -> Optional[Dict]:
+        """Best move at the deepest depth every searched direction has reached"""
+        with self._lock:
+            if len(self.results) < len(self.directions):
+                if self.reused and self.reused[2] is not None:
+                    return {'move': MOVES[self.reused[2]], 'depth': self.reused[0], 'values': {},
+                            'reused': True, 'elapsed_s': time.perf_counter() - self.started}
+                return None
+            # Compare directions at the same depth only
+            depth = min(max(values) for values in self.results.values())
+            values = {MOVES[d]: by_depth[depth] for d, by_depth in self.results.items()}
+            return {'move': max(values, key=values.get), 'depth': depth, 'values': values,
+                    'reused': False, 'elapsed_s': time.perf_counter() - self.started}
+
+    def _report(self) -> None:
+        recommendation = self.recommendation()
+        if recommendation is None or self.on_update is None:
+            return
+        state = (recommendation['move'], recommendation['depth'])
+        if state != self._reported:
+            self._reported = state
+            self.on_update(recommendation)
+
+    def stop(self) -> None:
+        """Abandon the current search"""
+        with self._lock:
+            self._generation += 1
+            pending, self._pending = self._pending, []
+            self.on_update = None
+        for future in pending:
+            future.cancel()
+
+    def close(self) -> None:
+        self.stop()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def format_recommendation(recommendation: Dict) -> str:
+    """One line for the inspection prompt"""
+    if recommendation['reused']:
+        return (f"  advisor: {recommendation['move']} (depth {recommendation['depth']}, "
+                f"from an earlier search)")
+    values = ' '.join(f"{move}={value:,.0f}" for move, value in sorted(
+        recommendation['values'].items(), key=lambda item: -item[1]))
+    return (f"  advisor: {recommendation['move']} (depth {recommendation['depth']}, "
+            f"{recommendation['elapsed_s']:.1f}s)  {values}")
+
+
+@click.command()
+@click.argument('board_file', type=click.Path(exists=True))
+@click.option('--max-depth', default=DEFAULT_MAX_DEPTH, help='Deepest search (moves)')
+@click.option('--seconds', default=10.0, help='Time to let the search run')
+@click.option('--workers', '-w', default=0, help='Worker processes (0 = up to 4, one per CPU)')
+def main(board_file, max_depth, seconds, workers):
+    """Stream move recommendations for a board snapshot"""
+    with open(board_file) as f:
+        board = parse_board_text(f.read())
+    if board is None:
+        raise click.ClickException(f"no board found in {board_file}")
+    advisor = Advisor(max_depth, workers)
+    done = threading.Event()
+
+    def show(recommendation):
+        click.echo(format_recommendation(recommendation))
+        if recommendation['depth'] >= max_depth:
+            done.set()
+
+    try:
+        if not advisor.start(board, show):
+            raise click.ClickException("only 4x4 boards can be searched")
+        done.wait(seconds)
+    finally:
+        advisor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Async TTY Reader for 2048 - Many real games on one asyncio event loop
+
+Each game's pty master is registered with loop.add_reader(), so output is
+parsed as it arrives and no game ever sleeps or blocks in select(). Frame
+and move APIs are awaitable; run_games() plays any number of games with a
+bounded number running at once.
+
+Back-pressure is per game: a game has at most one unacknowledged move
+(the next key is written only once its frame is parsed), and finished
+results go through a bounded queue, so a slow consumer pauses the games
+instead of letting results pile up.
+"""
+
+import asyncio
+import csv
+import os
+import random
+import time
+from typing import AsyncIterator, Callable, Dict, Optional
+import click
+
+from .tty_reader import TTYReader, ANIMATION_SETTLE, SCREEN_QUIET
+from .simulator import MOVES, SPAM_WEIGHTS
+from .bitboard import move_key
+from .board_io import pack_board
+
+RESULT_FIELDS = ['game', 'score', 'moves', 'max_tile', 'timeouts', 'time_s', 'mean_latency_ms']
+
+
+class AsyncTTYReader(TTYReader):
+    """TTYReader whose pty is read by the event loop instead of select()"""
+
+    def __init__(self, game_binary="2048-cli-0.9.1/2048", game_args=(), screen=False):
+        super().__init__(game_binary, game_args, screen)
+        self.loop = None
+        self.exited = False
+        self.final_score = None
+        self.frames = 0
+        self._since = None
+        self._waiter = None
+        self._frame_time = None
+        self._settle = 0.0
+        self._settle_handle = None
+        self._lock = asyncio.Lock()  # One unacknowledged move per game
+
+    async def start(self):
+        """Launch the game and wait for its first frame"""
+        self.loop = asyncio.get_running_loop()
+        self._spawn()
+        self.loop.add_reader(self.master_fd, self._on_readable)
+        return await self.wait_for_frame(timeout=5.0, since=0)
+
+    def _on_readable(self):
+        try:
+            count = self.read_chunk()
+        except BlockingIOError:
+            return
+        except OSError:
+            count = 0  # EIO: the game closed its side of the pty
+        if not count:
+            self._on_exit()
+            return
+
+        if self._waiter is None or self._waiter.done():
+            return
+        if self._frame_time is None and self._frame_arrived(self._since):
+            self._frame_time = time.perf_counter()
+        if self._frame_time is not None:
+            # Resolve once output has been quiet for the settle period
+            if self._settle_handle:
+                self._settle_handle.cancel()
+                self._frame_time = time.perf_counter()
+            self._settle_handle = self.loop.call_later(self._settle, self._resolve)
+
+    def _resolve(self):
+        self._settle_handle = None
+        if self._waiter is not None and not self._waiter.done():
+            if self._frame_time is not None:
+                self.parse_board_state()
+                self.frames += 1
+            self._waiter.set_result(self._frame_time)
+
+    def _on_exit(self):
+        if self.exited:
+            return
+        self.exited = True
+        self.loop.remove_reader(self.master_fd)
+        self.final_score = self.exit_score()
+        if self._settle_handle:
+            self._settle_handle.cancel()
+        self._resolve()
+
+    async def wait_for_frame(self, timeout=1.0, settle=0.0, since=None):
+        """Await a complete frame after stream position `since` (see TTYReader.wait_for_frame)"""
+        if self.exited:
+            return None
+        self._since = self.stream_position() if since is None else since
+        self._settle = max(settle, SCREEN_QUIET) if self.screen else settle
+        self._frame_time = None
+        self._waiter = self.loop.create_future()
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._waiter), timeout)
+        except asyncio.TimeoutError:
+            if self._settle_handle:
+                self._settle_handle.cancel()
+            self._resolve()  # Keep a frame that was still settling
+            return self._waiter.result()
+        finally:
+            self._waiter = None
+
+    async def send_move_and_wait(self, move, timeout=1.0, settle=0.0):
+        """Write a move and await its frame; returns the latency or None"""
+        async with self._lock:
+            if self.exited:
+                return None
+            if self.screen:
+                self.parse_board_state()  # Consume redraws so the next frame is a new one
+            since = self.stream_position()
+            try:
+                if not self.send_move(move):
+                    return None
+            except OSError:
+                return None
+            start = time.perf_counter()
+
+            frame_time = await self.wait_for_frame(timeout, settle, since)
+            if frame_time is None:
+                if not self.exited:
+                    self.move_timeouts += 1
+                return None
+            latency = frame_time - start
+            self.move_latencies.append(latency)
+            return latency
+
+    async def close(self):
+        """Stop the game and reap it without blocking the loop"""
+        if self.master_fd is not None and not self.exited:
+            self.exited = True
+            self.loop.remove_reader(self.master_fd)
+        if self.master_fd is not None:
+            os.close(self.master_fd)
+            self.master_fd = None
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+        if self.process:
+            await self.loop.run_in_executor(None, self.process.wait)
+
+
+def is_noop(board, move: str) -> bool:
+    """Whether the engine would ignore this key (4x4 boards only; others are never skipped)"""
+    if not board or len(board) != 4 or any(len(row) != 4 for row in board):
+        return False
+    key = pack_board(board)
+    return move_key(key, MOVES.index(move)) == key
+
+
+def spam_policy(board, rng: random.Random) -> str:
+    """The ManualTestRunner spam distribution (40% s, 30% d, 20% a, 10% w)"""
+    return rng.choices(list(SPAM_WEIGHTS), weights=list(SPAM_WEIGHTS.values()))[0]
+
+
+async def play_game(game_id: int, policy: Callable = spam_policy, max_moves: int = 5000,
+                    game_binary="2048-cli-0.9.1/2048", game_args=(), screen=False,
+                    settle: float = 0.0, move_timeout: float = 1.0,
+                    seed: Optional[int] = None, policy_factory: Optional[Callable] = None) -> Dict:
+    """Play one game to the end (or max_moves) and summarize it
+
+    policy_factory, if given, makes a fresh policy for this game (e.g. a
+    move script's). Keys the engine would ignore are counted as moves but
+    not sent; a policy returning None ends the game early.
+    """
+    if policy_factory is not None:
+        policy = policy_factory()
+    rng = random.Random(seed)
+    reader = AsyncTTYReader(game_binary, game_args, screen)
+    start = time.perf_counter()
+    try:
+        if await reader.start() is None:
+            raise RuntimeError(f"game {game_id}: no initial frame")
+        moves = 0
+        while moves < max_moves and not reader.exited:
+            move = policy(reader.current_board, rng)
+            if move is None:
+                break
+            moves += 1
+            # A key that changes nothing draws nothing with -A; don't wait on it
+            if not is_noop(reader.current_board, move):
+                await reader.send_move_and_wait(move, move_timeout, settle)
+    finally:
+        await reader.close()
+
+    stats = reader.latency_stats()
+    board = reader.current_board or [[0]]
+    return {
+        'game': game_id,
+        'score': reader.final_score if reader.final_score is not None else reader.current_score,
+        'moves': moves,
+        'max_tile': max(max(row) for row in board),
+        'timeouts': stats['timeouts'],
+        'time_s': round(time.perf_counter() - start, 3),
+        'mean_latency_ms': round(stats.get('mean_ms', 0.0), 3),
+    }
+
+
+async def run_games(n_games: int, concurrency: int = 64, queue_size: int = 0,
+                    **game_options) -> AsyncIterator[Dict]:
+    """Play n_games with at most `concurrency` running; yields results as they finish
+
+    Results are handed over through a queue of `queue_size` entries
+    (default: concurrency), so games wait while the consumer is busy.
+    """
+    queue = asyncio.Queue(maxsize=queue_size or concurrency)
+    slots = asyncio.Semaphore(concurrency)
+    seed = game_options.pop('seed', None)
+
+    async def worker(game_id: int):
+        async with slots:
+            try:
+                result = await play_game(game_id, seed=None if seed is None else seed + game_id,
+                                         **game_options)
+            except Exception as e:
+                result = {'game': game_id, 'error': str(e)}
+            await queue.put(result)
+
+    tasks = [asyncio.create_task(worker(i)) for i in range(n_games)]
+    try:
+        for _ in range(n_games):
+            yield await queue.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@click.command()
+@click.option('--games', '-g', default=100, help='Number of games to play')
+@click.option('--concurrency', '-c', default=64, help='Games running at once')
+@click.option('--max-moves', default=5000, help='Move cap per game')
+@click.option('--game-binary', default='2048-cli-0.9.1/2048', help='Path to 2048 binary')
+@click.option('--game-args', default='-A', help="Game options ('-A' disables animation)")
+@click.option('--screen', is_flag=True, help='Read boards through the terminal emulator')
+@click.option('--settle', default=None, type=float,
+              help=f'Quiet time (s) that ends a move (default 0 with -A, else {ANIMATION_SETTLE})')
+@click.option('--seed', default=None, type=int, help='Seed for the move policy')
+@click.option('--output', '-o', type=click.Path(), help='Write per-game results as CSV')
+def main(games, concurrency, max_moves, game_binary, game_args, screen, settle, seed, output):
+    """Play many real 2048 games concurrently on one event loop"""
+    import shlex
+
+    args = shlex.split(game_args)
+    if settle is None:
+        settle = 0.0 if '-A' in args else ANIMATION_SETTLE
+
+    async def run():
+        out = open(output, 'w', newline='') if output else None
+        writer = csv.DictWriter(out, RESULT_FIELDS + ['error'], extrasaction='ignore') if out else None
+        if writer:
+            writer.writeheader()
+        results = []
+        async for result in run_games(games, concurrency, game_binary=game_binary, game_args=args,
+                                      screen=screen, settle=settle, max_moves=max_moves, seed=seed):
+            results.append(result)
+            if writer:
+                writer.writerow(result)
+            click.echo('.' if 'error' not in result else 'E', nl=False, err=True)
+        if out:
+            out.close()
+        return results
+
+    cpu_start, wall_start = os.times(), time.perf_counter()
+    results = asyncio.run(run())
+    wall = time.perf_counter() - wall_start
+    cpu_end = os.times()
+    cpu = sum(cpu_end[:4]) - sum(cpu_start[:4])
+
+    played = [r for r in results if 'error' not in r]
+    moves = sum(r['moves'] for r in played)
+    click.echo("", err=True)
+    click.echo(f"Played {len(played)}/{games} games, {moves} moves in {wall:.1f}s "
+               f"({len(played) / wall:.1f} games/s, {moves / wall:.0f} moves/s)")
+    click.echo(f"CPU: {cpu:.1f}s across Python and games ({cpu / wall:.1f} cores busy of {os.cpu_count()})")
+    if played:
+        scores = sorted(r['score'] for r in played)
+        click.echo(f"Score: mean {sum(scores) / len(scores):.1f}, median {scores[len(scores) // 2]}, "
+                   f"max {scores[-1]}")
+    for r in results:
+        if 'error' in r:
+            click.echo(f"Game {r['game']}: {r['error']}", err=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Bitboard helpers for 2048 - Scalar engine operations on packed 64-bit keys
+
+Keys use the board_io.pack_board layout: cell (row, col) holds its tile
+exponent in bits 4 * (4 * row + col). Moves go through the same row table
+as the batch simulator, so both agree with engine.c.
+"""
+
+from typing import Iterator, List, Tuple
+
+from .simulator import ROW_LEFT, WIN_EXPONENT, SPAWN_FOUR_PROBABILITY, UP, LEFT, DOWN, RIGHT
+
+
+def _reverse_row(code: int) -> int:
+    return (((code & 0xF) << 12) | ((code & 0xF0) << 4) |
+            ((code >> 4) & 0xF0) | ((code >> 12) & 0xF))
+
+
+_LEFT = [int(v) for v in ROW_LEFT]
+_RIGHT = [_reverse_row(_LEFT[_reverse_row(code)]) for code in range(65536)]
+# Row code spread into a column: nibble i moves to bit 16 * i
+_SPREAD = [sum(((code >> (4 * i)) & 0xF) << (16 * i) for i in range(4)) for code in range(65536)]
+_REVERSE = [_reverse_row(code) for code in range(65536)]
+
+COLUMN_MASK = 0x000F000F000F000F
+
+
+def _column(key: int, col: int) -> int:
+    x = (key >> (4 * col)) & COLUMN_MASK
+    return (x | (x >> 12) | (x >> 24) | (x >> 36)) & 0xFFFF
+
+
+def move_key(key: int, direction: int) -> int:
+    """Slide and merge a packed board (no spawn); returns the new key"""
+    result = 0
+    if direction == LEFT or direction == RIGHT:
+        table = _LEFT if direction == LEFT else _RIGHT
+        for row in range(4):
+            shift = 16 * row
+            result |= table[(key >> shift) & 0xFFFF] << shift
+    elif direction == UP or direction == DOWN:
+        table = _LEFT if direction == UP else _RIGHT
+        for col in range(4):
+            result |= _SPREAD[table[_column(key, col)]] << (4 * col)
+    else:
+        raise ValueError(f"invalid direction: {direction}")
+    return result
+
+
+def legal_moves(key: int) -> Iterator[Tuple[int, int]]:
+    """(direction, new_key) for every move that changes the board"""
+    for direction in (UP, LEFT, DOWN, RIGHT):
+        new_key = move_key(key, direction)
+        if new_key != key:
+            yield direction, new_key
+
+
+def empty_cells(key: int) -> List[int]:
+    return [i for i in range(16) if not (key >> (4 * i)) & 0xF]
+
+
+def spawn_outcomes(key: int) -> Iterator[Tuple[int, float]]:
+    """Every (key, probability) the engine's gamestate_new_block() can produce"""
+    empty = empty_cells(key)
+    if not empty:
+        return
+    p_two = (1 - SPAWN_FOUR_PROBABILITY) / len(empty)
+    p_four = SPAWN_FOUR_PROBABILITY / len(empty)
+    for i in empty:
+        yield key | (1 << (4 * i)), p_two
+        yield key | (2 << (4 * i)), p_four
+
+
+def is_won(key: int) -> bool:
+    return any((key >> (4 * i)) & 0xF >= WIN_EXPONENT for i in range(16))
+
+
+def can_move(key: int) -> bool:
+    return next(legal_moves(key), None) is not None
+
+
+def mirror(key: int) -> int:
+    """Reflect left-right"""
+    return sum(_REVERSE[(key >> (16 * row)) & 0xFFFF] << (16 * row) for row in range(4))
+
+
+def flip(key: int) -> int:
+    """Reflect top-bottom"""
+    return sum(((key >> (16 * row)) & 0xFFFF) << (16 * (3 - row)) for row in range(4))
+
+
+def transpose(key: int) -> int:
+    return sum(_column(key, col) << (16 * col) for col in range(4))
+
+
+def canonical_key(key: int) -> int:
+    """Smallest key among the 8 rotations/reflections of the board"""
+    t = transpose(key)
+    candidates = (key, mirror(key), flip(key), mirror(flip(key)),
+                  t, mirror(t), flip(t), mirror(flip(t)))
+    return min(candidates)
@@ -8,13 +8,22 @@ import numpy as np
 from typing import List, Dict, Tuple
 import click
 
+from .bitboard import canonical_key, empty_cells, is_won, legal_moves, spawn_outcomes
+from .board_io import pack_board, parse_board_text
+from .simulator import SPAWN_FOUR_PROBABILITY, WIN_EXPONENT, UP, LEFT, DOWN, RIGHT
+
+# Memo for game_over_probability(), keyed by (canonical key, horizon)
+_RISK_CACHE: Dict[Tuple[int, int], float] = {}
+_RISK_CACHE_LIMIT = 500000
+
 
 class BoardAnalyzer:
     """Analyzes 2048 board state for complexity and strategy decisions"""
     
-    def __init__(self, board: List[List[int]]):
+    def __init__(self, board: List[List[int]], model=None):
         self.board = np.array(board)
         self.rows, self.cols = self.board.shape
+        self.model = model  # Optional ComplexityModel replacing the fixed weights
         
     def get_empty_cells(self) -> int:
         """Count empty cells on the board"""
@@ -38,65 +47,15 @@ class BoardAnalyzer:
     
     def get_monotonicity_score(self) -> float:
         """Calculate how well-ordered the board is (higher is better)"""
-        score = 0.0
-        
-        # Check rows
-        for row in self.board:
-            # Left to right
-            left_right = all(row[i] <= row[i+1] for i in range(len(row)-1) if row[i] != 0 or row[i+1] != 0)
-            # Right to left
-            right_left = all(row[i] >= row[i+1] for i in range(len(row)-1) if row[i] != 0 or row[i+1] != 0)
-            if left_right or right_left:
-                score += 1.0
-                
-        # Check columns
-        for col in range(self.cols):
-            column = self.board[:, col]
-            # Top to bottom
-            top_bottom = all(column[i] <= column[i+1] for i in range(len(column)-1) if column[i] != 0 or column[i+1] != 0)
-            # Bottom to top
-            bottom_top = all(column[i] >= column[i+1] for i in range(len(column)-1) if column[i] != 0 or column[i+1] != 0)
-            if top_bottom or bottom_top:
-                score += 1.0
-                
-        return score / (self.rows + self.cols)  # Normalize to 0-1
+        return float(monotonicity_kernel(self.board[None])[0])
     
     def get_merge_opportunities(self) -> int:
         """Count how many adjacent tiles can be merged"""
-        merges = 0
-        
-        # Check horizontal merges
-        for i in range(self.rows):
-            for j in range(self.cols - 1):
-                if self.board[i][j] != 0 and self.board[i][j] == self.board[i][j+1]:
-                    merges += 1
-                    
-        # Check vertical merges
-        for i in range(self.rows - 1):
-            for j in range(self.cols):
-                if self.board[i][j] != 0 and self.board[i][j] == self.board[i+1][j]:
-                    merges += 1
-                    
-        return merges
+        return int(merge_kernel(self.board[None])[0])
     
     def get_scattered_score(self) -> float:
         """Calculate how scattered high-value tiles are (lower is better)"""
-        # Find all tiles >= 64
-        high_tiles = np.argwhere(self.board >= 64)
-        if len(high_tiles) <= 1:
-            return 0.0
-            
-        # Calculate average Manhattan distance between high tiles
-        total_distance = 0
-        count = 0
-        
-        for i in range(len(high_tiles)):
-            for j in range(i + 1, len(high_tiles)):
-                dist = abs(high_tiles[i][0] - high_tiles[j][0]) + abs(high_tiles[i][1] - high_tiles[j][1])
-                total_distance += dist
-                count += 1
-                
-        return total_distance / count if count > 0 else 0.0
+        return float(scattered_kernel(self.board[None])[0])
     
     def get_complexity_score(self) -> Dict[str, float]:
         """Calculate overall board complexity (0-100, higher = more complex)"""
@@ -107,36 +66,40 @@ class BoardAnalyzer:
         merges = self.get_merge_opportunities()
         scattered = self.get_scattered_score()
         
-        # Calculate complexity factors
-        empty_factor = max(0, 1 - (empty_cells / 4))  # Less empty = more complex
-        corner_factor = 0 if max_in_corner else 0.5   # Max not in corner = more complex
-        monotonicity_factor = 1 - monotonicity         # Less ordered = more complex
-        merge_factor = max(0, 1 - (merges / 4))       # Fewer merges = more complex
-        scattered_factor = min(1, scattered / 6)       # More scattered = more complex
-        
-        # Weighted complexity score
-        complexity = (
-            empty_factor * 30 +
-            corner_factor * 20 +
-            monotonicity_factor * 20 +
-            merge_factor * 20 +
-            scattered_factor * 10
-        )
+        # Calculate complexity factors (normalized to board area)
+        factors = complexity_factors(empty_cells, max_in_corner, monotonicity, merges, scattered,
+                                     self.rows, self.cols)
         
-        return {
-            'complexity': complexity,
+        scores = {
+            'complexity': factors['complexity'],
             'empty_cells': empty_cells,
             'max_tile': max_tile,
             'max_in_corner': max_in_corner,
             'monotonicity': monotonicity,
             'merge_opportunities': merges,
             'scattered_score': scattered,
-            'empty_factor': empty_factor,
-            'corner_factor': corner_factor,
-            'monotonicity_factor': monotonicity_factor,
-            'merge_factor': merge_factor,
-            'scattered_factor': scattered_factor
+            'empty_factor': factors['empty_factor'],
+            'corner_factor': factors['corner_factor'],
+            'monotonicity_factor': factors['monotonicity_factor'],
+            'merge_factor': factors['merge_factor'],
+            'scattered_factor': factors['scattered_factor']
         }
+
+        if self.model is not None:
+            scores['weighted_complexity'] = scores['complexity']
+            scores['complexity'] = self.model.complexity_for(scores)
+
+        return scores
+    
+    def get_game_over_risk(self, horizon: int = 3) -> float:
+        """Exact probability the game is over within `horizon` moves under best play"""
+        grid = tuple(map(tuple, self.board.tolist()))
+        if (self.rows, self.cols) == (4, 4):
+            try:
+                return game_over_probability(pack_board(self.board.tolist()), horizon)
+            except ValueError:
+                pass  # Tile above 32768 or not a power of two: no packed key
+        return grid_game_over_probability(grid, horizon)
     
     def needs_manual_inspection(self, threshold: float = 70) -> bool:
         """Determine if the board needs manual inspection"""
@@ -168,45 +131,275 @@ class BoardAnalyzer:
         click.echo(f"Monotonicity: {scores['monotonicity']:.2f}")
         click.echo(f"Merge Opportunities: {scores['merge_opportunities']}")
         click.echo(f"Scattered Score: {scores['scattered_score']:.2f}")
+        click.echo(f"Game Over Risk (3 moves): {self.get_game_over_risk(3) * 100:.1f}%")
         click.echo(f"\nStrategy: {self.suggest_strategy()}")
 
 
+def game_over_probability(key: int, horizon: int) -> float:
+    """P(no legal move within `horizon` moves) when always picking the safest move
+
+    Enumerates every move and every spawn (cell and 2/4) exactly. A board
+    with more empty cells than remaining moves cannot fill up, since each
+    move adds at most one tile, which prunes almost every branch. Results
+    are memoized on the symmetry-reduced key.
+    """
+    if is_won(key):
+        return 0.0
+    if len(empty_cells(key)) > horizon:
+        return 0.0
+
+    canonical = canonical_key(key)
+    cached = _RISK_CACHE.get((canonical, horizon))
+    if cached is not None:
+        return cached
+
+    moves = [new_key for _, new_key in legal_moves(key)]
+    if not moves:
+        risk = 1.0
+    elif horizon == 0:
+        risk = 0.0
+    else:
+        risk = min(
+            sum(p * game_over_probability(spawned, horizon - 1)
+                for spawned, p in spawn_outcomes(moved))
+            for moved in moves
+        )
+
+    if len(_RISK_CACHE) >= _RISK_CACHE_LIMIT:
+        _RISK_CACHE.clear()
+    _RISK_CACHE[(canonical, horizon)] = risk
+    return risk
+
+
+def _slide_line(line: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Slide and merge one line of tile values toward index 0"""
+    tiles = [v for v in line if v]
+    merged = []
+    i = 0
+    while i < len(tiles):
+        if i + 1 < len(tiles) and tiles[i] == tiles[i + 1]:
+            merged.append(tiles[i] * 2)
+            i += 2
+        else:
+            merged.append(tiles[i])
+            i += 1
+    return tuple(merged + [0] * (len(line) - len(merged)))
+
+
+def grid_move(grid: Tuple[Tuple[int, ...], ...], direction: int) -> Tuple[Tuple[int, ...], ...]:
+    """Slide and merge any rectangular grid of tile values (no spawn)"""
+    if direction == UP:
+        return tuple(zip(*(_slide_line(c) for c in zip(*grid))))
+    if direction == LEFT:
+        return tuple(_slide_line(r) for r in grid)
+    if direction == DOWN:
+        return tuple(zip(*(_slide_line(c[::-1])[::-1] for c in zip(*grid))))
+    if direction == RIGHT:
+        return tuple(_slide_line(r[::-1])[::-1] for r in grid)
+    raise ValueError(f"invalid direction: {direction}")
+
+
+def grid_moves(grid: Tuple[Tuple[int, ...], ...]) -> List[Tuple[Tuple[int, ...], ...]]:
+    """Boards reachable by one changing move, for any rectangular grid of tile values"""
+    candidates = (grid_move(grid, direction) for direction in (UP, LEFT, DOWN, RIGHT))
+    return [moved for moved in candidates if moved != grid]
+
+
+def grid_game_over_probability(grid: Tuple[Tuple[int, ...], ...], horizon: int) -> float:
+    """game_over_probability() for boards that do not fit a packed 4x4 key
+
+    Same recursion on tuples of tile values, without symmetry reduction.
+    """
+    cells = [(r, c) for r, row in enumerate(grid) for c, v in enumerate(row) if not v]
+    if any(v >= 2 ** WIN_EXPONENT for row in grid for v in row):
+        return 0.0
+    if len(cells) > horizon:
+        return 0.0
+
+    cached = _RISK_CACHE.get((grid, horizon))
+    if cached is not None:
+        return cached
+
+    moves = grid_moves(grid)
+    if not moves:
+        risk = 1.0
+    elif horizon == 0:
+        risk = 0.0
+    else:
+        def spawn_risk(moved):
+            free = [(r, c) for r, row in enumerate(moved) for c, v in enumerate(row) if not v]
+            total = 0.0
+            for r, c in free:
+                for value, p in ((2, 1 - SPAWN_FOUR_PROBABILITY), (4, SPAWN_FOUR_PROBABILITY)):
+                    row = moved[r][:c] + (value,) + moved[r][c + 1:]
+                    spawned = moved[:r] + (row,) + moved[r + 1:]
+                    total += p / len(free) * grid_game_over_probability(spawned, horizon - 1)
+            return total
+        risk = min(spawn_risk(moved) for moved in moves)
+
+    if len(_RISK_CACHE) >= _RISK_CACHE_LIMIT:
+        _RISK_CACHE.clear()
+    _RISK_CACHE[(grid, horizon)] = risk
+    return risk
+
+
+def monotonicity_kernel(boards: np.ndarray) -> np.ndarray:
+    """Share of rows and columns that are monotone, for (N, rows, cols) boards
+
+    Pairs of adjacent empty cells are ignored; an empty cell next to a tile
+    counts as a 0 value, as in the original per-row checks.
+    """
+    def monotone_lines(lines):
+        a, b = lines[..., :-1], lines[..., 1:]
+        ignored = (a == 0) & (b == 0)
+        increasing = (ignored | (a <= b)).all(axis=-1)
+        decreasing = (ignored | (a >= b)).all(axis=-1)
+        return (increasing | decreasing).sum(axis=-1)
+
+    _, rows, cols = boards.shape
+    return (monotone_lines(boards) + monotone_lines(boards.transpose(0, 2, 1))) / (rows + cols)
+
+
+def merge_kernel(boards: np.ndarray) -> np.ndarray:
+    """Adjacent equal non-empty pairs, for (N, rows, cols) boards"""
+    horizontal = (boards[:, :, :-1] == boards[:, :, 1:]) & (boards[:, :, :-1] != 0)
+    vertical = (boards[:, :-1, :] == boards[:, 1:, :]) & (boards[:, :-1, :] != 0)
+    return horizontal.sum(axis=(1, 2)) + vertical.sum(axis=(1, 2))
+
+
+def scattered_kernel(boards: np.ndarray, min_tile: int = 64) -> np.ndarray:
+    """Average Manhattan distance between tiles >= min_tile, for (N, rows, cols) boards
+
+    The pairwise sum is taken per axis from tile counts per row/column, so
+    the cost is linear in the number of cells instead of quadratic in the
+    number of high tiles.
+    """
+    high = (boards >= min_tile).astype(float)
+
+    def axis_distance(counts):
+        positions = np.arange(counts.shape[1])
+        before = np.cumsum(counts, axis=1) - counts
+        position_sum_before = np.cumsum(counts * positions, axis=1) - counts * positions
+        return (counts * (positions * before - position_sum_before)).sum(axis=1)
+
+    total = axis_distance(high.sum(axis=2)) + axis_distance(high.sum(axis=1))
+    count = high.sum(axis=(1, 2))
+    pairs = count * (count - 1) / 2
+    return np.divide(total, pairs, out=np.zeros(len(boards)), where=pairs > 0)
+
+
+def complexity_factors(empty_cells, max_in_corner, monotonicity, merges, scattered,
+                       rows: int = 4, cols: int = 4) -> Dict:
+    """Turn raw metrics (scalars or arrays) into the weighted complexity score
+
+    Empty-cell and merge counts are normalized by a quarter of the board
+    area and scatter by the largest possible distance, so a 4x4 board keeps
+    the original /4, /4 and /6 scaling.
+    """
+    quarter_area = rows * cols / 4
+    max_distance = (rows - 1) + (cols - 1)
+
+    empty_factor = np.maximum(0, 1 - np.asarray(empty_cells) / quarter_area)  # Less empty = more complex
+    corner_factor = np.where(max_in_corner, 0, 0.5)                           # Max not in corner = more complex
+    monotonicity_factor = 1 - np.asarray(monotonicity)                        # Less ordered = more complex
+    merge_factor = np.maximum(0, 1 - np.asarray(merges) / quarter_area)       # Fewer merges = more complex
+    scattered_factor = np.minimum(1, np.asarray(scattered) / max_distance)    # More scattered = more complex
+
+    # Weighted complexity score
+    complexity = (
+        empty_factor * 30 +
+        corner_factor * 20 +
+        monotonicity_factor * 20 +
+        merge_factor * 20 +
+        scattered_factor * 10
+    )
+
+    factors = {
+        'complexity': complexity,
+        'empty_factor': empty_factor,
+        'corner_factor': corner_factor,
+        'monotonicity_factor': monotonicity_factor,
+        'merge_factor': merge_factor,
+        'scattered_factor': scattered_factor
+    }
+    if np.ndim(complexity) == 0:
+        factors = {key: value.item() for key, value in factors.items()}
+    return factors
+
+
+def batch_metrics(boards: np.ndarray) -> Dict[str, np.ndarray]:
+    """Vectorized get_complexity_score() over an (N, rows, cols) array of tile values"""
+    boards = np.asarray(boards)
+    n, rows, cols = boards.shape
+    flat = boards.reshape(n, -1)
+
+    empty_cells = (flat == 0).sum(axis=1)
+    max_tile = flat.max(axis=1)
+    first_max = flat.argmax(axis=1)
+    max_row, max_col = first_max // cols, first_max % cols
+    max_in_corner = (np.isin(max_row, (0, rows - 1)) & np.isin(max_col, (0, cols - 1)))
+
+    monotonicity = monotonicity_kernel(boards)
+    merges = merge_kernel(boards)
+    scattered = scattered_kernel(boards)
+    factors = complexity_factors(empty_cells, max_in_corner, monotonicity, merges, scattered,
+                                 rows, cols)
+
+    metrics = {
+        'complexity': factors['complexity'],
+        'empty_cells': empty_cells,
+        'max_tile': max_tile,
+        'max_in_corner': max_in_corner,
+        'monotonicity': monotonicity,
+        'merge_opportunities': merges,
+        'scattered_score': scattered,
+    }
+    metrics.update((key, value) for key, value in factors.items() if key != 'complexity')
+    return metrics
+
+
+def analyze_board(board: List[List[int]], threshold: float = 70, model=None,
+                  risk_horizon: int = 3) -> Dict:
+    """Run the full analysis and return a JSON-serializable result"""
+    analyzer = BoardAnalyzer(board, model)
+    scores = analyzer.get_complexity_score()
+    result = {
+        key: (value.item() if isinstance(value, np.generic) else value)
+        for key, value in scores.items()
+    }
+    result['needs_inspection'] = result['complexity'] >= threshold
+    result['strategy'] = analyzer.suggest_strategy()
+    result['game_over_risk'] = analyzer.get_game_over_risk(risk_horizon)
+    result['risk_horizon'] = risk_horizon
+    return result
+
+
 @click.command()
 @click.argument('board_file', type=click.File('r'))
 @click.option('--threshold', '-t', default=70, help='Complexity threshold for manual inspection')
 @click.option('--json', 'output_json', is_flag=True, help='Output as JSON')
-def main(board_file, threshold, output_json):
+@click.option('--model', 'model_file', type=click.Path(exists=True),
+              help='Trained complexity model (see complexity-model train)')
+@click.option('--risk-horizon', default=3, help='Moves ahead for the exact game-over risk')
+def main(board_file, threshold, output_json, model_file, risk_horizon):
     """Analyze a 2048 board from a file"""
     import json
+    from .complexity_model import ComplexityModel
     
     # Parse board from file
-    lines = board_file.readlines()
-    board = []
-    
-    for line in lines:
-        # Look for lines with pipe characters (board rows)
-        if '|' in line and '---' not in line:
-            cells = line.split('|')[1:-1]  # Remove first and last empty
-            row = []
-            for cell in cells:
-                cell = cell.strip()
-                row.append(int(cell) if cell else 0)
-            if len(row) == 4:  # Valid row
-                board.append(row)
-    
-    if len(board) != 4:
-        click.echo("Error: Could not parse a valid 4x4 board", err=True)
+    board = parse_board_text(board_file.read())
+    
+    if board is None:
+        click.echo("Error: Could not parse a valid board", err=True)
         return
     
-    # Analyze
-    analyzer = BoardAnalyzer(board)
+    model = ComplexityModel.load(model_file) if model_file else None
     
+    # Analyze
     if output_json:
-        scores = analyzer.get_complexity_score()
-        scores['needs_inspection'] = analyzer.needs_manual_inspection(threshold)
-        scores['strategy'] = analyzer.suggest_strategy()
-        click.echo(json.dumps(scores, indent=2))
+        click.echo(json.dumps(analyze_board(board, threshold, model, risk_horizon), indent=2))
     else:
+        analyzer = BoardAnalyzer(board, model)
         analyzer.display_analysis()
         if analyzer.needs_manual_inspection(threshold):
             click.echo(f"\n⚠️  Board complexity exceeds threshold ({threshold})")
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Board Corpus for 2048 - Columnar, memory-mapped store of analyzed boards
+
+A corpus is a directory holding one raw little-endian file per column plus a
+manifest.json with the row count and the source table. Rows are only ever
+appended; the manifest row count is written last, so a torn append is
+truncated away on the next ingest.
+
+Example query (all boards with complexity > 70 and max tile not in a corner):
+
+    corpus = BoardCorpus('corpus')
+    rows = corpus.query('complexity > 70', 'max_in_corner == false')
+"""
+
+import csv
+import glob
+import json
+import operator
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import click
+import numpy as np
+
+from .board_analyzer import BoardAnalyzer
+from .board_io import load_state_file, pack_board, parse_board_text, unpack_board
+from .bulk_analyzer import is_board_candidate, analyze_stream, load_item
+from .snapshot_store import INDEX_FILE, is_store, store_items
+
+
+MANIFEST = 'manifest.json'
+CORPUS_VERSION = 1
+
+# (name, dtype) - metrics mirror BoardAnalyzer.get_complexity_score()
+COLUMNS = [
+    ('key', '<u8'),
+    ('source', '<u4'),
+    ('move', '<i4'),
+    ('score', '<i4'),
+    ('complexity', '<f4'),
+    ('empty_cells', 'u1'),
+    ('max_tile', '<u4'),
+    ('max_in_corner', '?'),
+    ('monotonicity', '<f4'),
+    ('merge_opportunities', 'u1'),
+    ('scattered_score', '<f4'),
+    ('empty_factor', '<f4'),
+    ('corner_factor', '<f4'),
+    ('monotonicity_factor', '<f4'),
+    ('merge_factor', '<f4'),
+    ('scattered_factor', '<f4'),
+]
+COLUMN_TYPES = dict(COLUMNS)
+
+OPERATORS = {
+    '>': operator.gt, '>=': operator.ge,
+    '<': operator.lt, '<=': operator.le,
+    '==': operator.eq, '!=': operator.ne,
+}
+CONDITION = re.compile(r'^\s*(\w+)\s*(>=|<=|==|!=|>|<)\s*(\S+)\s*$')
+
+
+def parse_condition(text: str) -> Tuple[str, str, float]:
+    """Parse 'column op value', e.g. 'complexity > 70' or 'max_in_corner == false'"""
+    match = CONDITION.match(text)
+    if not match:
+        raise ValueError(f"invalid condition: {text!r}")
+    column, op, value = match.groups()
+    if column not in COLUMN_TYPES:
+        raise ValueError(f"unknown column: {column}")
+    if value.lower() in ('true', 'false'):
+        return column, op, float(value.lower() == 'true')
+    return column, op, float(value)
+
+
+class BoardCorpus:
+    """Append-only columnar corpus of boards and their BoardAnalyzer metrics"""
+
+    def __init__(self, path, create: bool = False):
+        self.path = Path(path)
+        manifest_file = self.path / MANIFEST
+
+        if not manifest_file.exists():
+            if not create:
+                raise FileNotFoundError(f"no corpus at {self.path}")
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.manifest = {'version': CORPUS_VERSION, 'rows': 0,
+                             'columns': COLUMN_TYPES, 'sources': []}
+            self._write_manifest()
+        else:
+            with open(manifest_file) as f:
+                self.manifest = json.load(f)
+
+        self._source_index = {s: i for i, s in enumerate(self.manifest['sources'])}
+        self._columns = {}
+
+    def __len__(self):
+        return self.manifest['rows']
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """Read-only memory-mapped view of a column"""
+        if column not in self._columns:
+            dtype = np.dtype(COLUMN_TYPES[column])
+            if len(self) == 0:
+                self._columns[column] = np.empty(0, dtype)
+            else:
+                self._columns[column] = np.memmap(self._column_file(column), dtype=dtype,
+                                                  mode='r', shape=(len(self),))
+        return self._columns[column]
+
+    @property
+    def sources(self) -> List[str]:
+        return self.manifest['sources']
+
+    def has_source(self, source: str) -> bool:
+        return source in self._source_index
+
+    def _column_file(self, column: str) -> Path:
+        return self.path / f"{column}.bin"
+
+    def _write_manifest(self):
+        tmp = self.path / (MANIFEST + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, self.path / MANIFEST)
+
+    def _flush_block(self, block: Dict[str, list]):
+        for column, dtype in COLUMNS:
+            with open(self._column_file(column), 'ab') as f:
+                np.asarray(block[column], dtype=dtype).tofile(f)
+        self.manifest['rows'] += len(block['key'])
+        self._write_manifest()
+
+    def append(self, records: Iterable[Dict], block_size: int = 65536) -> int:
+        """Append analyzed records (dicts with 'board' or 'key', 'source' and metrics)"""
+        # Drop bytes from a previously interrupted append
+        for column, dtype in COLUMNS:
+            column_file = self._column_file(column)
+            if column_file.exists():
+                os.truncate(column_file, len(self) * np.dtype(dtype).itemsize)
+        self._columns = {}
+
+        appended = 0
+        block = {column: [] for column, _ in COLUMNS}
+        for record in records:
+            source = record['source']
+            if source not in self._source_index:
+                self._source_index[source] = len(self.manifest['sources'])
+                self.manifest['sources'].append(source)
+
+            row = dict(record)
+            row['source'] = self._source_index[source]
+            if 'key' not in row:
+                row['key'] = pack_board(row['board'])
+            for key in ('move', 'score'):
+                if row.get(key) is None:
+                    row[key] = -1
+            for column, _ in COLUMNS:
+                block[column].append(row[column])
+
+            appended += 1
+            if len(block['key']) >= block_size:
+                self._flush_block(block)
+                block = {column: [] for column, _ in COLUMNS}
+
+        if block['key']:
+            self._flush_block(block)
+        return appended
+
+    def mask(self, *conditions) -> np.ndarray:
+        """Boolean row mask for the AND of 'column op value' conditions"""
+        result = np.ones(len(self), dtype=bool)
+        for condition in conditions:
+            column, op, value = (parse_condition(condition)
+                                 if isinstance(condition, str) else condition)
+            result &= OPERATORS[op](self[column], value)
+        return result
+
+    def query(self, *conditions) -> np.ndarray:
+        """Indices of rows matching all conditions"""
+        return np.flatnonzero(self.mask(*conditions))
+
+    def rows(self, indices: Sequence[int],
+             columns: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+        """Materialize rows as dicts, with the board unpacked and source resolved"""
+        columns = columns or [name for name, _ in COLUMNS]
+        for i in indices:
+            row = {column: self[column][i].item() for column in columns}
+            if 'source' in row:
+                row['source'] = self.sources[row['source']]
+            if 'key' in row:
+                row['board'] = unpack_board(row['key'])
+            yield row
+
+
+def _ingest_item(item: Tuple[str, object], threshold: float) -> Dict:
+    """Worker: load a board and compute every metric the corpus stores"""
+    source, payload = item
+    try:
+        record = load_item(payload)
+        key = pack_board(record['board'])
+    except (OSError, ValueError) as e:
+        return {'source': source, 'error': str(e)}
+
+    result = {
+        name: (value.item() if isinstance(value, np.generic) else value)
+        for name, value in BoardAnalyzer(record['board']).get_complexity_score().items()
+    }
+    result.update(source=source, key=key,
+                  move=record.get('move'), score=record.get('score'))
+    return result
+
+
+def _csv_items(path: Path) -> Iterator[Tuple[str, object]]:
+    """Rows of experiment CSVs that reference a saved board file (e.g. final_board)"""
+    with open(path, newline='') as f:
+        for lineno, row in enumerate(csv.DictReader(f), 2):
+            for value in row.values():
+                if not value or not value.endswith('.txt'):
+                    continue
+                board_file = path.parent / value
+                if not board_file.is_file():
+                    continue
+                board = parse_board_text(board_file.read_text(errors='ignore'))
+                if board is None:
+                    continue
+                record = {'board': board}
+                if (row.get('score') or '').isdigit():
+                    record['score'] = int(row['score'])
+                yield f"{path}:{lineno}", record
+                break
+
+
+def expand_corpus_inputs(inputs: Iterable[str]) -> Iterator[Tuple[str, object]]:
+    """Expand files, directories, globs and snapshot stores into ingest work items"""
+    for spec in inputs:
+        path = Path(spec)
+        if is_store(path):
+            yield from store_items(path)
+            continue
+        if path.is_dir():
+            files = sorted(p for p in path.rglob('*') if p.is_file())
+        elif path.exists():
+            files = [path]
+        else:
+            files = [Path(p) for p in sorted(glob.glob(spec, recursive=True)) if os.path.isfile(p)]
+
+        for file in files:
+            if file.name == INDEX_FILE and is_store(file.parent):
+                yield from store_items(file.parent)
+            elif file.suffix == '.csv':
+                yield from _csv_items(file)
+            elif file.suffix == '.state':
+                record = load_state_file(file)
+                if record is not None:
+                    yield str(file), record
+            elif is_board_candidate(file):
+                yield str(file), file
+
+
+def ingest(corpus: BoardCorpus, inputs: Iterable[str], workers: int = 0,
+           force: bool = False) -> Tuple[int, int]:
+    """Analyze inputs and append them; sources already in the corpus are skipped"""
+    items = (item for item in expand_corpus_inputs(inputs)
+             if force or not corpus.has_source(item[0]))
+
+    failed = 0
+
+    def valid(results):
+        nonlocal failed
+        for result in results:
+            if 'error' in result:
+                failed += 1
+            else:
+                yield result
+
+    appended = corpus.append(valid(analyze_stream(items, workers=workers, analyze=_ingest_item)))
+    return appended, failed
+
+
+@click.group()
+def main():
+    """Build and query a columnar corpus of analyzed 2048 boards"""
+
+
+@main.command('ingest')
+@click.argument('corpus_dir')
+@click.argument('inputs', nargs=-1, required=True)
+@click.option('--workers', '-w', default=0, help='Worker processes (0 = one per CPU)')
+@click.option('--force', is_flag=True, help='Re-ingest sources already in the corpus')
+def ingest_command(corpus_dir, inputs, workers, force):
+    """Append boards from files, directories and globs to CORPUS_DIR"""
+    corpus = BoardCorpus(corpus_dir, create=True)
+    appended, failed = ingest(corpus, inputs, workers, force)
+    click.echo(f"Appended {appended} boards ({failed} unparseable), corpus now has {len(corpus)} rows")
+
+
+@main.command('query')
+@click.argument('corpus_dir')
+@click.option('--where', '-w', 'conditions', multiple=True,
+              help="Condition like 'complexity > 70' (repeatable, ANDed)")
+@click.option('--limit', '-n', default=20, help='Maximum rows to print (0 = all)')
+@click.option('--count', is_flag=True, help='Only print the number of matches')
+def query_command(corpus_dir, conditions, limit, count):
+    """Query CORPUS_DIR and print matching rows as JSONL"""
+    import time
+
+    corpus = BoardCorpus(corpus_dir)
+    start = time.perf_counter()
+    try:
+        indices = corpus.query(*conditions)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    elapsed = time.perf_counter() - start
+
+    if not count:
+        for row in corpus.rows(indices[:limit] if limit else indices):
+            click.echo(json.dumps(row))
+    click.echo(f"{len(indices)} of {len(corpus)} rows matched in {elapsed * 1000:.1f} ms", err=True)
+
+
+@main.command('info')
+@click.argument('corpus_dir')
+def info_command(corpus_dir):
+    """Show corpus size and columns"""
+    corpus = BoardCorpus(corpus_dir)
+    click.echo(f"Rows: {len(corpus)}")
+    click.echo(f"Sources: {len(corpus.sources)}")
+    click.echo(f"Columns: {', '.join(name for name, _ in COLUMNS)}")
+
+
+if __name__ == "__main__":
+    main()
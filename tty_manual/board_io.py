@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Board I/O for 2048 - Loads board snapshots from the formats our tools write
+
+Supported formats:
+  - text renderings with pipe-delimited rows (tty-reader snapshots, display.txt)
+  - JSON snapshots from ManualTestRunner (move_XXXX.json)
+  - raw grid dumps from LLDB (grid.bin, little-endian int32 exponents)
+  - hexdump -C output of those dumps (grid_hex.txt)
+"""
+
+import json
+import re
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+Board = List[List[int]]
+
+HEXDUMP_LINE = re.compile(r'^[0-9a-fA-F]{8}\s+((?:[0-9a-fA-F]{2}\s+){1,16})')
+SCORE_LINE = re.compile(r'Score:\s*(\d+)')
+MOVE_NAME = re.compile(r'move_(\d+)')
+STATE_NAME = re.compile(r'game_score(\d+)_board([0-9a-f]+)_tile(\d+)')
+
+# Board sides accepted by the parsers: the engine's default 4, or -s N,
+# which options.c only honours for 4 < N < 20
+MIN_SIDE, MAX_SIDE = 4, 19
+
+
+def is_valid_shape(board: Board) -> bool:
+    """Check that a board is a rectangular grid with supported side lengths"""
+    if not MIN_SIDE <= len(board) <= MAX_SIDE:
+        return False
+    width = len(board[0])
+    return MIN_SIDE <= width <= MAX_SIDE and all(len(row) == width for row in board)
+
+
+def pack_board(board: Board) -> int:
+    """Pack a 4x4 board into a 64-bit key (4-bit tile exponent per cell, row-major)"""
+    if len(board) != 4 or any(len(row) != 4 for row in board):
+        raise ValueError("only 4x4 boards can be packed")
+    key = 0
+    for i, cell in enumerate(cell for row in board for cell in row):
+        exponent = int(cell).bit_length() - 1 if cell else 0
+        if exponent > 15 or (cell and 1 << exponent != cell):
+            raise ValueError(f"tile {cell} cannot be packed")
+        key |= exponent << (4 * i)
+    return key
+
+
+def unpack_board(key: int) -> Board:
+    """Inverse of pack_board"""
+    key = int(key)
+    exponents = [(key >> (4 * i)) & 0xF for i in range(16)]
+    tiles = [(1 << e) if e else 0 for e in exponents]
+    return [tiles[row * 4:row * 4 + 4] for row in range(4)]
+
+
+def parse_board_text(text: str) -> Optional[Board]:
+    """Parse a board from a text rendering with pipe-delimited rows"""
+    board = []
+
+    for line in text.splitlines():
+        # Look for lines with pipe characters (board rows)
+        if '|' in line and '---' not in line:
+            cells = line.split('|')[1:-1]  # Remove first and last empty
+            try:
+                row = [int(cell) if cell.strip() else 0 for cell in cells]
+            except ValueError:
+                continue
+            if row:
+                board.append(row)
+
+    # Keep the first run of rows with a consistent width
+    if board:
+        width = len(board[0])
+        board = board[:next((i for i, row in enumerate(board) if len(row) != width), len(board))]
+    if not board or not is_valid_shape(board):
+        return None
+    return board
+
+
+def parse_board_json(data) -> Optional[Board]:
+    """Parse a board from a decoded JSON snapshot or a bare list of rows"""
+    if isinstance(data, dict):
+        data = data.get('board')
+    if not isinstance(data, list) or not data:
+        return None
+    if not all(isinstance(row, list) for row in data) or not is_valid_shape(data):
+        return None
+    if not all(_is_tile(cell) for row in data for cell in row):
+        return None
+    return [[int(cell) for cell in row] for row in data]
+
+
+def _is_tile(cell) -> bool:
+    """A JSON cell usable as a tile value: a non-negative whole number"""
+    if isinstance(cell, bool) or not isinstance(cell, (int, float)):
+        return False
+    return cell >= 0 and float(cell).is_integer()
+
+
+def parse_grid_bin(data: bytes) -> Optional[Board]:
+    """Parse a raw grid_data_ptr dump (column-major int32 exponents)
+
+    The side is inferred from the dump length (a square grid); dumps that
+    carry trailing bytes beyond a 4x4 grid are read as 4x4.
+    """
+    cells = len(data) // 4
+    side = int(cells ** 0.5)
+    if side * side != cells or not MIN_SIDE <= side <= MAX_SIDE:
+        side = 4
+    if len(data) < 4 * side * side:
+        return None
+    values = struct.unpack(f'<{side * side}I', data[:4 * side * side])
+    tiles = [(2 ** v) if v > 0 else 0 for v in values]
+    # grid[col][row] - see exp_007 memory layout proof
+    return [[tiles[col * side + row] for col in range(side)] for row in range(side)]
+
+
+def parse_grid_hex(text: str) -> Optional[Board]:
+    """Parse hexdump -C output of a grid dump"""
+    data = bytearray()
+    for line in text.splitlines():
+        match = HEXDUMP_LINE.match(line)
+        if match:
+            data.extend(bytes.fromhex(match.group(1)))
+    return parse_grid_bin(bytes(data))
+
+
+def is_hexdump(text: str) -> bool:
+    """Check whether text looks like hexdump -C output"""
+    first = text.lstrip().split('\n', 1)[0]
+    return bool(HEXDUMP_LINE.match(first))
+
+
+def parse_record(data) -> Optional[Dict]:
+    """Turn a decoded JSON object (snapshot or JSONL line) into a board record"""
+    board = parse_board_json(data)
+    if board is None:
+        return None
+    record = {'board': board}
+    if isinstance(data, dict):
+        for key in ('score', 'move'):
+            if data.get(key) is not None:
+                record[key] = data[key]
+    return record
+
+
+def load_board_state_dir(path) -> Optional[Dict]:
+    """Load a filesystem board (board_state/<row>/<col>/<value>, see exp_021)"""
+    path = Path(path)
+    board = [[0] * 4 for _ in range(4)]
+    found = False
+
+    for tile in path.glob('[0-3]/[0-3]/*'):
+        if tile.name.isdigit():
+            board[int(tile.parent.parent.name)][int(tile.parent.name)] = int(tile.name)
+            found = True
+    if not found:
+        return None
+
+    record = {'board': board}
+    for name, key in (('score.txt', 'score'), ('moves.txt', 'move')):
+        if (path / name).exists():
+            digits = re.search(r'(\d+)', (path / name).read_text())
+            if digits:
+                record[key] = int(digits.group(1))
+    return record
+
+
+def load_state_file(path) -> Optional[Dict]:
+    """Load the board behind a game_score<N>_board<hash>_tile<T>.state file
+
+    The .state files themselves are empty markers; the board lives in the
+    sibling board_state_<N> directory written by the filesystem demo.
+    """
+    path = Path(path)
+    match = STATE_NAME.search(path.name)
+    if not match:
+        return None
+    record = load_board_state_dir(path.parent / f"board_state_{match.group(1)}")
+    if record is not None:
+        record['score'] = int(match.group(1))
+    return record
+
+
+def load_board_file(path) -> Optional[Dict]:
+    """Load a board record from any supported file format
+
+    Returns a dict with a 'board' key (plus 'score' when the file has one),
+    or None if the file does not contain a board.
+    """
+    path = Path(path)
+    record = _load_board_file(path)
+    if record is not None and 'move' not in record:
+        move_match = MOVE_NAME.search(path.name)
+        if move_match:
+            record['move'] = int(move_match.group(1))
+    return record
+
+
+def _load_board_file(path: Path) -> Optional[Dict]:
+    if path.suffix == '.state':
+        return load_state_file(path)
+
+    if path.suffix == '.bin':
+        board = parse_grid_bin(path.read_bytes())
+        return {'board': board} if board else None
+
+    text = path.read_text(errors='ignore')
+
+    if path.suffix == '.json':
+        try:
+            return parse_record(json.loads(text))
+        except ValueError:
+            return None
+
+    if is_hexdump(text):
+        board = parse_grid_hex(text)
+        return {'board': board} if board else None
+
+    board = parse_board_text(text)
+    if board is None:
+        return None
+    record = {'board': board}
+    score_match = SCORE_LINE.search(text)
+    if score_match:
+        record['score'] = int(score_match.group(1))
+    return record
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Bulk Board Analyzer for 2048 - Analyzes many board snapshots in one process
+
+Accepts files, directories, globs (e.g. 'logs/manual_test_*/boards/*.json'),
+snapshot stores (logs/snapshots) and JSONL on stdin, spreads the analysis over a process pool and streams
+JSONL or CSV results in input order.
+"""
+
+import csv
+import glob
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+import click
+
+from .board_analyzer import analyze_board
+from .board_io import load_board_file, parse_record
+from .snapshot_store import INDEX_FILE, is_store, store_items
+
+
+BOARD_SUFFIXES = ('.txt', '.json', '.state')
+CSV_FIELDS = [
+    'source', 'move', 'score', 'complexity', 'empty_cells', 'max_tile',
+    'max_in_corner', 'monotonicity', 'merge_opportunities', 'scattered_score',
+    'empty_factor', 'corner_factor', 'monotonicity_factor', 'merge_factor',
+    'scattered_factor', 'needs_inspection', 'strategy', 'game_over_risk', 'error'
+]
+
+
+def is_board_candidate(path: Path) -> bool:
+    """Filter directory listings down to files that may hold a board"""
+    if path.suffix == '.bin':
+        return path.name.startswith('grid')
+    return path.suffix in BOARD_SUFFIXES
+
+
+def expand_inputs(inputs: Iterable[str]) -> Iterator[Tuple[str, object]]:
+    """Expand CLI inputs into (source, payload) work items
+
+    Payload is a path for files, a decoded JSON object for stdin lines and
+    a board record for snapshots in a store (a directory, or one found
+    inside a directory).
+    """
+    for spec in inputs:
+        if spec == '-':
+            for lineno, line in enumerate(sys.stdin, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError as e:
+                    yield f"<stdin>:{lineno}", ValueError(f"invalid JSON: {e}")
+                    continue
+                source = data.get('source') if isinstance(data, dict) else None
+                yield source or f"<stdin>:{lineno}", data
+            continue
+
+        path = Path(spec)
+        if is_store(path):
+            yield from store_items(path)
+        elif path.is_dir():
+            for child in sorted(path.rglob('*')):
+                if child.name == INDEX_FILE and is_store(child.parent):
+                    yield from store_items(child.parent)
+                elif child.is_file() and is_board_candidate(child):
+                    yield str(child), child
+        elif path.exists():
+            yield spec, path
+        else:
+            for match in sorted(glob.glob(spec, recursive=True)):
+                if os.path.isfile(match):
+                    yield match, Path(match)
+
+
+def load_item(payload) -> Dict:
+    """Resolve a work item payload into a board record, raising on bad input"""
+    if isinstance(payload, Exception):
+        raise payload
+    if isinstance(payload, Path):
+        record = load_board_file(payload)
+    else:
+        record = parse_record(payload)
+    if record is None:
+        raise ValueError("could not parse a valid board")
+    return record
+
+
+def analyze_item(item: Tuple[str, object], threshold: float) -> Dict:
+    """Load and analyze a single work item, never raising"""
+    source, payload = item
+    result = {'source': source}
+
+    try:
+        record = load_item(payload)
+    except (OSError, ValueError) as e:
+        result['error'] = str(e)
+        return result
+
+    for key in ('move', 'score'):
+        if key in record:
+            result[key] = record[key]
+    try:
+        result.update(analyze_board(record['board'], threshold))
+    except Exception as e:  # One bad board must not stop the whole run
+        result['error'] = f"analysis failed: {e!r}"
+    return result
+
+
+def _analyze_chunk(chunk: List[Tuple[str, object]], threshold: float,
+                   analyze: Callable) -> List[Dict]:
+    return [analyze(item, threshold) for item in chunk]
+
+
+def _chunked(items: Iterator, size: int) -> Iterator[List]:
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyze_stream(items: Iterable[Tuple[str, object]], threshold: float = 70,
+                   workers: int = 0, chunksize: int = 64,
+                   analyze: Callable = analyze_item) -> Iterator[Dict]:
+    """Analyze work items over a process pool, yielding results in input order
+
+    Only a bounded window of chunks is in flight, so arbitrarily long input
+    streams run in constant memory. analyze must be a picklable module-level
+    function taking (item, threshold).
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunked(iter(items), chunksize)
+
+    if workers == 1:
+        for chunk in chunks:
+            yield from _analyze_chunk(chunk, threshold, analyze)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_analyze_chunk, chunk, threshold, analyze))
+            if len(pending) >= workers * 4:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+@click.command()
+@click.argument('inputs', nargs=-1)
+@click.option('--format', 'output_format', type=click.Choice(['jsonl', 'csv']), default='jsonl',
+              help='Output format')
+@click.option('--threshold', '-t', default=70, help='Complexity threshold for manual inspection')
+@click.option('--workers', '-w', default=0, help='Worker processes (0 = one per CPU)')
+@click.option('--chunksize', default=64, help='Boards per worker task')
+@click.option('--skip-invalid', is_flag=True, help='Drop inputs that do not contain a board')
+def main(inputs, output_format, threshold, workers, chunksize, skip_invalid):
+    """Analyze many 2048 boards from files, directories, globs or stdin JSONL ('-')"""
+    items = expand_inputs(inputs or ['-'])
+    results = analyze_stream(items, threshold, workers, chunksize)
+
+    out = sys.stdout
+    writer = None
+    if output_format == 'csv':
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+
+    analyzed = failed = 0
+    for result in results:
+        if 'error' in result:
+            failed += 1
+            if skip_invalid:
+                continue
+        else:
+            analyzed += 1
+
+        if writer:
+            writer.writerow(result)
+        else:
+            out.write(json.dumps(result) + "\n")
+
+    click.echo(f"Analyzed {analyzed} boards ({failed} invalid inputs)", err=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Complexity Model for 2048 - Learns when a board is actually dangerous
+
+Replaces the hand-picked 30/20/20/20/10 weights of get_complexity_score()
+with a logistic model fitted on simulated outcomes: "does the game end
+within K moves from this board under the reference (down-right spam)
+policy?". Complexity becomes 100 * P(game over within K moves), so a
+threshold of 70 means "pause when death is 70% likely".
+"""
+
+import json
+from typing import Dict, Optional, Tuple
+import click
+import numpy as np
+
+from .board_analyzer import batch_metrics
+from .simulator import SPAM_WEIGHTS, BatchSimulator, sample_moves, to_values, WIN_EXPONENT
+
+
+FEATURES = [
+    'empty_cells', 'max_tile_log2', 'max_in_corner', 'monotonicity',
+    'merge_opportunities', 'scattered_score', 'empty_factor', 'merge_factor',
+    'scattered_factor'
+]
+
+
+def feature_matrix(metrics: Dict) -> np.ndarray:
+    """Stack BoardAnalyzer metrics (arrays or scalars) into an (N, F) matrix"""
+    columns = []
+    for name in FEATURES:
+        if name == 'max_tile_log2':
+            value = np.log2(np.maximum(np.asarray(metrics['max_tile'], dtype=float), 1))
+        else:
+            value = np.asarray(metrics[name], dtype=float)
+        columns.append(np.atleast_1d(value))
+    return np.stack(columns, axis=1)
+
+
+class ComplexityModel:
+    """Logistic regression over standardized BoardAnalyzer features"""
+
+    def __init__(self, weights, bias: float, mean, scale, horizon: int,
+                 metadata: Optional[Dict] = None):
+        self.weights = np.asarray(weights, dtype=float)
+        self.bias = float(bias)
+        self.mean = np.asarray(mean, dtype=float)
+        self.scale = np.asarray(scale, dtype=float)
+        self.horizon = horizon
+        self.metadata = metadata or {}
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """P(game over within horizon) for each row of an (N, F) feature matrix"""
+        z = ((features - self.mean) / self.scale) @ self.weights + self.bias
+        return 1 / (1 + np.exp(-z))
+
+    def predict_complexity(self, metrics: Dict) -> np.ndarray:
+        """Vectorized drop-in for the weighted complexity (0-100)"""
+        return 100 * self.predict_proba(feature_matrix(metrics))
+
+    def complexity_for(self, scores: Dict) -> float:
+        """Complexity for a single get_complexity_score() result"""
+        return float(self.predict_complexity(scores)[0])
+
+    @classmethod
+    def fit(cls, features: np.ndarray, labels: np.ndarray, horizon: int,
+            l2: float = 1e-3, iterations: int = 30) -> 'ComplexityModel':
+        """Fit by Newton-Raphson (IRLS) with a small L2 penalty"""
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        scale[scale == 0] = 1
+        x = np.hstack([(features - mean) / scale, np.ones((len(features), 1))])
+        y = labels.astype(float)
+
+        beta = np.zeros(x.shape[1])
+        penalty = l2 * len(x) * np.eye(x.shape[1])
+        penalty[-1, -1] = 0  # Do not shrink the intercept
+        for _ in range(iterations):
+            p = 1 / (1 + np.exp(-(x @ beta)))
+            gradient = x.T @ (p - y) + penalty @ beta
+            hessian = (x * (p * (1 - p))[:, None]).T @ x + penalty
+            step = np.linalg.solve(hessian, gradient)
+            beta -= step
+            if np.abs(step).max() < 1e-8:
+                break
+
+        return cls(beta[:-1], beta[-1], mean, scale, horizon)
+
+    def to_dict(self) -> Dict:
+        return {
+            'features': FEATURES,
+            'weights': self.weights.tolist(),
+            'bias': self.bias,
+            'mean': self.mean.tolist(),
+            'scale': self.scale.tolist(),
+            'horizon': self.horizon,
+            'metadata': self.metadata
+        }
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path) -> 'ComplexityModel':
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('features') != FEATURES:
+            raise ValueError(f"{path} was trained on a different feature set")
+        return cls(data['weights'], data['bias'], data['mean'], data['scale'],
+                   data['horizon'], data.get('metadata'))
+
+
+def generate_training_data(n_games: int, horizon: int, seed: Optional[int] = None,
+                           max_moves: int = 2000) -> Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray]:
+    """Simulate games under the reference policy and label every visited board
+
+    A board seen at keypress t is positive if the game is lost (no moves left,
+    not won) by keypress t + horizon. Boards whose outcome is unknown because
+    the move cap cut the game short are dropped.
+
+    Returns (metrics, labels, game_ids).
+    """
+    sim = BatchSimulator(n_games, seed)
+    seen_metrics, seen_games, seen_steps = [], [], []
+
+    while sim.alive.any() and sim.moves.max() < max_moves:
+        alive = np.flatnonzero(sim.alive)
+        seen_metrics.append(batch_metrics(to_values(sim.boards[alive])))
+        seen_games.append(alive)
+        seen_steps.append(sim.moves[alive].copy())
+        sim.step(sample_moves(SPAM_WEIGHTS, n_games, sim.rng))
+
+    metrics = {key: np.concatenate([m[key] for m in seen_metrics]) for key in seen_metrics[0]}
+    games = np.concatenate(seen_games)
+    steps = np.concatenate(seen_steps)
+
+    lost = ~sim.alive & (sim.boards < WIN_EXPONENT).all(axis=1)
+    end_step = sim.moves[games]
+    labels = lost[games] & (end_step - steps <= horizon)
+    known = ~sim.alive[games] | (steps + horizon <= sim.moves[games])
+
+    metrics = {key: value[known] for key, value in metrics.items()}
+    return metrics, labels[known], games[known]
+
+
+def roc_auc(scores: np.ndarray, labels: np.ndarray) -> float:
+    """Area under the ROC curve (Mann-Whitney U with tied ranks averaged)"""
+    _, inverse, counts = np.unique(scores, return_inverse=True, return_counts=True)
+    starts = np.cumsum(counts) - counts
+    ranks = (starts + (counts + 1) / 2)[inverse]
+    positives = labels.sum()
+    negatives = len(labels) - positives
+    if positives == 0 or negatives == 0:
+        return float('nan')
+    return float((ranks[labels].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def compare_pause_rules(model_scores: np.ndarray, weighted_scores: np.ndarray,
+                        labels: np.ndarray, weighted_threshold: float = 70) -> Dict:
+    """Compare pauses at equal recall: how many pauses each rule wastes"""
+    weighted_pause = weighted_scores >= weighted_threshold
+    recall = weighted_pause[labels].mean() if labels.any() else 0.0
+
+    # Model threshold that catches the same share of real danger
+    model_threshold = float(np.quantile(model_scores[labels], 1 - recall)) if labels.any() else 100.0
+    model_pause = model_scores >= model_threshold
+
+    return {
+        'recall': float(recall),
+        'weighted_threshold': weighted_threshold,
+        'weighted_pauses': int(weighted_pause.sum()),
+        'weighted_false_pauses': int((weighted_pause & ~labels).sum()),
+        'model_threshold': model_threshold,
+        'model_pauses': int(model_pause.sum()),
+        'model_false_pauses': int((model_pause & ~labels).sum()),
+    }
+
+
+@click.group()
+def main():
+    """Train and inspect data-driven complexity models"""
+
+
+@main.command('train')
+@click.option('--games', '-g', default=20000, help='Simulated games for training data')
+@click.option('--horizon', '-k', default=10, help='Label: game over within K moves')
+@click.option('--seed', default=0, help='Random seed')
+@click.option('--max-moves', default=2000, help='Move cap per simulated game')
+@click.option('--output', '-o', default='complexity_model.json', help='Where to save the model')
+@click.option('--threshold', '-t', default=70, help='Weighted-complexity threshold to compare against')
+def train(games, horizon, seed, max_moves, output, threshold):
+    """Simulate labelled boards, fit the model and report held-out quality"""
+    import time
+
+    start = time.time()
+    metrics, labels, game_ids = generate_training_data(games, horizon, seed, max_moves)
+    click.echo(f"Generated {len(labels)} labelled boards from {games} games "
+               f"in {time.time() - start:.1f}s ({labels.mean() * 100:.1f}% positive)")
+
+    # Hold out 20% of games (not boards) so test boards come from unseen games
+    test = np.random.default_rng(seed).random(games)[game_ids] < 0.2
+    features = feature_matrix(metrics)
+
+    model = ComplexityModel.fit(features[~test], labels[~test], horizon)
+    model_scores = model.predict_complexity({k: v[test] for k, v in metrics.items()})
+    weighted_scores = metrics['complexity'][test]
+
+    comparison = compare_pause_rules(model_scores, weighted_scores, labels[test], threshold)
+    comparison['model_auc'] = roc_auc(model_scores, labels[test])
+    comparison['weighted_auc'] = roc_auc(weighted_scores, labels[test])
+    model.metadata = {'games': games, 'seed': seed, 'max_moves': max_moves,
+                      'policy': 'down_right_spam', 'held_out': comparison}
+    model.save(output)
+
+    click.echo(f"\nHeld-out AUC: model {comparison['model_auc']:.3f}, "
+               f"weighted {comparison['weighted_auc']:.3f}")
+    click.echo(f"At {comparison['recall'] * 100:.1f}% recall of boards that die within {horizon} moves:")
+    click.echo(f"  weighted >= {threshold}: {comparison['weighted_pauses']} pauses, "
+               f"{comparison['weighted_false_pauses']} false")
+    click.echo(f"  model >= {comparison['model_threshold']:.1f}: {comparison['model_pauses']} pauses, "
+               f"{comparison['model_false_pauses']} false")
+    click.echo(f"\nSaved model to {output}")
+
+
+@main.command('show')
+@click.argument('model_file')
+def show(model_file):
+    """Print a trained model's coefficients"""
+    model = ComplexityModel.load(model_file)
+    click.echo(f"Horizon: {model.horizon} moves")
+    for name, weight in sorted(zip(FEATURES, model.weights), key=lambda x: -abs(x[1])):
+        click.echo(f"  {name:22s} {weight:+.3f}")
+    click.echo(f"  {'(bias)':22s} {model.bias:+.3f}")
+
+
+if __name__ == "__main__":
+    main()
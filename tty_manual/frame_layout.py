@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Frame Layout for 2048 - Fixed-offset parsing of terminal frames
+
+gfx_terminal.c pads every cell to print_width, which engine.c derives
+from the merge goal (digits_ceiling(merge_value(merge_goal()))). Every
+row of a frame therefore has the same length, and every cell's digits
+sit at the same offset from the top border, whatever the tiles are.
+
+FrameLayout learns those offsets from one frame and then reads later
+frames by slicing the digit fields straight out of the bytes. It checks
+only the frame length and the row bars. A frame that does not fit the
+layout returns None, and callers fall back to the generic parser.
+"""
+
+import time
+from typing import List, Optional, Tuple
+import click
+
+DASH, CR = ord('-'), ord('\r')
+
+Frame = Tuple[List[List[int]], int, int]
+
+
+def parse_scores(buffer, start, end) -> Tuple[int, int, int]:
+    """(score, high_score, top border position) of the frame at buffer[start:end]"""
+    score_end = buffer.find(b'\n', start, end)
+    gain = buffer.find(b'(', start, score_end)  # 'Score: 12 (+4)'
+    score = int(buffer[start + len(b'Score:'):score_end if gain < 0 else gain])
+    hi = buffer.find(b'Hi:', score_end, end) + len(b'Hi:')
+    hi_end = buffer.find(b'\n', hi, end)
+    return score, int(buffer[hi:hi_end]), hi_end + 1
+
+
+class FrameLayout:
+    """Cell offsets of the terminal renderer's frames for one game"""
+
+    def __init__(self, rows: int, cols: int, cell_width: int, newline: int = 2):
+        self.cols = cols
+        self.cell_width = cell_width
+        self.width = (cell_width + 2) * cols + 1  # Border and row length without newline
+        self.stride = self.width + newline        # Distance between line starts
+        self._set_rows(rows)
+        # Value of every digit field the engine can print
+        self.values = {b'%*d' % (cell_width, 1 << exponent): 1 << exponent for exponent in range(1, 18)}
+        self.values[b' ' * cell_width] = 0
+
+    def _set_rows(self, rows: int) -> None:
+        self.rows = rows
+        # (start, stop) of every cell's digit field, row by row, counted from the first row
+        self.fields = [(self.stride * row + 1 + (self.cell_width + 2) * col,
+                        self.stride * row + 1 + (self.cell_width + 2) * col + self.cell_width)
+                       for row in range(rows) for col in range(self.cols)]
+
+    def __repr__(self):
+        return f"FrameLayout(rows={self.rows}, cols={self.cols}, cell_width={self.cell_width})"
+
+    @classmethod
+    def learn(cls, buffer, start, end) -> Optional['FrameLayout']:
+        """Layout of the complete frame at buffer[start:end], or None if it is irregular"""
+        _, _, top = parse_scores(buffer, start, end)
+        border_end = buffer.find(b'\n', top, end)
+        if border_end < 0:
+            return None
+        newline = 2 if buffer[border_end - 1] == CR else 1
+        width = border_end - top - (newline - 1)
+        row = top + width + newline
+        cols = buffer.count(b'|', row, row + width) - 1
+        if cols < 1 or (width - 1) % cols:
+            return None
+        layout = cls(0, cols, (width - 1) // cols - 2, newline)
+        lines, extra = divmod(end - top, layout.stride)
+        if extra or lines < 3 or layout.width != width:
+            return None
+        layout._set_rows(lines - 2)
+        return layout if layout.parse(buffer, start, end) is not None else None
+
+    def parse(self, buffer, start, end) -> Optional[Frame]:
+        """(board, score, high_score) of the frame at buffer[start:end], or None if it does not fit"""
+        score, high_score, top = parse_scores(buffer, start, end)
+        if top + self.stride * (self.rows + 2) != end or buffer[top] != DASH:
+            return None
+        rows = bytes(buffer[top + self.stride:end - self.stride])  # One copy; bytes slices are hashable
+        if rows.count(b'|') != self.rows * (self.cols + 1):
+            return None
+        values = self.values
+        try:
+            cells = [values[rows[field:field_end]] for field, field_end in self.fields]
+        except KeyError:
+            return None  # Misaligned field, or a tile the table does not know
+        cols = self.cols
+        board = [cells[i:i + cols] for i in range(0, len(cells), cols)]
+        return board, score, high_score
+
+
+def record_frames(count: int, game_binary: str = "2048-cli-0.9.1/2048", game_args=('-A',)) -> List[bytes]:
+    """Raw bytes of `count` frames drawn by real games (new games are started as needed)"""
+    import random
+    from .tty_reader import TTYReader, find_last_frame_span
+
+    rng = random.Random(0)
+    frames = []
+    while len(frames) < count:
+        reader = TTYReader(game_binary, game_args)
+        try:
+            reader._spawn()
+            reader.wait_for_frame(timeout=2.0, since=0)
+            while len(frames) < count and reader.process.poll() is None:
+                if reader.send_move_and_wait(rng.choice('wasd')) is not None:
+                    span = find_last_frame_span(reader._buffer, 0, reader._length)
+                    frames.append(bytes(reader._buffer[span[0]:span[1]]))
+        finally:
+            reader.cleanup()
+    return frames
+
+
+@click.command()
+@click.option('--frames', '-n', default=500, help='Frames to record from real games')
+@click.option('--repeat', '-r', default=20, help='Passes over the recorded frames per parser')
+@click.option('--game-binary', default='2048-cli-0.9.1/2048', help='Path to 2048 binary')
+@click.option('--game-args', default='-A', help="Game options, e.g. '-A -s 6'")
+def main(frames, repeat, game_binary, game_args):
+    """Benchmark the fixed-offset frame parser against the generic parsers"""
+    import shlex
+    from .tty_reader import TTYReader, parse_frame
+
+    recorded = record_frames(frames, game_binary, shlex.split(game_args))
+    buffers = [bytearray(frame) for frame in recorded]
+    texts = [frame.decode() for frame in recorded]
+    layout = FrameLayout.learn(buffers[0], 0, len(buffers[0]))
+    if layout is None:
+        raise click.ClickException("could not learn a layout from the first frame")
+    click.echo(f"{len(recorded)} frames, {layout}")
+
+    reader = TTYReader(game_binary)
+
+    def split_strip(text):
+        reader.parse_board_state(text)
+        return reader.current_board, reader.current_score, reader.high_score
+
+    parsers = [
+        ("split/strip (text)", split_strip, texts),
+        ("generic bytes", lambda buf: parse_frame(buf, 0, len(buf)), buffers),
+        ("fixed offsets", lambda buf: layout.parse(buf, 0, len(buf)), buffers),
+    ]
+    expected = [split_strip(text) for text in texts]
+    for name, parse, inputs in parsers:
+        if [parse(frame) for frame in inputs] != expected:
+            raise click.ClickException(f"{name} disagrees with the reference parser")
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for frame in inputs:
+                parse(frame)
+        elapsed = time.perf_counter() - start
+        click.echo(f"  {name:20} {len(inputs) * repeat / elapsed:>10,.0f} frames/s")
+
+
+if __name__ == "__main__":
+    main()
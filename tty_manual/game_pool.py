@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Game Pool for 2048 - Pre-warmed games ready to lease
+
+Launching a game (pty, fork/exec, first draw) is a fixed cost that every
+harness otherwise pays serially before its first move. GamePool keeps
+`size` games already launched with their first frame parsed; a background
+thread launches replacements as games are leased, and reaps processes that
+exit while waiting in the pool or while leased.
+
+    with GamePool(size=4, game_args=['-A']) as pool:
+        for _ in range(100):
+            with pool.game() as reader:
+                reader.send_move_and_wait('s')
+
+Games are single use: a released game is closed, not returned to the pool.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional, Set
+import click
+
+from .tty_reader import TTYReader, ANIMATION_SETTLE
+from .async_reader import is_noop, spam_policy
+
+# Consecutive launch failures after which the pool gives up
+MAX_LAUNCH_FAILURES = 3
+
+
+class GamePool:
+    """Keeps `size` launched games with a parsed first frame, ready to lease"""
+
+    def __init__(self, size: int = 4, game_binary: str = "2048-cli-0.9.1/2048", game_args=(),
+                 screen: bool = False, startup_timeout: float = 5.0):
+        self.size = size
+        self.game_binary = game_binary
+        self.game_args = list(game_args)
+        self.screen = screen
+        self.startup_timeout = startup_timeout
+
+        self._ready: Deque[TTYReader] = deque()
+        self._leased: Set[TTYReader] = set()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._error = None
+        self._thread = None
+        self.stats = {'launched': 0, 'failed': 0, 'leased': 0, 'reaped': 0, 'launch_time': 0.0}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self) -> None:
+        """Start the background thread that keeps the pool full"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._replenish, name='game-pool', daemon=True)
+            self._thread.start()
+
+    def _launch(self) -> Optional[TTYReader]:
+        start = time.perf_counter()
+        reader = TTYReader(self.game_binary, self.game_args, self.screen)
+        try:
+            reader._spawn()
+            ready = reader.wait_for_frame(timeout=self.startup_timeout, since=0) is not None
+        except OSError:
+            ready = False
+        if not ready:
+            self.stats['failed'] += 1
+            reader.cleanup()
+            return None
+        self.stats['launched'] += 1
+        self.stats['launch_time'] += time.perf_counter() - start
+        return reader
+
+    def _reap(self) -> None:
+        """Drop pooled games whose process exited; reap exited leased ones (caller holds the lock)"""
+        for reader in [r for r in self._ready if r.process.poll() is not None]:
+            self._ready.remove(reader)
+            reader.cleanup()
+            self.stats['reaped'] += 1
+        for reader in self._leased:
+            reader.process.poll()  # Collect zombies; the fd is closed on release()
+
+    def _replenish(self) -> None:
+        failures = 0
+        while True:
+            with self._condition:
+                while not self._closed and len(self._ready) >= self.size:
+                    self._condition.wait(timeout=1.0)
+                    self._reap()
+                if self._closed:
+                    return
+
+            reader = self._launch()  # Outside the lock so leases are not held up
+
+            with self._condition:
+                if reader is None:
+                    failures += 1
+                    if failures >= MAX_LAUNCH_FAILURES:
+                        self._closed = True  # The binary does not start; stop retrying
+                        self._error = f"{self.game_binary} failed to start {failures} times"
+                        self._condition.notify_all()
+                        return
+                    continue
+                failures = 0
+                if self._closed:
+                    reader.cleanup()
+                    return
+                self._ready.append(reader)
+                self._condition.notify_all()
+
+    def lease(self, timeout: Optional[float] = None) -> TTYReader:
+        """Take a ready game, waiting up to `timeout` seconds for one"""
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                self._reap()
+                if self._ready:
+                    reader = self._ready.popleft()
+                    self._leased.add(reader)
+                    self.stats['leased'] += 1
+                    self._condition.notify_all()
+                    return reader
+                if self._closed:
+                    raise RuntimeError(self._error or "game pool is closed")
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("no game became ready in time")
+                self._condition.wait(remaining)
+
+    def release(self, reader: TTYReader) -> None:
+        """Return a leased game; it is stopped and its process reaped"""
+        with self._condition:
+            self._leased.discard(reader)
+        reader.cleanup()
+
+    @contextmanager
+    def game(self, timeout: Optional[float] = None):
+        """Lease a game for the duration of a with-block"""
+        reader = self.lease(timeout)
+        try:
+            yield reader
+        finally:
+            self.release(reader)
+
+    def wait_ready(self, count: int, timeout: Optional[float] = None) -> None:
+        """Block until `count` games are ready; raises like lease() if the pool closes"""
+        self.start()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while len(self._ready) < count:
+                if self._closed:
+                    raise RuntimeError(self._error or "game pool is closed")
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("games did not become ready in time")
+                self._condition.wait(remaining)
+
+    def ready_count(self) -> int:
+        with self._condition:
+            return len(self._ready)
+
+    def close(self) -> None:
+        """Stop replenishing and stop every pooled and leased game"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            games = list(self._ready) + list(self._leased)
+            self._ready.clear()
+            self._leased.clear()
+        if self._thread is not None:
+            self._thread.join()
+        for reader in games:
+            reader.cleanup()
+
+    def summary(self) -> Dict:
+        launched = self.stats['launched']
+        return dict(self.stats, mean_launch_ms=self.stats['launch_time'] / launched * 1000 if launched else 0.0)
+
+
+def _play(reader: TTYReader, moves: int, settle: float, rng: random.Random) -> int:
+    """Spam-play up to `moves` keys; returns the number sent"""
+    sent = 0
+    for _ in range(moves):
+        if reader.process.poll() is not None:
+            break
+        move = spam_policy(reader.current_board, rng)
+        if not is_noop(reader.current_board, move):
+            reader.send_move_and_wait(move, timeout=1.0, settle=settle)
+            sent += 1
+    return sent
+
+
+@click.command()
+@click.option('--games', '-g', default=20, help='Games to play back to back')
+@click.option('--size', '-k', default=4, help='Games kept launched in the pool')
+@click.option('--moves', '-m', default=50, help='Moves per game')
+@click.option('--game-binary', default='2048-cli-0.9.1/2048', help='Path to 2048 binary')
+@click.option('--game-args', default='-A', help="Game options ('-A' disables animation)")
+@click.option('--seed', default=0, help='Seed for the move policy')
+def main(games, size, moves, game_binary, game_args, seed):
+    """Compare back-to-back games with and without a pre-warmed pool"""
+    import shlex
+
+    args = shlex.split(game_args)
+    settle = 0.0 if '-A' in args else ANIMATION_SETTLE
+
+    def run(next_game, release):
+        rng = random.Random(seed)
+        waited = 0.0
+        start = time.perf_counter()
+        for _ in range(games):
+            t = time.perf_counter()
+            reader = next_game()
+            waited += time.perf_counter() - t
+            _play(reader, moves, settle, rng)
+            release(reader)
+        return waited, time.perf_counter() - start
+
+    def cold_game():
+        reader = TTYReader(game_binary, args)
+        reader._spawn()
+        if reader.wait_for_frame(timeout=5.0, since=0) is None:
+            reader.cleanup()
+            raise click.ClickException(f"{game_binary} drew no initial frame")
+        return reader
+
+    cold_wait, cold_total = run(cold_game, TTYReader.cleanup)
+    with GamePool(size, game_binary, args) as pool:
+        try:
+            pool.wait_ready(size)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        warm_wait, warm_total = run(pool.lease, pool.release)
+        stats = pool.summary()
+
+    click.echo(f"{games} games x {moves} moves")
+    click.echo(f"  cold start: {cold_total:.2f}s total, {cold_wait / games * 1000:.1f} ms/game waiting for launch")
+    click.echo(f"  pooled:     {warm_total:.2f}s total, {warm_wait / games * 1000:.1f} ms/game waiting for a lease")
+    click.echo(f"  pool: {stats['launched']} launched ({stats['mean_launch_ms']:.1f} ms each), "
+               f"{stats['failed']} failed, {stats['reaped']} reaped")
+
+
+if __name__ == "__main__":
+    main()
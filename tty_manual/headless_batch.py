@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Headless Batch Runner for 2048 - End scores from the engine's own AI mode
+
+`2048 -i` plays random AI moves without initialising any graphics and
+prints only the final score, so a game takes about a millisecond instead
+of a pty session. Games are spread over a process pool and results are
+streamed as CSV rows in the exp_009 format (run,score,time_s,max_tile),
+plus the seed each game was played with.
+
+The engine seeds with srand(time(NULL)), so games started in the same
+second are identical. Build the seed hook (make seed-shim) to give every
+game its own seed through GAME_SEED. Without it, each game's seed is the
+second it started in, and duplicate seeds are reported.
+
+The engine does not print the board, so max_tile comes from replaying
+the game in Python with the C library's own srand()/rand() (the same
+calls engine.c and ai.c make). A replay whose score differs from the
+engine's is left without max_tile.
+"""
+
+import csv
+import ctypes
+import ctypes.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import click
+
+from .simulator import WIN_EXPONENT
+
+# Engine options: AI moves, no graphics, only the final score is printed
+HEADLESS_ARGS = ('-i',)
+
+RESULT_FIELDS = ['run', 'score', 'time_s', 'max_tile', 'seed']
+
+DEFAULT_SHIM = 'libseedtime.so'
+
+_libc = None
+
+
+def _slide(line: List[int]) -> Tuple[List[int], int]:
+    """Slide exponents toward index 0 as engine.c does; returns (line, score gained)"""
+    tiles = [tile for tile in line if tile]
+    merged, gain, i = [], 0, 0
+    while i < len(tiles):
+        if i + 1 < len(tiles) and tiles[i] == tiles[i + 1]:
+            merged.append(tiles[i] + 1)
+            gain += 1 << (tiles[i] + 1)
+            i += 2
+        else:
+            merged.append(tiles[i])
+            i += 1
+    return merged + [0] * (len(line) - len(merged)), gain
+
+
+def _move(grid: List[List[int]], direction: int) -> Tuple[List[List[int]], int]:
+    """Apply a direction (MOVES order) to a row-major grid of exponents"""
+    size = len(grid)
+    columns = direction in (0, 2)  # Up and down slide along columns
+    reverse = direction in (2, 3)  # Down and right slide toward the far edge
+    lines = [list(col) for col in zip(*grid)] if columns else [row[:] for row in grid]
+    moved, total = [], 0
+    for line in lines:
+        line, gain = _slide(line[::-1] if reverse else line)
+        moved.append(line[::-1] if reverse else line)
+        total += gain
+    if columns:
+        moved = [[moved[c][r] for c in range(size)] for r in range(size)]
+    return moved, total
+
+
+def _finished(grid: List[List[int]]) -> bool:
+    """gamestate_end_condition(): a 2048 tile, or a full board without merges"""
+    size = len(grid)
+    over = True
+    for r in range(size):
+        for c in range(size):
+            tile = grid[r][c]
+            if tile == WIN_EXPONENT:
+                return True
+            if (not tile or (c + 1 < size and grid[r][c + 1] == tile)
+                    or (r + 1 < size and grid[r + 1][c] == tile)):
+                over = False
+    return over
+
+
+def replay_ai_game(seed: int, size: int = 4) -> Dict:
+    """Replay the game `2048 -i` plays after srand(seed): score, max tile and moves"""
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c'))
+    rand = _libc.rand
+    _libc.srand(ctypes.c_uint(seed))
+
+    grid = [[0] * size for _ in range(size)]
+
+    def spawn():
+        empty = [(r, c) for r in range(size) for c in range(size) if not grid[r][c]]
+        if empty:
+            r, c = empty[rand() % len(empty)]  # gamestate_new_block(), row by row
+            grid[r][c] = 1 if rand() & 3 else 2
+
+    for _ in range(3):
+        spawn()
+    score = moves = 0
+    while True:
+        moved, gain = _move(grid, rand() % 4)  # ai_move(): moves[] is 'wasd', the MOVES order
+        if moved == grid:
+            continue  # No-op: the engine asks the AI for another key
+        grid[:] = moved
+        score += gain
+        moves += 1
+        spawn()
+        if _finished(grid):
+            break
+    return {'score': score, 'max_tile': 1 << max(max(row) for row in grid), 'moves': moves}
+
+
+def _init_worker(data_root: str) -> None:
+    # Each worker's games save their high score under a private XDG_DATA_HOME
+    os.environ['XDG_DATA_HOME'] = tempfile.mkdtemp(dir=data_root)
+
+
+def play_headless(run: int, game_binary: str, seed: Optional[int] = None,
+                  shim: Optional[str] = None, replay: bool = True, timeout: float = 60.0) -> Dict:
+    """Play one `2048 -i` game and return its exp_009-style result row
+
+    With replay=False the game is not replayed and max_tile is left empty.
+    """
+    env = dict(os.environ)
+    if seed is not None and shim:
+        env['GAME_SEED'] = str(seed)
+        env['LD_PRELOAD'] = os.path.abspath(shim)
+    started = time.time()
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run([game_binary, *HEADLESS_ARGS], stdin=subprocess.DEVNULL,
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              env=env, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return {'run': run, 'error': str(e)}
+    elapsed = time.perf_counter() - start
+
+    lines = proc.stdout.split()
+    if not lines or not lines[-1].isdigit():
+        return {'run': run, 'error': f"no score in output (exit code {proc.returncode})"}
+    score = int(lines[-1])
+
+    # Without the seed hook the seed is the second the game started in
+    candidates = [seed] if seed is not None and shim else sorted({int(started), int(time.time())})
+    result = {'run': run, 'score': score, 'time_s': round(elapsed, 4), 'max_tile': '',
+              'seed': candidates[0]}
+    for candidate in candidates if replay else ():
+        replayed = replay_ai_game(candidate)
+        if replayed['score'] == score:
+            result.update(max_tile=replayed['max_tile'], seed=candidate)
+            break
+    return result
+
+
+def run_batch(n_games: int, game_binary: str = "2048-cli-0.9.1/2048", workers: int = 0,
+              base_seed: Optional[int] = None, shim: Optional[str] = None,
+              replay: bool = True) -> Iterator[Dict]:
+    """Play n_games headless games over a process pool, yielding rows in run order
+
+    With a shim, runs are numbered from 1 and run i is played with seed
+    base_seed + i - 1 (base_seed defaults to the current time).
+    """
+    workers = workers or os.cpu_count() or 1
+    if shim and base_seed is None:
+        base_seed = int(time.time())
+    data_root = tempfile.mkdtemp(prefix='2048-headless-')
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(data_root,)) as pool:
+            pending = deque()
+            for run in range(1, n_games + 1):
+                seed = base_seed + run - 1 if shim else None
+                pending.append(pool.submit(play_headless, run, game_binary, seed, shim, replay))
+                if len(pending) >= workers * 4:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    finally:
+        shutil.rmtree(data_root, ignore_errors=True)
+
+
+@click.command()
+@click.option('--games', '-g', default=1000, help='Number of games to play')
+@click.option('--workers', '-w', default=0, help='Worker processes (0 = one per CPU)')
+@click.option('--game-binary', default='2048-cli-0.9.1/2048', help='Path to 2048 binary')
+@click.option('--shim', default=DEFAULT_SHIM, type=click.Path(),
+              help='Seed hook built by make seed-shim (used if it exists)')
+@click.option('--seed', default=None, type=int, help='Seed of run 1 (run i uses seed + i - 1; needs the shim)')
+@click.option('--no-replay', is_flag=True, help='Skip the Python replay (max_tile left empty)')
+@click.option('--output', '-o', type=click.Path(), help='CSV file (default: stdout)')
+def main(games, workers, game_binary, shim, seed, no_replay, output):
+    """Collect end scores from the engine's headless AI mode"""
+    if not os.path.exists(shim):
+        click.echo(f"{shim} not found (make seed-shim): games started in the same second "
+                   "will be identical", err=True)
+        shim = None
+
+    out = open(output, 'w', newline='') if output else sys.stdout
+    writer = csv.DictWriter(out, RESULT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+
+    start = time.perf_counter()
+    played, errors, unmatched, seeds = 0, 0, 0, set()
+    for result in run_batch(games, game_binary, workers, seed, shim, not no_replay):
+        if 'error' in result:
+            errors += 1
+            click.echo(f"Run {result['run']}: {result['error']}", err=True)
+            continue
+        writer.writerow(result)
+        out.flush()
+        played += 1
+        unmatched += result['max_tile'] == ''
+        seeds.add(result['seed'])
+    elapsed = time.perf_counter() - start
+    if output:
+        out.close()
+
+    click.echo(f"Played {played} games in {elapsed:.1f}s ({played / elapsed:.0f} games/s), "
+               f"{errors} errors", err=True)
+    if played - len(seeds):
+        click.echo(f"{played - len(seeds)} games repeated another game's seed", err=True)
+    if unmatched and not no_replay:
+        click.echo(f"{unmatched} games could not be replayed (no max_tile)", err=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,28 +5,55 @@ Part of Issue #5: TTY-based 2048 controller implementation
 """
 
 import os
-import time
 import json
+import time
 import uuid
 from pathlib import Path
 from datetime import datetime, timezone
 import click
 
-from .tty_reader import TTYReader
+from .tty_reader import TTYReader, ANIMATION_SETTLE, format_board_snapshot, launch_args
 from .board_analyzer import BoardAnalyzer
+from .advisor import Advisor, DEFAULT_MAX_DEPTH, format_recommendation
+from .complexity_model import ComplexityModel
+from .policies import POLICIES, get_policy
+from .move_log import DEFAULT_FLUSH_EVERY, FSYNC_POLICIES, MoveLogWriter
+from .snapshot_writer import SnapshotWriter, percentiles_ms, write_snapshot_files
+from .snapshot_store import DEFAULT_STORE, open_store
 
 
 class ManualTestRunner:
     """Runs 2048 with automated spam and manual inspection points"""
     
-    def __init__(self, spam_moves=50, check_interval=10, complexity_threshold=70):
+    def __init__(self, spam_moves=50, check_interval=10, complexity_threshold=70, model=None,
+                 risk_horizon=3, settle=ANIMATION_SETTLE, game_binary="2048-cli-0.9.1/2048",
+                 game_args=(), screen=False, pipeline=1, paced=False, advisor=None, policy=None,
+                 log_flush=DEFAULT_FLUSH_EVERY, log_fsync='never', background_io=True,
+                 snapshot_store=DEFAULT_STORE):
         self.spam_moves = spam_moves
         self.check_interval = check_interval
         self.complexity_threshold = complexity_threshold
+        self.model = model  # Optional ComplexityModel replacing the fixed weights
+        self.risk_horizon = risk_horizon
+        self.settle = settle  # Quiet time that ends a move animation
+        self.pipeline = pipeline  # Spam keys written per batch (1 = wait for every frame)
+        self.paced = paced        # Space pipelined keys by the reader's adaptive pacer
+        self.advisor = advisor    # Searches moves in the background during inspections
+        self.policy = policy      # Registered Policy for spam moves (None = down-right spam)
+        self.log_flush = log_flush  # Move records buffered per write to moves.bin
+        self.log_fsync = log_fsync  # When moves.bin is forced to disk: never, flush or close
+        self.writer = SnapshotWriter() if background_io else None  # Snapshot/log I/O thread
+        self.writer_stats = None
+        self.io_times = []  # Control-loop time spent in each snapshot or log call
+        # Shared deduplicated board store (None = move_XXXX.txt/.json files under boards/)
+        self.snapshot_store = open_store(snapshot_store) if snapshot_store else None
+        self.game_over_risk = 0.0
+        self.max_game_over_risk = 0.0
         self.test_guid = str(uuid.uuid4())
         self.move_count = 0
+        self.status = "completed"  # Written to summary.json
         self.log_dir = Path(f"logs/manual_test_{self.test_guid}")
-        self.reader = TTYReader()
+        self.reader = TTYReader(game_binary, game_args, screen)
         
         # Setup logging directories
         self.log_dir.mkdir(parents=True, exist_ok=True)
@@ -45,36 +72,84 @@ class ManualTestRunner:
             "spam_moves": self.spam_moves,
             "check_interval": self.check_interval,
             "complexity_threshold": self.complexity_threshold,
-            "strategy": "down_right_spam"
+            "complexity_model": self.model.to_dict() if self.model else None,
+            "risk_horizon": self.risk_horizon,
+            "game": [self.reader.game_binary] + self.reader.game_args,
+            "screen_emulation": self.reader.screen is not None,
+            "pipeline": self.pipeline,
+            "paced": self.paced,
+            "strategy": self.policy.name if self.policy else "down_right_spam",
+            "move_log": {"file": "moves.bin", "flush_every": self.log_flush, "fsync": self.log_fsync},
+            "background_io": self.writer is not None,
+            "snapshot_store": str(self.snapshot_store.path) if self.snapshot_store else None
         }
         with open(self.log_dir / "config.json", "w") as f:
             json.dump(config, f, indent=2)
             
     def _init_move_log(self):
-        """Initialize move log file"""
-        with open(self.log_dir / "moves.log", "w") as f:
-            f.write(f"# Move log for test {self.test_guid}\n")
-            f.write("# Format: move_number,direction,timestamp,score,complexity\n")
+        """Open the binary move log (move-log convert turns it into moves.log text)"""
+        self.move_log = MoveLogWriter(self.log_dir / "moves.bin", self.test_guid,
+                                      self.log_flush, self.log_fsync)
             
     def _log_move(self, direction, score=0, complexity=0):
-        """Log a move to the moves file"""
-        with open(self.log_dir / "moves.log", "a") as f:
-            timestamp = datetime.now(timezone.utc).isoformat() + "Z"
-            f.write(f"{self.move_count},{direction},{timestamp},{score},{complexity:.1f}\n")
+        """Log a move and the board it produced"""
+        start = time.perf_counter()
+        board = [row[:] for row in self.reader.current_board] if self.reader.current_board else None
+        # Timestamped here: the writer thread may run the append a batch later
+        args = (self.move_count, direction, score or 0, complexity, board, time.monotonic_ns())
+        if self.writer is not None:
+            self.writer.submit(lambda: self.move_log.append(*args))
+        else:
+            self.move_log.append(*args)
+        self.io_times.append(time.perf_counter() - start)
             
     def _save_board_snapshot(self):
-        """Save current board state"""
+        """Save current board state to the snapshot store, or as text and JSON files"""
         if self.reader.current_board:
-            board_file = self.log_dir / "boards" / f"move_{self.move_count:04d}.txt"
-            self.reader.save_board_snapshot(str(board_file))
-            
-            # Also save as JSON for analysis
-            json_file = self.log_dir / "boards" / f"move_{self.move_count:04d}.json"
-            with open(json_file, "w") as f:
-                json.dump(self.reader.get_board_dict(), f, indent=2)
+            start = time.perf_counter()
+            if self.snapshot_store is not None:
+                snapshot = (self.move_count, [row[:] for row in self.reader.current_board],
+                            self.reader.current_score, self.reader.high_score, time.time_ns())
+                write = lambda: self._store_snapshot(*snapshot)
+            else:
+                base = self.log_dir / "boards" / f"move_{self.move_count:04d}"
+                text = format_board_snapshot(self.reader.current_board, self.reader.current_score,
+                                             self.reader.high_score)
+                # Rendered here: the thread only writes, so it rarely holds the GIL the loop needs
+                data = json.dumps(self.reader.get_board_dict(), indent=2)
+                write = lambda: write_snapshot_files(base, text, data)
+            if self.writer is not None:
+                self.writer.submit(write, droppable=True)
+            else:
+                write()
+            self.io_times.append(time.perf_counter() - start)
+
+    def _store_snapshot(self, move, board, score, high_score, time_ns):
+        """Add a snapshot to the store; boards without a packed key go to boards/ files"""
+        try:
+            self.snapshot_store.put(self.test_guid, move, board, score, high_score, time_ns)
+        except ValueError:
+            timestamp = datetime.fromtimestamp(time_ns / 1e9, timezone.utc).isoformat()
+            write_snapshot_files(self.log_dir / "boards" / f"move_{move:04d}",
+                                 format_board_snapshot(board, score, high_score),
+                                 json.dumps({'board': board, 'score': score, 'high_score': high_score,
+                                             'timestamp': timestamp}, indent=2))
                 
-    def _get_spam_move(self):
-        """Get next move for spam phase (down-right strategy)"""
+    def _show_cached_advice(self):
+        """After a manual move, print what the inspection's search knows about the new board"""
+        hint = self.advisor.lookup(self.reader.current_board) if self.advisor is not None else None
+        if hint is not None:
+            click.echo(f"\nAfter {self.move_count}:{format_recommendation(hint)}")
+
+    def _get_spam_move(self, use_policy=True):
+        """Get next move for spam phase (down-right strategy)
+
+        A pipelined batch is written before any of its boards is seen, so it
+        passes use_policy=False: the policy would be asked N times about the
+        same board, and stateful policies would take it for a stuck game.
+        """
+        if use_policy and self.policy is not None:
+            return self.policy.decide(self.reader.current_board)
         import random
         # 40% down, 30% right, 20% left, 10% up
         rand = random.random()
@@ -87,13 +162,42 @@ class ManualTestRunner:
         else:
             return 'w'  # up
             
+    def _spam_pipelined(self):
+        """Play the spam phase in pipelined batches; returns False once the game is over"""
+        while self.move_count < self.spam_moves:
+            count = min(self.pipeline, self.spam_moves - self.move_count)
+            records = self.reader.send_moves([self._get_spam_move(use_policy=False) for _ in range(count)],
+                                             paced=self.paced)
+            for record in records:
+                self.move_count += 1
+                if record.get('board') is None:
+                    break
+                self.reader.current_board = record['board']
+                self.reader.current_score = record['score']
+                if self.move_count % 10 == 0:
+                    self._save_board_snapshot()
+                analyzer = BoardAnalyzer(record['board'], self.model)
+                complexity = analyzer.get_complexity_score()['complexity']
+                self.game_over_risk = analyzer.get_game_over_risk(self.risk_horizon)
+                self.max_game_over_risk = max(self.max_game_over_risk, self.game_over_risk)
+                self._log_move(record['move'], record['score'], complexity)
+                click.echo(".", nl=False)
+            if records and records[-1].get('game_over'):
+                self.reader.current_score = records[-1]['score']
+                return False
+            if records and records[-1].get('timeout'):
+                click.echo("\nNo frame for a pipelined move; continuing one move at a time")
+                return True
+        return True
+
     def _check_complexity(self):
         """Check if board needs manual inspection"""
         if not self.reader.current_board:
             return False
             
-        analyzer = BoardAnalyzer(self.reader.current_board)
+        analyzer = BoardAnalyzer(self.reader.current_board, self.model)
         scores = analyzer.get_complexity_score()
+        scores['game_over_risk'] = self.game_over_risk
         
         return scores['complexity'] >= self.complexity_threshold, scores
         
@@ -108,10 +212,11 @@ class ManualTestRunner:
         click.echo(f"Move: {self.move_count}")
         click.echo(f"Score: {self.reader.current_score}")
         click.echo(f"Complexity: {complexity_scores['complexity']:.1f}/100")
+        click.echo(f"Game over risk ({self.risk_horizon} moves): {self.game_over_risk * 100:.1f}%")
         click.echo("")
         
         # Display board
-        analyzer = BoardAnalyzer(self.reader.current_board)
+        analyzer = BoardAnalyzer(self.reader.current_board, self.model)
         analyzer.display_analysis()
         
         # Save checkpoint
@@ -119,8 +224,12 @@ class ManualTestRunner:
             f.write(f"Manual Inspection at Move {self.move_count}\n")
             f.write(f"Complexity: {complexity_scores['complexity']:.1f}\n")
             f.write(f"Score: {self.reader.current_score}\n")
-            f.write(json.dumps(complexity_scores, indent=2))
+            f.write(json.dumps(complexity_scores, indent=2, default=lambda v: v.item()))
         
+        # Search moves while the operator decides; recommendations print as they improve
+        advising = self.advisor is not None and self.advisor.start(
+            self.reader.current_board, lambda recommendation: click.echo(format_recommendation(recommendation)))
+
         # Get user decision
         click.echo("\nOptions:")
         click.echo("  [c] Continue auto-spam")
@@ -128,13 +237,23 @@ class ManualTestRunner:
         click.echo("  [s] Switch strategy (not implemented)")
         click.echo("  [q] Quit and analyze")
         
-        choice = click.prompt("Choice", type=click.Choice(['c', 'm', 's', 'q']))
+        try:
+            choice = click.prompt("Choice", type=click.Choice(['c', 'm', 's', 'q']))
+            if choice == 'm':
+                suggestion = self.advisor.recommendation() if advising else None
+                move = click.prompt("Enter move", type=click.Choice(['w', 'a', 's', 'd']),
+                                    default=suggestion['move'] if suggestion else None)
+        finally:
+            suggestion = self.advisor.recommendation() if advising else None
+            if advising:
+                self.advisor.stop()
         
         with open(checkpoint_file, "a") as f:
             f.write(f"\nUser choice: {choice}\n")
+            if suggestion:
+                f.write(f"Advisor: {suggestion['move']} at depth {suggestion['depth']}\n")
             
         if choice == 'm':
-            move = click.prompt("Enter move", type=click.Choice(['w', 'a', 's', 'd']))
             with open(checkpoint_file, "a") as f:
                 f.write(f"Manual move: {move}\n")
             return move
@@ -152,21 +271,24 @@ class ManualTestRunner:
         click.echo(f"Complexity threshold: {self.complexity_threshold}")
         click.echo("")
         
-        # Start game
-        self.reader.start_game()
-        time.sleep(0.5)
-        
-        # Get initial board
-        output = self.reader.read_output()
-        if not self.reader.parse_board_state(output):
-            click.echo("Failed to parse initial board!", err=True)
-            return
-            
-        click.echo(f"Initial score: {self.reader.current_score}")
-        click.echo(f"High score: {self.reader.high_score}")
-        
-        # Main game loop
+        # Main game loop (the finally drains the writer and closes the logs on every path)
         try:
+            # Start game
+            self.reader.start_game()
+
+            # Get initial board
+            if self.reader.wait_for_frame(timeout=2.0, settle=self.settle, since=0) is None:
+                click.echo("Failed to parse initial board!", err=True)
+                self.status = "no_initial_board"
+                return
+
+            click.echo(f"Initial score: {self.reader.current_score}")
+            click.echo(f"High score: {self.reader.high_score}")
+
+            if self.pipeline > 1 and not self._spam_pipelined():
+                click.echo("\nGame Over!")
+                return
+
             while self.move_count < 1000:  # Safety limit
                 self.move_count += 1
                 
@@ -175,6 +297,7 @@ class ManualTestRunner:
                     self._save_board_snapshot()
                 
                 # Determine next move
+                manual_move = False
                 if self.move_count <= self.spam_moves:
                     # Auto-spam phase
                     move = self._get_spam_move()
@@ -191,10 +314,12 @@ class ManualTestRunner:
                                 break
                             elif result:  # Manual move
                                 move = result
+                                manual_move = True
                             else:  # Continue spam
                                 move = self._get_spam_move()
                         else:
-                            click.echo(f"Move {self.move_count}: Complexity {scores['complexity']:.1f} - continuing auto-spam")
+                            click.echo(f"Move {self.move_count}: Complexity {scores['complexity']:.1f}, "
+                                       f"risk {self.game_over_risk * 100:.1f}% - continuing auto-spam")
                             move = self._get_spam_move()
                     else:
                         move = self._get_spam_move()
@@ -202,21 +327,22 @@ class ManualTestRunner:
                 
                 # Send move
                 try:
-                    self.reader.send_move(move)
-                    time.sleep(0.2)
+                    latency = self.reader.send_move_and_wait(move, settle=self.settle)
                     
-                    # Read result
-                    output = self.reader.read_output()
-                    if self.reader.parse_board_state():
+                    if latency is not None:
                         # Log move with score and complexity
-                        analyzer = BoardAnalyzer(self.reader.current_board)
+                        analyzer = BoardAnalyzer(self.reader.current_board, self.model)
                         complexity = analyzer.get_complexity_score()['complexity']
+                        self.game_over_risk = analyzer.get_game_over_risk(self.risk_horizon)
+                        self.max_game_over_risk = max(self.max_game_over_risk, self.game_over_risk)
                         self._log_move(move, self.reader.current_score, complexity)
-                        
-                        # Check for game over
-                        if "Game over" in output:
-                            click.echo("\nGame Over!")
-                            break
+                        if manual_move:
+                            self._show_cached_advice()
+                    
+                    # The engine exits without a final frame when the game ends
+                    if self.reader.process.poll() is not None:
+                        click.echo("\nGame Over!")
+                        break
                 except OSError as e:
                     click.echo(f"\nI/O Error: {e}")
                     click.echo("Game process may have ended")
@@ -228,23 +354,52 @@ class ManualTestRunner:
         finally:
             self._finish_test()
             self.reader.cleanup()
+            if self.advisor is not None:
+                self.advisor.close()
             
-    def _finish_test(self):
-        """Save final test summary"""
+    def _write_summary(self):
+        """Save the final test summary to summary.json and return it"""
+        if self.writer is not None:
+            self.writer_stats = self.writer.close()  # Drain queued snapshots and log records first
+        self.move_log.close()
         summary = {
             "test_guid": self.test_guid,
             "end_time": datetime.now(timezone.utc).isoformat() + "Z",
             "total_moves": self.move_count,
             "final_score": self.reader.current_score,
-            "status": "completed"
+            "max_game_over_risk": self.max_game_over_risk,
+            "move_latency": self.reader.latency_stats(),
+            "logged_moves": self.move_log.records,
+            "io_latency": percentiles_ms(self.io_times),
+            "snapshot_writer": self.writer_stats,
+            "pacing": {"delay_ms": self.reader.pacer.delay * 1000,
+                       "moves_per_second": self.reader.pacer.moves_per_second(),
+                       "slowdowns": self.reader.pacer.slowdowns} if self.paced else None,
+            "status": self.status
         }
         
         with open(self.log_dir / "summary.json", "w") as f:
             json.dump(summary, f, indent=2)
-            
+        return summary
+
+    def _finish_test(self):
+        """Save final test summary"""
+        summary = self._write_summary()
         click.echo(f"\n\nTest completed!")
         click.echo(f"Total moves: {self.move_count}")
         click.echo(f"Final score: {self.reader.current_score}")
+        latency = summary["move_latency"]
+        if latency['moves']:
+            click.echo(f"Move latency: mean {latency['mean_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms "
+                       f"({latency['moves_per_second']:.1f} moves/s)")
+        if self.paced:
+            pacing = summary["pacing"]
+            click.echo(f"Pacing: {pacing['moves_per_second']:.0f} moves/s drawn, "
+                       f"delay {pacing['delay_ms']:.2f} ms, {pacing['slowdowns']} slowdowns")
+        writer = summary["snapshot_writer"]
+        if writer and (writer['dropped'] or writer['stalls'] or writer['errors']):
+            click.echo(f"Snapshot writer: {writer['dropped']} snapshots dropped, {writer['stalls']} stalls, "
+                       f"{writer['errors']} write errors ({writer['last_error']})")
         click.echo(f"Results saved to: {self.log_dir}")
 
 
@@ -252,9 +407,42 @@ class ManualTestRunner:
 @click.option('--spam-moves', '-s', default=50, help='Number of initial spam moves')
 @click.option('--check-interval', '-i', default=10, help='Moves between complexity checks')
 @click.option('--threshold', '-t', default=70, help='Complexity threshold for manual inspection')
-def main(spam_moves, check_interval, threshold):
+@click.option('--model', 'model_file', type=click.Path(exists=True),
+              help='Trained complexity model (see complexity-model train)')
+@click.option('--risk-horizon', default=3, help='Moves ahead for the exact game-over risk')
+@click.option('--settle', default=ANIMATION_SETTLE,
+              help='Quiet time (s) that ends a move animation (0 for games run with -A)')
+@click.option('--game-binary', default='2048-cli-0.9.1/2048', help='Path to 2048 binary')
+@click.option('--game-args', default='', help="Extra game options, e.g. '-A -c'")
+@click.option('--screen', is_flag=True, help='Read the board through the terminal emulator (curses/colour builds)')
+@click.option('--pipeline', '-p', default=1, help='Spam keys written per batch (needs the raw parser)')
+@click.option('--pace', is_flag=True, help='Space pipelined keys by measured render rate and pty backlog')
+@click.option('--turbo', is_flag=True, help='Launch with animation disabled (-A) and no settle time')
+@click.option('--advisor-depth', default=DEFAULT_MAX_DEPTH,
+              help='Deepest background search during inspections (0 disables the advisor)')
+@click.option('--policy', type=click.Choice(sorted(POLICIES)), default=None,
+              help='Registered policy for spam moves (4x4 only; pipelined batches and the default '
+                   'use down-right spam)')
+@click.option('--log-flush', default=DEFAULT_FLUSH_EVERY, help='Move records buffered per write to moves.bin')
+@click.option('--log-fsync', type=click.Choice(FSYNC_POLICIES), default='never',
+              help='Force moves.bin to disk on every flush, at close, or never')
+@click.option('--sync-io', is_flag=True, help='Write snapshots and log records in the move loop (no writer thread)')
+@click.option('--snapshot-store', default=str(DEFAULT_STORE),
+              help="Deduplicated board store shared by sessions ('' writes boards/move_XXXX files)")
+def main(spam_moves, check_interval, threshold, model_file, risk_horizon, settle,
+         game_binary, game_args, screen, pipeline, pace, turbo, advisor_depth, policy,
+         log_flush, log_fsync, sync_io, snapshot_store):
     """Run manual test with TTY reader and board analyzer"""
-    runner = ManualTestRunner(spam_moves, check_interval, threshold)
+    import shlex
+    model = ComplexityModel.load(model_file) if model_file else None
+    args = launch_args(shlex.split(game_args), turbo)
+    if turbo:
+        settle = 0.0
+    runner = ManualTestRunner(spam_moves, check_interval, threshold, model, risk_horizon, settle,
+                              game_binary, args, screen, pipeline, pace,
+                              Advisor(advisor_depth) if advisor_depth else None,
+                              get_policy(policy) if policy else None, log_flush, log_fsync,
+                              background_io=not sync_io, snapshot_store=snapshot_store or None)
     runner.run()
 
 
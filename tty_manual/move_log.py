@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Binary Move Log for 2048 - Fixed-size move records behind a buffered writer
+
+ManualTestRunner used to open, append to and close moves.log and format
+an ISO timestamp for every move. moves.bin replaces it: a 64-byte header
+followed by one 32-byte record per move:
+
+  move number  uint32
+  direction    uint8   (the key's ASCII code)
+  flags        uint8   (FLAG_BOARD: the board field holds a packed board)
+  timestamp    int64   (time.monotonic_ns())
+  score        uint32
+  complexity   float32
+  board        uint64  (board_io.pack_board key, 0 for non-4x4 boards)
+
+The header stores the wall clock and monotonic clock read together, so
+timestamps convert back to the legacy UTC strings. Records go through a
+buffered file: flush_every records are written per flush, and fsync
+selects when the data is forced to disk ('never', 'flush' or 'close').
+A record torn by a crash is ignored by the reader.
+
+MoveLogReader maps the file and exposes the records as a numpy structured
+array; to_legacy_lines() and `move-log convert` emit the old moves.log text.
+"""
+
+import mmap
+import os
+import struct
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional
+import click
+import numpy as np
+
+from .board_io import Board, pack_board, unpack_board
+
+MAGIC = b'2048MOV1'
+HEADER = struct.Struct('<8sIqq36s')   # magic, record size, wall ns, monotonic ns, test guid
+RECORD = struct.Struct('<IBBxxqIfQ')  # See the module docstring
+RECORD_DTYPE = np.dtype([('move', '<u4'), ('direction', 'u1'), ('flags', 'u1'), ('pad', 'V2'),
+                         ('timestamp_ns', '<i8'), ('score', '<u4'), ('complexity', '<f4'),
+                         ('board', '<u8')])
+FLAG_BOARD = 1
+FSYNC_POLICIES = ('never', 'flush', 'close')
+DEFAULT_FLUSH_EVERY = 64
+
+LEGACY_HEADER = "# Format: move_number,direction,timestamp,score,complexity"
+
+
+class MoveLogWriter:
+    """Appends move records to a moves.bin file through a buffer"""
+
+    def __init__(self, path, test_guid: str = '', flush_every: int = DEFAULT_FLUSH_EVERY,
+                 fsync: str = 'never'):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC_POLICIES)}")
+        self.path = Path(path)
+        self.flush_every = max(1, flush_every)
+        self.fsync = fsync
+        self.records = 0
+        self._pending = 0
+        self._file = open(self.path, 'wb', buffering=RECORD.size * self.flush_every + HEADER.size)
+        self._file.write(HEADER.pack(MAGIC, RECORD.size, time.time_ns(), time.monotonic_ns(),
+                                     test_guid.encode()[:36]))
+
+    def append(self, move: int, direction: str, score: int = 0, complexity: float = 0.0,
+               board: Optional[Board] = None, timestamp_ns: Optional[int] = None) -> None:
+        """Buffer one record; flushes every flush_every records
+
+        timestamp_ns (time.monotonic_ns(), default now) lets a caller that
+        defers the append record when the move actually happened.
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+        key, flags = 0, 0
+        if board:
+            try:
+                key, flags = pack_board(board), FLAG_BOARD
+            except ValueError:
+                pass  # Non-4x4 board or tile above 32768: the record keeps no board
+        self._file.write(RECORD.pack(move, ord(direction[:1] or '?'), flags, timestamp_ns,
+                                     score, complexity, key))
+        self.records += 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        self._file.flush()
+        self._pending = 0
+        if self.fsync == 'flush':
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush()
+        if self.fsync == 'close':
+            os.fsync(self._file.fileno())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MoveLogReader:
+    """Memory-mapped view of a moves.bin file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"{path} is too short for a move log")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, record_size, self.wall_ns, self.monotonic_ns, guid = HEADER.unpack_from(self._map)
+        if magic != MAGIC or record_size != RECORD.size:
+            self._map.close()
+            raise ValueError(f"{path} is not a move log")
+        self.test_guid = guid.rstrip(b'\0').decode()
+        count = (size - HEADER.size) // RECORD.size  # A torn last record is ignored
+        self.records = np.frombuffer(self._map, RECORD_DTYPE, count, HEADER.size)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def wall_time(self, timestamp_ns: int) -> datetime:
+        """UTC time of a record's monotonic timestamp"""
+        return datetime.fromtimestamp((self.wall_ns + int(timestamp_ns) - self.monotonic_ns) / 1e9,
+                                      timezone.utc)
+
+    def boards(self) -> List[Optional[Board]]:
+        return [unpack_board(record['board']) if record['flags'] & FLAG_BOARD else None
+                for record in self.records]
+
+    def to_legacy_lines(self) -> Iterator[str]:
+        """The moves.log text ManualTestRunner used to write, line by line"""
+        yield f"# Move log for test {self.test_guid}"
+        yield LEGACY_HEADER
+        for record in self.records:
+            timestamp = self.wall_time(record['timestamp_ns']).isoformat() + "Z"
+            yield (f"{record['move']},{chr(record['direction'])},{timestamp},"
+                   f"{record['score']},{record['complexity']:.1f}")
+
+    def close(self) -> None:
+        self.records = None  # Drop the view before unmapping
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # A caller still holds a slice of the records; unmapped when it is freed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@click.group()
+def main():
+    """Inspect and convert binary move logs (moves.bin)"""
+
+
+@main.command()
+@click.argument('log_file', type=click.Path(exists=True))
+@click.option('--output', '-o', type=click.Path(), help='Text file (default: stdout)')
+def convert(log_file, output):
+    """Write a moves.bin file as legacy moves.log text"""
+    with MoveLogReader(log_file) as log:
+        lines = '\n'.join(log.to_legacy_lines()) + '\n'
+    if output:
+        Path(output).write_text(lines)
+    else:
+        click.echo(lines, nl=False)
+
+
+@main.command()
+@click.argument('log_file', type=click.Path(exists=True))
+def info(log_file):
+    """Summarize a moves.bin file"""
+    with MoveLogReader(log_file) as log:
+        records = log.records
+        click.echo(f"Test {log.test_guid}: {len(log)} moves")
+        if len(log):
+            seconds = (int(records['timestamp_ns'][-1]) - int(records['timestamp_ns'][0])) / 1e9
+            keys, counts = np.unique(records['direction'], return_counts=True)
+            click.echo(f"Started {log.wall_time(records['timestamp_ns'][0]).isoformat()}, "
+                       f"{seconds:.1f}s of moves ({len(log) / max(seconds, 1e-9):.1f} moves/s)")
+            click.echo(f"Final score {records['score'][-1]}, max complexity {records['complexity'].max():.1f}")
+            click.echo("Keys: " + ', '.join(f"{chr(k)} {c}" for k, c in zip(keys, counts)))
+            click.echo(f"{int((records['flags'] & FLAG_BOARD).astype(bool).sum())} records with boards")
+
+
+if __name__ == "__main__":
+    main()
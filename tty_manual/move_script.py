@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Move Scripts for 2048 - A compact strategy language compiled to Python
+
+Experiments wrote strategies as literal key strings ("sdsdsd...q") or as
+separate expect scripts. A move script covers both in one line:
+
+  sdsd              keys in order; q ends the script
+  (sd)*10  s*3      repeat a group (or a single key) n times
+  (sd)*             repeat forever
+  {s:4 d:3 a:2 w:1} weighted random choice (weight defaults to 1)
+  [empty < 4 ? d : s]          condition with optional else branch
+  <can_s ? s>                  repeat while the condition holds
+  # comment                    to the end of the line
+
+Conditions compare board features (see FEATURES) with numbers and combine
+them with and/or/not, e.g. [corner and max >= 256 ? (sd)*2 : {a w}].
+
+A script is parsed and compiled once into a Python generator function,
+so playing it costs one generator resume per key; features are computed
+only when a condition reads them, at most once per board.
+"""
+
+import math
+import random
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import click
+import numpy as np
+
+from .board_analyzer import BoardAnalyzer, grid_move
+from .simulator import MOVES, BatchSimulator, to_values
+
+Board = List[List[int]]
+
+
+def _max_position(state) -> Tuple[int, int]:
+    board = state.board
+    top = state.get('max')
+    for r, row in enumerate(board):
+        for c, cell in enumerate(row):
+            if cell == top:
+                return r, c
+    return -1, -1
+
+
+def _in_corner(state) -> bool:
+    row, col = state.get('position')
+    return row in (0, len(state.board) - 1) and col in (0, len(state.board[0]) - 1)
+
+
+def _merges(state) -> int:
+    board = state.board
+    pairs = sum(a == b != 0 for row in board for a, b in zip(row, row[1:]))
+    return pairs + sum(a == b != 0 for col in zip(*board) for a, b in zip(col, col[1:]))
+
+
+def _can(direction: int) -> Callable:
+    return lambda state: grid_move(state.get('grid'), direction) != state.get('grid')
+
+
+# Board features a condition can read, by name
+FEATURES: Dict[str, Callable] = {
+    'empty': lambda state: sum(cell == 0 for row in state.board for cell in row),
+    'max': lambda state: max(max(row) for row in state.board),
+    'row': lambda state: state.get('position')[0],
+    'col': lambda state: state.get('position')[1],
+    'corner': _in_corner,
+    'merges': _merges,
+    'complexity': lambda state: BoardAnalyzer(state.board).get_complexity_score()['complexity'],
+    'moved': lambda state: state.previous is not None and state.board != state.previous,
+    'moves': lambda state: state.moves,
+    **{f'can_{key}': _can(direction) for direction, key in enumerate(MOVES)},
+}
+
+# Helpers other features are computed from; not readable by scripts
+_HELPERS: Dict[str, Callable] = {
+    'grid': lambda state: tuple(map(tuple, state.board)),
+    'position': _max_position,
+}
+
+_COMPARISONS = ('<=', '>=', '==', '!=', '<', '>', '=')
+
+
+class ScriptState:
+    """The board a running script sees, with features cached per board"""
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+        self.board: Optional[Board] = None
+        self.previous: Optional[Board] = None
+        self.moves = 0  # Keys the script has produced so far
+        self._cache: Dict[str, object] = {}
+
+    def update(self, board: Board) -> None:
+        self.previous, self.board = self.board, board
+        self._cache.clear()
+
+    def get(self, name: str):
+        try:
+            return self._cache[name]
+        except KeyError:
+            value = self._cache[name] = (FEATURES.get(name) or _HELPERS[name])(self)
+            return value
+
+
+class _Parser:
+    """Recursive-descent parser from script text to a node tree
+
+    Nodes are tuples: ('move', key), ('quit',), ('seq', [nodes]),
+    ('repeat', node, count or None), ('choice', [(node, weight)]),
+    ('if', condition, then, else) and ('while', condition, body), where
+    conditions are already Python expressions.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.features = set()
+
+    def error(self, message: str):
+        return ValueError(f"move script, column {self.pos + 1}: {message}")
+
+    def skip(self) -> None:
+        text = self.text
+        while self.pos < len(text):
+            if text[self.pos] in ' \t\r\n,;':
+                self.pos += 1
+            elif text[self.pos] == '#':
+                end = text.find('\n', self.pos)
+                self.pos = len(text) if end < 0 else end
+            else:
+                break
+
+    def peek(self) -> str:
+        self.skip()
+        return self.text[self.pos] if self.pos < len(self.text) else ''
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self.error(f"expected {char!r}")
+        self.pos += 1
+
+    def number(self) -> str:
+        self.skip()
+        start = self.pos
+        while self.pos < len(self.text) and (self.text[self.pos].isdigit() or self.text[self.pos] == '.'):
+            self.pos += 1
+        token = self.text[start:self.pos]
+        try:
+            float(token)
+        except ValueError:
+            self.pos = start
+            raise self.error(f"expected a number, got {token!r}" if token else "expected a number") from None
+        return token
+
+    def word(self) -> str:
+        self.skip()
+        start = self.pos
+        while self.pos < len(self.text) and (self.text[self.pos].isalnum() or self.text[self.pos] == '_'):
+            self.pos += 1
+        return self.text[start:self.pos]
+
+    def script(self):
+        node = self.sequence()
+        if self.peek():
+            raise self.error(f"unexpected {self.peek()!r}")
+        return node
+
+    def sequence(self):
+        items = []
+        while self.peek() and self.peek() not in ')}]>:':
+            items.append(self.item())
+        return ('seq', items)
+
+    def item(self):
+        node = self.atom()
+        if self.peek() == '*':
+            self.pos += 1
+            count = None
+            if self.peek().isdigit():
+                start, token = self.pos, self.number()
+                if not token.isdigit():
+                    self.pos = start
+                    raise self.error(f"repeat count must be a whole number, got {token!r}")
+                count = int(token)
+            node = ('repeat', node, count)
+        return node
+
+    def atom(self):
+        char = self.peek()
+        if char and char in MOVES:
+            self.pos += 1
+            return ('move', char)
+        if char == 'q':
+            self.pos += 1
+            return ('quit',)
+        if char == '(':
+            self.pos += 1
+            node = self.sequence()
+            self.expect(')')
+            return node
+        if char == '{':
+            self.pos += 1
+            options = []
+            while self.peek() not in ('}', ''):
+                node = self.item()
+                weight = 1.0
+                if self.peek() == ':':
+                    self.pos += 1
+                    weight = float(self.number())
+                options.append((node, weight))
+            self.expect('}')
+            if not options or sum(weight for _, weight in options) <= 0:
+                raise self.error("a choice needs options with positive weight")
+            return ('choice', options)
+        if char == '[':
+            self.pos += 1
+            condition = self.condition()
+            self.expect('?')
+            then = self.sequence()
+            otherwise = ('seq', [])
+            if self.peek() == ':':
+                self.pos += 1
+                otherwise = self.sequence()
+            self.expect(']')
+            return ('if', condition, then, otherwise)
+        if char == '<':
+            self.pos += 1
+            condition = self.condition()
+            self.expect('?')
+            body = self.sequence()
+            self.expect('>')
+            return ('while', condition, body)
+        raise self.error(f"unexpected {char!r}" if char else "unexpected end of script")
+
+    def condition(self) -> str:
+        terms = [self.conjunction()]
+        while self.keyword('or'):
+            terms.append(self.conjunction())
+        return terms[0] if len(terms) == 1 else '(' + ' or '.join(terms) + ')'
+
+    def conjunction(self) -> str:
+        terms = [self.negation()]
+        while self.keyword('and'):
+            terms.append(self.negation())
+        return terms[0] if len(terms) == 1 else '(' + ' and '.join(terms) + ')'
+
+    def negation(self) -> str:
+        if self.keyword('not'):
+            return f'(not {self.negation()})'
+        left = self.operand()
+        self.skip()
+        for op in _COMPARISONS:
+            if self.text.startswith(op, self.pos):
+                self.pos += len(op)
+                return f"({left} {'==' if op == '=' else op} {self.operand()})"
+        return left
+
+    def operand(self) -> str:
+        char = self.peek()
+        if char == '(':
+            self.pos += 1
+            inner = self.condition()
+            self.expect(')')
+            return inner
+        if char.isdigit():
+            return self.number()
+        start = self.pos
+        name = self.word()
+        if name not in FEATURES:
+            self.pos = start
+            raise self.error(f"unknown feature {name!r} (known: {', '.join(FEATURES)})" if name
+                             else "expected a feature or a number")
+        self.features.add(name)
+        return f'_get({name!r})'
+
+    def keyword(self, word: str) -> bool:
+        self.skip()
+        end = self.pos + len(word)
+        if self.text.startswith(word, self.pos) and not self.text[end:end + 1].isalnum():
+            self.pos = end
+            return True
+        return False
+
+
+def _min_moves(node) -> float:
+    """Fewest keys a node can produce before finishing (inf if it always quits)"""
+    kind = node[0]
+    if kind == 'move':
+        return 1
+    if kind == 'quit':
+        return math.inf
+    if kind == 'seq':
+        return sum(_min_moves(item) for item in node[1])
+    if kind == 'repeat':
+        return _min_moves(node[1]) * (node[2] if node[2] is not None else math.inf)
+    if kind == 'choice':
+        return min(_min_moves(option) for option, _ in node[1])
+    if kind == 'if':
+        return min(_min_moves(node[2]), _min_moves(node[3]))
+    return 0  # while: the condition may be false at once
+
+
+def _check_loops(node) -> None:
+    """Reject loops that could spin forever without producing a key"""
+    kind = node[0]
+    if kind in ('repeat', 'while'):
+        body = node[1] if kind == 'repeat' else node[2]
+        if (kind == 'while' or node[2] is None) and _min_moves(body) == 0:
+            raise ValueError("move script: a loop body can finish without a key")
+    children = {'seq': lambda: node[1], 'repeat': lambda: [node[1]],
+                'choice': lambda: [option for option, _ in node[1]],
+                'if': lambda: node[2:], 'while': lambda: [node[2]]}.get(kind, list)()
+    for child in children:
+        _check_loops(child)
+
+
+def _emit(node, lines: List[str], depth: int) -> None:
+    pad = '    ' * depth
+    kind = node[0]
+    if kind == 'move':
+        lines.append(f"{pad}yield {node[1]!r}")
+    elif kind == 'quit':
+        lines.append(f"{pad}return")
+    elif kind == 'seq':
+        if not node[1]:
+            lines.append(f"{pad}pass")
+        for item in node[1]:
+            _emit(item, lines, depth)
+    elif kind == 'repeat':
+        lines.append(f"{pad}while True:" if node[2] is None else f"{pad}for _ in range({node[2]}):")
+        _emit(node[1], lines, depth + 1)
+    elif kind == 'choice':
+        total = sum(weight for _, weight in node[1])
+        lines.append(f"{pad}_r = _rng.random() * {total!r}")
+        cumulative = 0.0
+        for i, (option, weight) in enumerate(node[1]):
+            cumulative += weight
+            if i == len(node[1]) - 1:
+                lines.append(f"{pad}else:" if i else f"{pad}if True:")
+            else:
+                lines.append(f"{pad}{'elif' if i else 'if'} _r < {cumulative!r}:")
+            _emit(option, lines, depth + 1)
+    elif kind == 'if':
+        lines.append(f"{pad}if {node[1]}:")
+        _emit(node[2], lines, depth + 1)
+        if node[3][1]:
+            lines.append(f"{pad}else:")
+            _emit(node[3], lines, depth + 1)
+    elif kind == 'while':
+        lines.append(f"{pad}while {node[1]}:")
+        _emit(node[2], lines, depth + 1)
+
+
+class MoveScript:
+    """A compiled move script; policy() gives a fresh player for one game"""
+
+    def __init__(self, source: str):
+        parser = _Parser(source)
+        tree = parser.script()
+        _check_loops(tree)
+        self.source = source
+        self.features = sorted(parser.features)
+        lines = ["def _script(_state):",
+                 "    _get = _state.get",
+                 "    _rng = _state.rng"]
+        _emit(tree, lines, 1)
+        self.python = '\n'.join(lines) + '\n'
+        namespace = {}
+        exec(compile(self.python, f'<move script {source[:40]!r}>', 'exec'), namespace)
+        self._generator = namespace['_script']
+
+    def __repr__(self):
+        return f"MoveScript({self.source!r})"
+
+    def policy(self) -> Callable[[Board, random.Random], Optional[str]]:
+        """policy(board, rng) -> next key, or None once the script has ended"""
+        state = ScriptState()
+        moves = self._generator(state)
+
+        def next_move(board: Board, rng: random.Random) -> Optional[str]:
+            state.rng = rng
+            state.update(board)
+            move = next(moves, None)
+            state.moves += move is not None
+            return move
+
+        return next_move
+
+    def keys(self, board: Optional[Board] = None, rng: Optional[random.Random] = None,
+             limit: int = 1000) -> Iterator[str]:
+        """Keys the script produces while the board stays as given (for board-free scripts)"""
+        policy, rng = self.policy(), rng or random.Random()
+        board = board or [[0] * 4 for _ in range(4)]
+        for _ in range(limit):
+            move = policy(board, rng)
+            if move is None:
+                return
+            yield move
+
+
+@lru_cache(maxsize=256)
+def compile_script(source: str) -> MoveScript:
+    """Compile a script once; later calls with the same text reuse it"""
+    return MoveScript(source)
+
+
+def simulate(script: MoveScript, n_games: int, max_moves: int = 5000,
+             seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Play the script in n_games simulated games (BatchSimulator rules)
+
+    Games stop when they finish, when their script ends, or at max_moves keys.
+    """
+    sim = BatchSimulator(n_games, seed)
+    rng = random.Random(seed)
+    policies = [script.policy() for _ in range(n_games)]
+    directions = np.zeros(n_games, dtype=np.int64)
+    for _ in range(max_moves):
+        playing = np.flatnonzero(sim.alive)
+        if len(playing) == 0:
+            break
+        boards = to_values(sim.boards[playing]).tolist()
+        for i, board in zip(playing, boards):
+            move = policies[i](board, rng)
+            if move is None:
+                sim.alive[i] = False
+            else:
+                directions[i] = MOVES.index(move)
+        sim.step(directions)
+    return {
+        'score': sim.scores,
+        'moves': sim.moves,
+        'max_tile': to_values(sim.boards).reshape(n_games, -1).max(axis=1),
+    }
+
+
+@click.command()
+@click.argument('script', required=False)
+@click.option('--file', '-f', 'script_file', type=click.File(), help='Read the script from a file')
+@click.option('--show', is_flag=True, help='Print the Python the script compiles to')
+@click.option('--games', '-g', default=1000, help='Simulated games to play (0 to skip)')
+@click.option('--real', default=0, help='Real games to play through the async pty driver')
+@click.option('--max-moves', default=5000, help='Key cap per game')
+@click.option('--seed', default=None, type=int, help='Seed for the simulator and random choices')
+@click.option('--game-binary', default='2048-cli-0.9.1/2048', help='Path to 2048 binary')
+@click.option('--game-args', default='-A', help="Game options for --real games")
+def main(script, script_file, show, games, real, max_moves, seed, game_binary, game_args):
+    """Compile a move script and play it in simulated or real games"""
+    source = script_file.read() if script_file else script
+    if not source:
+        raise click.UsageError("give a SCRIPT or --file")
+    start = time.perf_counter()
+    try:
+        compiled = compile_script(source)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Compiled in {(time.perf_counter() - start) * 1000:.2f} ms; "
+               f"features: {', '.join(compiled.features) or 'none'}")
+    if show:
+        click.echo(compiled.python)
+
+    if games:
+        start = time.perf_counter()
+        results = simulate(compiled, games, max_moves, seed)
+        elapsed = time.perf_counter() - start
+        moves = int(results['moves'].sum())
+        click.echo(f"Simulated {games} games, {moves} keys in {elapsed:.2f}s ({moves / elapsed:,.0f} keys/s)")
+        click.echo(f"  score: mean {results['score'].mean():.1f}, max {results['score'].max()}; "
+                   f"max tile: median {int(np.median(results['max_tile']))}, best {results['max_tile'].max()}")
+
+    if real:
+        import asyncio
+        import shlex
+        from .async_reader import run_games
+
+        async def play():
+            return [result async for result in run_games(
+                real, policy_factory=compiled.policy, max_moves=max_moves, seed=seed,
+                game_binary=game_binary, game_args=shlex.split(game_args))]
+
+        start = time.perf_counter()
+        played = [r for r in asyncio.run(play()) if 'error' not in r]
+        elapsed = time.perf_counter() - start
+        if played:
+            scores = [r['score'] for r in played]
+            click.echo(f"Played {len(played)}/{real} real games in {elapsed:.1f}s: "
+                       f"score mean {sum(scores) / len(scores):.1f}, max {max(scores)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Multi-Session Runner for 2048 - Many ManualTestRunner games, one operator
+
+ManualTestRunner blocks the whole test on click.prompt at every
+inspection point, so the operator waits through spam phases and the game
+waits through inspections. Here N sessions play on one asyncio event loop
+(AsyncTTYReader). A session that reaches an inspection point pauses
+alone: it files a request on a shared priority queue and waits for the
+operator's decision, while the other games keep playing.
+
+The operator console takes requests highest complexity first. The prompt
+runs in a worker thread so the event loop keeps the other sessions going
+while the operator thinks. Each session keeps the single-session log
+layout (config, moves.bin, checkpoints/, summary.json); board snapshots
+from every session go to the one shared snapshot store.
+"""
+
+import asyncio
+import itertools
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+import click
+
+from .advisor import Advisor, DEFAULT_MAX_DEPTH
+from .async_reader import AsyncTTYReader, is_noop
+from .board_analyzer import BoardAnalyzer
+from .complexity_model import ComplexityModel
+from .manual_test_runner import ManualTestRunner
+from .tty_reader import ANIMATION_SETTLE, launch_args
+
+
+class InspectionSession(ManualTestRunner):
+    """A ManualTestRunner game played on the event loop"""
+
+    def __init__(self, session_id: int, max_moves: int = 1000, **runner_options):
+        super().__init__(**runner_options)
+        self.session_id = session_id
+        self.max_moves = max_moves
+        self.reader = AsyncTTYReader(self.reader.game_binary, self.reader.game_args,
+                                     self.reader.screen is not None)
+        self.inspections = 0
+        self.paused_s = 0.0  # Time spent waiting in the inspection queue
+        self.summary: Optional[Dict] = None
+
+    async def play(self, queue: asyncio.PriorityQueue, order: itertools.count) -> Dict:
+        """Play to the end, filing inspection requests on the shared queue"""
+        loop = asyncio.get_running_loop()
+        reader = self.reader
+        try:
+            if await reader.start() is None:
+                raise RuntimeError(f"session {self.session_id}: no initial frame")
+            while self.move_count < self.max_moves and not reader.exited:
+                self.move_count += 1
+                if self.move_count % 10 == 0:
+                    self._save_board_snapshot()
+
+                move, manual_move = self._get_spam_move(), False
+                if (self.move_count > self.spam_moves and self.move_count % self.check_interval == 0
+                        and reader.current_board):
+                    needs_inspection, scores = self._check_complexity()
+                    if needs_inspection:
+                        decision = loop.create_future()
+                        filed = time.perf_counter()
+                        # Highest complexity first; ties in filing order
+                        await queue.put((-scores['complexity'], next(order), self, scores, decision))
+                        result = await decision
+                        self.paused_s += time.perf_counter() - filed
+                        self.inspections += 1
+                        if result == 'quit':
+                            break
+                        move, manual_move = result or move, bool(result)
+
+                if is_noop(reader.current_board, move):
+                    reader.noop_moves += 1  # -A draws nothing for it; don't wait on a frame
+                    continue
+                latency = await reader.send_move_and_wait(move, settle=self.settle)
+                if latency is not None:
+                    analyzer = BoardAnalyzer(reader.current_board, self.model)
+                    complexity = analyzer.get_complexity_score()['complexity']
+                    self.game_over_risk = analyzer.get_game_over_risk(self.risk_horizon)
+                    self.max_game_over_risk = max(self.max_game_over_risk, self.game_over_risk)
+                    self._log_move(move, reader.current_score, complexity)
+                    if manual_move:
+                        self._show_cached_advice()
+        finally:
+            await reader.close()
+            if reader.final_score is not None:
+                reader.current_score = reader.final_score
+            self.summary = self._write_summary()
+        return self.summary
+
+
+async def operator_console(queue: asyncio.PriorityQueue, stats: Dict) -> None:
+    """Answer inspection requests one at a time, most complex first, until the sentinel"""
+    loop = asyncio.get_running_loop()
+    failed = None  # Once the console fails, every waiting and later request is answered 'quit'
+    while True:
+        _, _, session, scores, decision = await queue.get()
+        if session is None:
+            return
+        if failed is not None:
+            decision.set_result('quit')
+            continue
+        click.echo(f"\n[session {session.session_id}] {queue.qsize()} more inspection(s) waiting")
+        start = time.perf_counter()
+        # The prompt blocks, so it runs off the loop; other sessions keep playing
+        try:
+            result = await loop.run_in_executor(None, session._manual_inspection, scores)
+        except Exception as e:  # e.g. click.Abort when stdin reaches EOF
+            failed = e
+            click.echo(f"\nOperator console stopped ({e!r}); ending every session", err=True)
+            result = 'quit'
+        stats['busy_s'] += time.perf_counter() - start
+        stats['inspections'] += 1
+        decision.set_result(result)
+
+
+async def run_sessions(sessions: List[InspectionSession]) -> Tuple[List, Dict]:
+    """Play every session concurrently with a single operator console"""
+    queue = asyncio.PriorityQueue()
+    order = itertools.count()
+    stats = {'busy_s': 0.0, 'inspections': 0}
+    console = asyncio.create_task(operator_console(queue, stats))
+    try:
+        results = await asyncio.gather(*(session.play(queue, order) for session in sessions),
+                                       return_exceptions=True)
+    finally:
+        await queue.put((math.inf, next(order), None, None, None))  # Sorts after every request
+        await console
+    return results, stats
+
+
+@click.command()
+@click.option('--sessions', '-n', default=4, help='Games played at once')
+@click.option('--spam-moves', '-s', default=50, help='Number of initial spam moves')
+@click.option('--check-interval', '-i', default=10, help='Moves between complexity checks')
+@click.option('--threshold', '-t', default=70, help='Complexity threshold for manual inspection')
+@click.option('--model', 'model_file', type=click.Path(exists=True),
+              help='Trained complexity model (see complexity-model train)')
+@click.option('--risk-horizon', default=3, help='Moves ahead for the exact game-over risk')
+@click.option('--max-moves', default=1000, help='Move cap per session')
+@click.option('--settle', default=ANIMATION_SETTLE,
+              help='Quiet time (s) that ends a move animation (0 for games run with -A)')
+@click.option('--game-binary', default='2048-cli-0.9.1/2048', help='Path to 2048 binary')
+@click.option('--game-args', default='', help="Extra game options, e.g. '-A -c'")
+@click.option('--turbo', is_flag=True, help='Launch with animation disabled (-A) and no settle time')
+@click.option('--advisor-depth', default=DEFAULT_MAX_DEPTH,
+              help='Deepest background search during inspections (0 disables the advisor)')
+def main(sessions, spam_moves, check_interval, threshold, model_file, risk_horizon, max_moves,
+         settle, game_binary, game_args, turbo, advisor_depth):
+    """Run several manual tests at once with one prioritized inspection console"""
+    import shlex
+    model = ComplexityModel.load(model_file) if model_file else None
+    args = launch_args(shlex.split(game_args), turbo)
+    if turbo:
+        settle = 0.0
+    advisor = Advisor(advisor_depth) if advisor_depth else None  # Shared: one inspection at a time
+    runners = [InspectionSession(i, max_moves, spam_moves=spam_moves, check_interval=check_interval,
+                                 complexity_threshold=threshold, model=model,
+                                 risk_horizon=risk_horizon, settle=settle,
+                                 game_binary=game_binary, game_args=args, advisor=advisor)
+               for i in range(sessions)]
+    click.echo(f"🎮 Starting {sessions} sessions (threshold {threshold}, check every {check_interval})")
+
+    start = time.perf_counter()
+    try:
+        results, stats = asyncio.run(run_sessions(runners))
+    except KeyboardInterrupt:
+        click.echo("\nInterrupted by user")
+        return
+    finally:
+        if advisor is not None:
+            advisor.close()
+    wall = time.perf_counter() - start
+
+    click.echo(f"\n\n{'Session':>7} {'Moves':>6} {'Score':>6} {'Inspections':>11} {'Paused':>8}  Log")
+    for session, result in zip(runners, results):
+        if isinstance(result, Exception):
+            click.echo(f"{session.session_id:>7} error: {result}")
+            continue
+        click.echo(f"{session.session_id:>7} {session.move_count:>6} {result['final_score']:>6} "
+                   f"{session.inspections:>11} {session.paused_s:>7.1f}s  {session.log_dir}")
+    moves = sum(session.move_count for session in runners)
+    paused = sum(session.paused_s for session in runners)
+    click.echo(f"{moves} moves in {wall:.1f}s; operator busy {stats['busy_s']:.1f}s "
+               f"({stats['busy_s'] / wall:.0%}) over {stats['inspections']} inspections; "
+               f"games paused {paused / (wall * len(runners)):.0%} of session time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Move Policies for 2048 - One strategy API for live games and the simulator
+
+A Policy decides moves for N games at once: decide_batch() takes the
+(N, 16) exponent boards of the batch simulator and returns N direction
+indices (MOVES order). decide() plays one live board of tile values
+through the same code, so a strategy that plays a real game over the pty
+is the exact strategy measured over a million simulated games.
+
+Policies keep per-game state (recovery counters, move sequences) sized
+by reset(n_games); calling a policy as policy(board, rng) makes it a
+drop-in policy for async_reader.play_game.
+
+The registry ports the experiments' ad-hoc strategies:
+  spam        ManualTestRunner._get_spam_move (40% s, 30% d, 20% a, 10% w)
+  enhanced    exp_013 ClaudeEnhancedPlayer.get_enhanced_move
+  interactive exp_014 claude_decide_move (move sequences, emergency wasd)
+  real        exp_012 claude_analyze_board (move sequences)
+  random      the engine's -i AI (uniform over wasd)
+"""
+
+import itertools
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+import click
+import numpy as np
+
+from .simulator import MOVES, SPAM_WEIGHTS, BatchSimulator, sample_moves, to_exponents, to_values
+
+_DIRECTIONS = {key: index for index, key in enumerate(MOVES)}
+
+POLICIES: Dict[str, Callable[..., 'Policy']] = {}
+
+
+def register(name: str):
+    """Class decorator adding a policy to the registry under `name`"""
+    def add(cls):
+        cls.name = name
+        POLICIES[name] = cls
+        return cls
+    return add
+
+
+def get_policy(name: str, seed: Optional[int] = None, n_games: int = 1) -> 'Policy':
+    """A fresh policy from the registry, reset for n_games"""
+    try:
+        cls = POLICIES[name]
+    except KeyError:
+        raise ValueError(f"unknown policy {name!r} (known: {', '.join(POLICIES)})")
+    policy = cls(seed)
+    policy.reset(n_games)
+    return policy
+
+
+def _max_positions(boards: np.ndarray):
+    """(row, col) of each board's first highest tile, row-major as BoardAnalyzer finds it"""
+    first = boards.argmax(axis=1)
+    return first // 4, first % 4
+
+
+def _sample_rows(weights: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """One column index per row of an (N, K) weight matrix"""
+    cumulative = np.cumsum(weights, axis=1)
+    picks = rng.random(len(weights)) * cumulative[:, -1]
+    return (cumulative <= picks[:, None]).sum(axis=1)
+
+
+class Policy:
+    """Base class: decide_batch() over exponent boards, decide() for one live board"""
+
+    name = ''
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+        self.n_games = 0
+
+    def reset(self, n_games: int = 1) -> None:
+        """Start n_games new games (clears per-game state)"""
+        self.n_games = n_games
+
+    def decide_batch(self, boards: np.ndarray) -> np.ndarray:
+        """Direction index for each of the (n_games, 16) boards"""
+        raise NotImplementedError
+
+    def decide(self, board: List[List[int]]) -> str:
+        """Key for one 4x4 board of tile values (state slot 0)"""
+        if self.n_games != 1:
+            self.reset(1)
+        return MOVES[int(self.decide_batch(to_exponents(board)[None])[0])]
+
+    def __call__(self, board, rng=None) -> str:
+        return self.decide(board)
+
+
+@register('spam')
+class SpamPolicy(Policy):
+    """Independent weighted keys, ignoring the board"""
+
+    weights = SPAM_WEIGHTS
+
+    def decide_batch(self, boards: np.ndarray) -> np.ndarray:
+        return sample_moves(self.weights, len(boards), self.rng)
+
+
+@register('random')
+class RandomPolicy(SpamPolicy):
+    weights = {key: 1.0 for key in MOVES}
+
+
+@register('enhanced')
+class EnhancedPolicy(Policy):
+    """Down-right weights by free space, corner repositioning and stuck recovery"""
+
+    # Columns in s, d, a, w order, as the original weight lists
+    KEYS = np.array([_DIRECTIONS[key] for key in 'sdaw'])
+    RECOVERY = np.array([_DIRECTIONS['a'], _DIRECTIONS['w']])
+
+    def reset(self, n_games: int = 1) -> None:
+        super().reset(n_games)
+        self.last = None
+        self.unchanged = np.zeros(n_games, dtype=np.int64)
+
+    def decide_batch(self, boards: np.ndarray) -> np.ndarray:
+        if self.last is not None:
+            same = (boards == self.last).all(axis=1)
+            self.unchanged = np.where(same, self.unchanged + 1, 0)
+        self.last = boards.copy()
+
+        empty = (boards == 0).sum(axis=1)
+        weights = np.where((empty > 8)[:, None], [0.5, 0.4, 0.08, 0.02],
+                           np.where((empty > 4)[:, None], [0.45, 0.35, 0.15, 0.05],
+                                    [0.4, 0.3, 0.2, 0.1]))
+        row, col = _max_positions(boards)
+        corner = np.isin(row, (0, 3)) & np.isin(col, (0, 3))
+        weights[:, 0] += np.where(~corner & (row < 2), 0.1, 0)  # Max in upper half: prefer down
+        weights[:, 1] += np.where(~corner & (col < 2), 0.1, 0)  # Max in left half: prefer right
+        moves = self.KEYS[_sample_rows(weights, self.rng)]
+
+        # Two unchanged boards in a row: left, then up, then left/up at random
+        recovery = self.RECOVERY[self.rng.integers(0, 2, len(boards))]
+        recovery = np.where(self.unchanged == 2, _DIRECTIONS['a'],
+                            np.where(self.unchanged == 3, _DIRECTIONS['w'], recovery))
+        return np.where(self.unchanged >= 2, recovery, moves)
+
+
+class SequencePolicy(Policy):
+    """Plays a whole move sequence chosen from the board, then looks again
+
+    categorize() maps boards to an index into SEQUENCES. With EMERGENCY
+    set, a board that is unchanged across three consecutive sequences
+    gets the EMERGENCY keys next.
+    """
+
+    SEQUENCES: Sequence[str] = ()
+    EMERGENCY: Optional[str] = None
+
+    def __init__(self, seed: Optional[int] = None):
+        super().__init__(seed)
+        sequences = list(self.SEQUENCES) + ([self.EMERGENCY] if self.EMERGENCY else [])
+        self.lengths = np.array([len(keys) for keys in sequences])
+        self.table = np.zeros((len(sequences), self.lengths.max()), dtype=np.int64)
+        for i, keys in enumerate(sequences):
+            self.table[i, :len(keys)] = [_DIRECTIONS[key] for key in keys]
+
+    def reset(self, n_games: int = 1) -> None:
+        super().reset(n_games)
+        self.sequence = np.zeros(n_games, dtype=np.int64)
+        self.step = self.lengths[self.sequence]  # Every game chooses a sequence first
+        self.start = np.zeros((n_games, 16), dtype=np.uint8)
+        self.stuck = np.full(n_games, -1, dtype=np.int64)
+
+    def categorize(self, boards: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def decide_batch(self, boards: np.ndarray) -> np.ndarray:
+        done = np.flatnonzero(self.step >= self.lengths[self.sequence])
+        if len(done):
+            chosen = self.categorize(boards[done])
+            if self.EMERGENCY:
+                same = (boards[done] == self.start[done]).all(axis=1)
+                self.stuck[done] = np.where(same, self.stuck[done] + 1, 0)
+                emergency = self.stuck[done] > 2
+                chosen = np.where(emergency, len(self.SEQUENCES), chosen)
+                self.stuck[done] = np.where(emergency, 0, self.stuck[done])
+                self.start[done] = boards[done]
+            self.sequence[done] = chosen
+            self.step[done] = 0
+        moves = self.table[self.sequence, self.step]
+        self.step += 1
+        return moves
+
+
+@register('interactive')
+class InteractivePolicy(SequencePolicy):
+    SEQUENCES = ('adws', 'dsas', 'sds', 'sdsdas')
+    EMERGENCY = 'wasd'
+
+    def categorize(self, boards: np.ndarray) -> np.ndarray:
+        empty = (boards == 0).sum(axis=1)
+        row, _ = _max_positions(boards)
+        return np.select([empty == 0, empty == 1, row < 3], [0, 1, 2], 3)
+
+
+@register('real')
+class RealPolicy(SequencePolicy):
+    SEQUENCES = ('ads', 'dsasd', 'sdsdasd', 'sdsasdds')
+
+    def categorize(self, boards: np.ndarray) -> np.ndarray:
+        empty = (boards == 0).sum(axis=1)
+        # max >= 64 with a tile >= 32 (the max itself)
+        return np.select([empty == 0, empty == 1, boards.max(axis=1) >= 6], [0, 1, 2], 3)
+
+
+def evaluate(policy: Policy, n_games: int, max_moves: int = 5000, seed: Optional[int] = None,
+             chunk: int = 100000, stall_limit: int = 50) -> Dict[str, np.ndarray]:
+    """Play n_games simulated games (in chunks); score, moves, max_tile and stalled per game
+
+    A game whose board has not changed for stall_limit keys in a row is
+    stopped and marked stalled (the policy keeps pressing dead keys).
+    """
+    results = {'score': [], 'moves': [], 'max_tile': [], 'stalled': []}
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_games, chunk):
+        size = min(chunk, n_games - start)
+        sim = BatchSimulator(size, int(rng.integers(2 ** 32)))
+        policy.reset(size)
+        unchanged = np.zeros(size, dtype=np.int64)
+        stalled = np.zeros(size, dtype=bool)
+        for _ in range(max_moves):
+            playing = sim.alive.copy()
+            if not playing.any():
+                break
+            moved = sim.step(policy.decide_batch(sim.boards))
+            unchanged = np.where(moved, 0, unchanged + playing)
+            stalled |= playing & (unchanged >= stall_limit)
+            sim.alive &= ~stalled
+        results['score'].append(sim.scores)
+        results['moves'].append(sim.moves)
+        results['max_tile'].append(to_values(sim.boards).reshape(size, -1).max(axis=1))
+        results['stalled'].append(stalled)
+    return {key: np.concatenate(parts) for key, parts in results.items()}
+
+
+@click.command()
+@click.argument('names', nargs=-1)
+@click.option('--games', '-g', default=100000, help='Simulated games per policy')
+@click.option('--live', default=0, help='Also play this many real games per policy')
+@click.option('--max-moves', default=5000, help='Key cap per game')
+@click.option('--seed', default=None, type=int, help='Seed for games and policies')
+@click.option('--game-binary', default='2048-cli-0.9.1/2048', help='Path to 2048 binary')
+@click.option('--game-args', default='-A', help="Game options for --live games")
+def main(names, games, live, max_moves, seed, game_binary, game_args):
+    """Evaluate registered policies over simulated (and optionally real) games"""
+    for name in names or POLICIES:
+        try:
+            policy = get_policy(name, seed)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        start = time.perf_counter()
+        results = evaluate(policy, games, max_moves, seed)
+        elapsed = time.perf_counter() - start
+        scores = results['score']
+        click.echo(f"{name:12} {games} games in {elapsed:.1f}s ({games / elapsed:,.0f} games/s): "
+                   f"score mean {scores.mean():.1f}, median {np.median(scores):.0f}, max {scores.max()}; "
+                   f"max tile median {np.median(results['max_tile']):.0f}, "
+                   f"{results['stalled'].sum()} stalled")
+
+        if live:
+            import asyncio
+            import shlex
+            from .async_reader import run_games
+
+            seeds = itertools.count(seed) if seed is not None else iter(())  # One seed per game
+
+            async def play():
+                return [result async for result in run_games(
+                    live, policy_factory=lambda: get_policy(name, next(seeds, None)), max_moves=max_moves,
+                    game_binary=game_binary, game_args=shlex.split(game_args))]
+
+            played = [r for r in asyncio.run(play()) if 'error' not in r]
+            if played:
+                live_scores = [r['score'] for r in played]
+                click.echo(f"{'':12} {len(played)} live games: score mean "
+                           f"{sum(live_scores) / len(live_scores):.1f}, max {max(live_scores)}")
+
+
+if __name__ == "__main__":
+    main()
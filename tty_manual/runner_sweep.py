@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Runner Sweep for 2048 - ManualTestRunner settings tried on the simulator
+
+ManualTestRunner's spam_moves, check_interval and complexity_threshold
+decide how often the operator is interrupted. Trying settings on real
+games costs about 200 ms per move. This module replays the runner's
+control loop on BatchSimulator instead:
+  - keys 1..spam_moves are spam moves;
+  - after that, every check_interval-th key checks the board's complexity
+    (weighted score, or a ComplexityModel) against the threshold;
+  - a board at or above the threshold is an inspection, answered by an
+    oracle standing in for the operator;
+  - the run stops at the runner's 1000-move safety limit or game over.
+
+Oracles: 'continue' always answers [c] (count interrupts only);
+'expectimax' answers [m] with the advisor's best move at a fixed depth.
+
+A sweep runs a grid or random sample of settings over a process pool,
+with the same games for every setting. It reports score against
+inspections per game and marks the settings no other setting beats on
+both.
+"""
+
+import csv
+import itertools
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import click
+import numpy as np
+
+from .advisor import search_direction
+from .board_analyzer import batch_metrics
+from .bitboard import legal_moves
+from .complexity_model import ComplexityModel
+from .simulator import SPAM_WEIGHTS, BatchSimulator, sample_moves, to_values
+
+ORACLES = ('continue', 'expectimax')
+RUNNER_MOVE_LIMIT = 1000  # ManualTestRunner.run()'s safety limit
+
+RESULT_FIELDS = ['spam_moves', 'check_interval', 'threshold', 'games', 'score_mean', 'score_stderr',
+                 'inspections_per_game', 'manual_moves_per_game', 'moves_per_game',
+                 'max_tile_median', 'pareto']
+
+_SHIFTS = np.arange(16, dtype=np.uint64) * np.uint64(4)
+
+
+def oracle_move(board: np.ndarray, depth: int = 2) -> Optional[int]:
+    """Advisor's best direction for a (16,) exponent board, or None if no move is legal"""
+    key = int((board.astype(np.uint64) << _SHIFTS).sum())
+    values = {direction: search_direction(key, direction, depth)['value']
+              for direction, _ in legal_moves(key)}
+    return max(values, key=values.get) if values else None
+
+
+def simulate_runner(spam_moves: int, check_interval: int, threshold: float, n_games: int,
+                    seed: Optional[int] = None, oracle: str = 'expectimax', oracle_depth: int = 2,
+                    model: Optional[ComplexityModel] = None,
+                    max_moves: int = RUNNER_MOVE_LIMIT) -> Dict[str, np.ndarray]:
+    """Play n_games under the runner's control loop; per-game score, moves, inspections"""
+    sim = BatchSimulator(n_games, seed)
+    rng = np.random.default_rng(None if seed is None else seed + 1)
+    inspections = np.zeros(n_games, dtype=np.int64)
+    manual_moves = np.zeros(n_games, dtype=np.int64)
+    for move_count in range(1, max_moves + 1):
+        if not sim.alive.any():
+            break
+        directions = sample_moves(SPAM_WEIGHTS, n_games, rng)
+        if move_count > spam_moves and move_count % check_interval == 0:
+            playing = np.flatnonzero(sim.alive)
+            metrics = batch_metrics(to_values(sim.boards[playing]))
+            complexity = model.predict_complexity(metrics) if model else metrics['complexity']
+            inspected = playing[complexity >= threshold]
+            inspections[inspected] += 1
+            if oracle == 'expectimax':
+                for game in inspected:
+                    direction = oracle_move(sim.boards[game], oracle_depth)
+                    if direction is not None:
+                        directions[game] = direction
+                        manual_moves[game] += 1
+        sim.step(directions)
+    return {
+        'score': sim.scores,
+        'moves': sim.moves,
+        'inspections': inspections,
+        'manual_moves': manual_moves,
+        'max_tile': to_values(sim.boards).reshape(n_games, -1).max(axis=1),
+    }
+
+
+def run_setting(setting: Dict, n_games: int, seed: int, oracle: str, oracle_depth: int,
+                model: Optional[ComplexityModel]) -> Dict:
+    """Summary row for one (spam_moves, check_interval, threshold) setting"""
+    results = simulate_runner(setting['spam_moves'], setting['check_interval'], setting['threshold'],
+                              n_games, seed, oracle, oracle_depth, model)
+    scores = results['score']
+    return dict(setting,
+                games=n_games,
+                score_mean=round(float(scores.mean()), 1),
+                score_stderr=round(float(scores.std() / np.sqrt(n_games)), 1),
+                inspections_per_game=round(float(results['inspections'].mean()), 3),
+                manual_moves_per_game=round(float(results['manual_moves'].mean()), 3),
+                moves_per_game=round(float(results['moves'].mean()), 1),
+                max_tile_median=int(np.median(results['max_tile'])))
+
+
+def mark_pareto(rows: List[Dict]) -> None:
+    """Flag rows that no other row beats on both score (higher) and inspections (fewer)"""
+    for row in rows:
+        row['pareto'] = not any(
+            other['score_mean'] >= row['score_mean'] and
+            other['inspections_per_game'] <= row['inspections_per_game'] and
+            (other['score_mean'] > row['score_mean'] or
+             other['inspections_per_game'] < row['inspections_per_game'])
+            for other in rows)
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(value) for value in text.split(',') if value.strip()]
+
+
+@click.command()
+@click.option('--spam-moves', '-s', default='0,50,200', help='Comma-separated spam_moves values')
+@click.option('--check-interval', '-i', default='5,10,20', help='Comma-separated check_interval values')
+@click.option('--threshold', '-t', default='50,60,70,80', help='Comma-separated threshold values')
+@click.option('--random', 'random_settings', default=0,
+              help='Sample this many settings within the ranges of the lists instead of the grid')
+@click.option('--games', '-g', default=2000, help='Simulated games per setting (the same games for all)')
+@click.option('--oracle', type=click.Choice(ORACLES), default='expectimax',
+              help='Stand-in for the operator at inspections')
+@click.option('--oracle-depth', default=2, help='Search depth of the expectimax oracle')
+@click.option('--model', 'model_file', type=click.Path(exists=True),
+              help='Trained complexity model (as manual_test_runner --model)')
+@click.option('--workers', '-w', default=0, help='Worker processes (0 = one per CPU)')
+@click.option('--seed', default=0, help='Seed for the games and spam keys')
+@click.option('--output', '-o', type=click.Path(), help='CSV file (default: stdout)')
+def main(spam_moves, check_interval, threshold, random_settings, games, oracle, oracle_depth,
+         model_file, workers, seed, output):
+    """Sweep ManualTestRunner settings on the simulator: score vs operator interrupts"""
+    model = ComplexityModel.load(model_file) if model_file else None
+    spams, intervals, thresholds = _int_list(spam_moves), _int_list(check_interval), _int_list(threshold)
+    if random_settings:
+        rng = np.random.default_rng(seed)
+        settings = [{'spam_moves': int(rng.integers(min(spams), max(spams) + 1)),
+                     'check_interval': int(rng.integers(min(intervals), max(intervals) + 1)),
+                     'threshold': int(rng.integers(min(thresholds), max(thresholds) + 1))}
+                    for _ in range(random_settings)]
+    else:
+        settings = [{'spam_moves': s, 'check_interval': i, 'threshold': t}
+                    for s, i, t in itertools.product(spams, intervals, thresholds)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers or None) as pool:
+        futures = [pool.submit(run_setting, setting, games, seed, oracle, oracle_depth, model)
+                   for setting in settings]
+        rows = []
+        for done, future in enumerate(futures, 1):
+            rows.append(future.result())
+            click.echo(f"\r{done}/{len(settings)} settings", nl=False, err=True)
+    click.echo(err=True)
+    elapsed = time.perf_counter() - start
+    mark_pareto(rows)
+    rows.sort(key=lambda row: (row['inspections_per_game'], -row['score_mean']))
+
+    out = open(output, 'w', newline='') if output else sys.stdout
+    writer = csv.DictWriter(out, RESULT_FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    if output:
+        out.close()
+
+    click.echo(f"{len(settings)} settings x {games} games in {elapsed:.1f}s", err=True)
+    click.echo("Pareto front (fewest inspections for the score):", err=True)
+    for row in rows:
+        if row['pareto']:
+            click.echo(f"  spam {row['spam_moves']:>4}, interval {row['check_interval']:>3}, "
+                       f"threshold {row['threshold']:>3}: score {row['score_mean']:.0f} "
+                       f"± {row['score_stderr']:.0f}, {row['inspections_per_game']:.2f} inspections/game",
+                       err=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Screen Emulator for 2048 - Incremental VT100/xterm terminal state machine
+
+Applies the game's output stream to an in-memory character grid so the
+board can be read regardless of how it was drawn: the terminal front end
+(clear screen + full redraw), the curses front end (cursor addressing,
+repeat counts, partial updates) and colour mode (SGR attributes, ignored).
+
+Rows written since the last take_dirty() call are tracked, and
+BoardExtractor only re-parses board rows that were redrawn.
+"""
+
+import re
+from typing import List, Optional, Set, Tuple
+
+from .board_io import Board, MIN_SIDE, MAX_SIDE
+
+
+# One token of terminal output: CSI, OSC, charset/other escapes, C0 control
+# or a run of printable characters
+TOKEN = re.compile(
+    r'\x1b\[([0-?]*)([ -/]*)([@-~])'
+    r'|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)'
+    r'|\x1b[()*+#%][ -~]'
+    r'|\x1b(?![\[\]()*+#%])[ -~]'
+    r'|[\x00-\x1a\x1c-\x1f\x7f]'
+    r'|[^\x00-\x1f\x7f\x1b]+'
+)
+
+# An escape sequence cut off by the end of a chunk
+INCOMPLETE = re.compile(r'\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*\x1b?|[()*+#%])?')
+
+# Columns per cell: the engine pads tiles to the digits of 2048 plus one,
+# then adds a space and a '|'
+CELL_WIDTH = 7
+
+SCORE = re.compile(r'Score:\s*(\d+)')
+HIGH_SCORE = re.compile(r'Hi:\s*(\d+)')
+
+
+def screen_size(side: int = MAX_SIDE) -> Tuple[int, int]:
+    """(rows, cols) that hold a side x side board in either front end, at least 24x80
+
+    The terminal front end draws side + 6 lines; the curses window is
+    side * CELL_WIDTH + 3 lines tall and starts one row and column in.
+    """
+    return max(24, side * CELL_WIDTH + 4), max(80, side * CELL_WIDTH + 2)
+
+
+class Screen:
+    """In-memory terminal screen updated incrementally from output text"""
+
+    def __init__(self, rows: int = 24, cols: int = 80):
+        self.rows = rows
+        self.cols = cols
+        self.lines = [[' '] * cols for _ in range(rows)]
+        self.cursor_row = 0
+        self.cursor_col = 0
+        self.scroll_top = 0
+        self.scroll_bottom = rows - 1
+        self.autowrap = True
+        self.dirty: Set[int] = set()
+        self._wrap_pending = False
+        self._last_char = ' '
+        self._saved_cursor = (0, 0)
+        self._saved_lines = None  # Main screen while the alternate screen is active
+        self._pending = ''
+
+    def line(self, row: int) -> str:
+        return ''.join(self.lines[row])
+
+    def display(self) -> List[str]:
+        return [self.line(row) for row in range(self.rows)]
+
+    def take_dirty(self) -> Set[int]:
+        """Rows written since the last call"""
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def feed(self, text: str) -> None:
+        """Apply a chunk of output; escape sequences may span chunks"""
+        text = self._pending + text
+        self._pending = ''
+        pos = 0
+        end = len(text)
+
+        while pos < end:
+            match = TOKEN.match(text, pos)
+            if match is None:
+                if INCOMPLETE.fullmatch(text, pos):
+                    self._pending = text[pos:]  # Finish it with the next chunk
+                    return
+                pos += 1  # Malformed, drop the ESC
+                continue
+
+            token = match.group(0)
+            first = token[0]
+            if first == '\x1b':
+                if match.group(3) is not None:
+                    self._csi(match.group(1), match.group(2), match.group(3))
+                elif len(token) == 2:
+                    self._escape(token[1])
+            elif first < ' ' or first == '\x7f':
+                self._control(first)
+            else:
+                self._print(token)
+            pos = match.end()
+
+    # Drawing primitives
+
+    def _print(self, text: str) -> None:
+        self._last_char = text[-1]
+        while text:
+            if self._wrap_pending:
+                self._wrap_pending = False
+                self.cursor_col = 0
+                self._index()
+            row = self.cursor_row
+            space = self.cols - self.cursor_col
+            chunk = text[:space]
+            self.lines[row][self.cursor_col:self.cursor_col + len(chunk)] = chunk
+            self.dirty.add(row)
+            self.cursor_col += len(chunk)
+            text = text[len(chunk):]
+            if self.cursor_col >= self.cols:
+                self.cursor_col = self.cols - 1
+                self._wrap_pending = self.autowrap
+                if not self.autowrap:
+                    text = ''
+
+    def _blank(self, row: int, start: int, stop: int) -> None:
+        start, stop = max(0, start), min(self.cols, stop)
+        if start < stop:
+            self.lines[row][start:stop] = [' '] * (stop - start)
+            self.dirty.add(row)
+
+    def _scroll_up(self, count: int = 1) -> None:
+        top, bottom = self.scroll_top, self.scroll_bottom
+        count = min(count, bottom - top + 1)
+        del self.lines[top:top + count]
+        for _ in range(count):
+            self.lines.insert(bottom - count + 1, [' '] * self.cols)
+        self.dirty.update(range(top, bottom + 1))
+
+    def _scroll_down(self, count: int = 1) -> None:
+        top, bottom = self.scroll_top, self.scroll_bottom
+        count = min(count, bottom - top + 1)
+        del self.lines[bottom - count + 1:bottom + 1]
+        for _ in range(count):
+            self.lines.insert(top, [' '] * self.cols)
+        self.dirty.update(range(top, bottom + 1))
+
+    def _index(self) -> None:
+        if self.cursor_row == self.scroll_bottom:
+            self._scroll_up()
+        elif self.cursor_row < self.rows - 1:
+            self.cursor_row += 1
+
+    def _reverse_index(self) -> None:
+        if self.cursor_row == self.scroll_top:
+            self._scroll_down()
+        elif self.cursor_row > 0:
+            self.cursor_row -= 1
+
+    def _move_to(self, row: int, col: int) -> None:
+        self.cursor_row = min(max(row, 0), self.rows - 1)
+        self.cursor_col = min(max(col, 0), self.cols - 1)
+        self._wrap_pending = False
+
+    def _clear(self) -> None:
+        for row in range(self.rows):
+            self._blank(row, 0, self.cols)
+
+    # Sequence handlers
+
+    def _control(self, char: str) -> None:
+        if char == '\r':
+            self.cursor_col = 0
+            self._wrap_pending = False
+        elif char in '\n\x0b\x0c':
+            self._wrap_pending = False
+            self._index()
+        elif char == '\b':
+            self._move_to(self.cursor_row, self.cursor_col - 1)
+        elif char == '\t':
+            self._move_to(self.cursor_row, (self.cursor_col // 8 + 1) * 8)
+
+    def _escape(self, char: str) -> None:
+        if char == '7':
+            self._saved_cursor = (self.cursor_row, self.cursor_col)
+        elif char == '8':
+            self._move_to(*self._saved_cursor)
+        elif char == 'D':
+            self._index()
+        elif char == 'E':
+            self.cursor_col = 0
+            self._index()
+        elif char == 'M':
+            self._reverse_index()
+        elif char == 'c':
+            self.__init__(self.rows, self.cols)
+            self.dirty = set(range(self.rows))
+
+    def _csi(self, params: str, intermediate: str, final: str) -> None:
+        private = params.startswith(('?', '>', '=', '<'))
+        if private:
+            params = params[1:]
+        values = [int(p) if p.isdigit() else 0 for p in params.split(';')] if params else []
+
+        def arg(i: int = 0, default: int = 1) -> int:
+            return values[i] if len(values) > i and values[i] else default
+
+        row, col = self.cursor_row, self.cursor_col
+
+        if intermediate:
+            return
+        if private:
+            if final in 'hl':
+                self._private_mode(values, final == 'h')
+            return
+
+        if final in 'Hf':
+            self._move_to(arg(0) - 1, arg(1) - 1)
+        elif final == 'A':
+            self._move_to(max(row - arg(), self.scroll_top if row >= self.scroll_top else 0), col)
+        elif final in 'Be':
+            self._move_to(min(row + arg(), self.scroll_bottom if row <= self.scroll_bottom else self.rows - 1), col)
+        elif final in 'Ca':
+            self._move_to(row, col + arg())
+        elif final == 'D':
+            self._move_to(row, col - arg())
+        elif final == 'E':
+            self._move_to(row + arg(), 0)
+        elif final == 'F':
+            self._move_to(row - arg(), 0)
+        elif final in 'G`':
+            self._move_to(row, arg() - 1)
+        elif final == 'd':
+            self._move_to(arg() - 1, col)
+        elif final == 'J':
+            mode = arg(0, 0)
+            if mode == 0:
+                self._blank(row, col, self.cols)
+                for r in range(row + 1, self.rows):
+                    self._blank(r, 0, self.cols)
+            elif mode == 1:
+                for r in range(row):
+                    self._blank(r, 0, self.cols)
+                self._blank(row, 0, col + 1)
+            else:
+                self._clear()
+        elif final == 'K':
+            mode = arg(0, 0)
+            if mode == 0:
+                self._blank(row, col, self.cols)
+            elif mode == 1:
+                self._blank(row, 0, col + 1)
+            else:
+                self._blank(row, 0, self.cols)
+        elif final == 'X':
+            self._blank(row, col, col + arg())
+        elif final == '@':
+            line = self.lines[row]
+            count = min(arg(), self.cols - col)
+            line[col:col] = [' '] * count
+            del line[self.cols:]
+            self.dirty.add(row)
+        elif final == 'P':
+            line = self.lines[row]
+            count = min(arg(), self.cols - col)
+            del line[col:col + count]
+            line.extend([' '] * count)
+            self.dirty.add(row)
+        elif final in 'LM':
+            if self.scroll_top <= row <= self.scroll_bottom:
+                top = self.scroll_top
+                self.scroll_top = row
+                if final == 'L':
+                    self._scroll_down(arg())
+                else:
+                    self._scroll_up(arg())
+                self.scroll_top = top
+                self.cursor_col = 0
+        elif final == 'S':
+            self._scroll_up(arg())
+        elif final == 'T':
+            self._scroll_down(arg())
+        elif final == 'b':
+            self._print(self._last_char * arg())
+        elif final == 'r':
+            top, bottom = arg(0) - 1, arg(1, self.rows) - 1
+            if 0 <= top < bottom < self.rows:
+                self.scroll_top, self.scroll_bottom = top, bottom
+                self._move_to(0, 0)
+        elif final == 's':
+            self._saved_cursor = (row, col)
+        elif final == 'u':
+            self._move_to(*self._saved_cursor)
+        # SGR (m), window ops (t), reports (n, c) and modes (h, l) do not move text
+
+    def _private_mode(self, values: List[int], enable: bool) -> None:
+        for mode in values:
+            if mode == 7:
+                self.autowrap = enable
+            elif mode in (47, 1047, 1049):
+                if enable and self._saved_lines is None:
+                    self._saved_lines = self.lines
+                    self.lines = [[' '] * self.cols for _ in range(self.rows)]
+                    self.dirty.update(range(self.rows))
+                elif not enable and self._saved_lines is not None:
+                    self.lines, self._saved_lines = self._saved_lines, None
+                    self.dirty.update(range(self.rows))
+
+
+class BoardExtractor:
+    """Reads the 2048 score and board off a Screen
+
+    The layout (score line, then 'Hi:', a border and one '|' row per board
+    row, all starting in the same column) is located once by scanning the
+    screen. After that, each update() re-parses only the redrawn rows of that
+    region. Works for the terminal front end (right-aligned cells) and the
+    curses front end (left-aligned cells in a window offset by one).
+    """
+
+    def __init__(self, screen: Screen):
+        self.screen = screen
+        self.layout: Optional[Tuple[int, int, int, int]] = None  # score row, column, height, width
+        self.rows: List[Optional[List[int]]] = []
+        self.score: Optional[int] = None
+        self.high_score: Optional[int] = None
+
+    @property
+    def board(self) -> Optional[Board]:
+        """The board, or None while any row is missing or half drawn"""
+        if not self.rows or any(row is None for row in self.rows):
+            return None
+        return [list(row) for row in self.rows]
+
+    def _find_layout(self) -> bool:
+        screen = self.screen
+        for score_row in range(screen.rows - 3):
+            col = screen.line(score_row).find('Score:')
+            if col < 0 or 'Hi:' not in screen.line(score_row + 1):
+                continue
+            if screen.lines[score_row + 2][col] != '-':
+                continue
+
+            height = 0
+            while (score_row + 3 + height < screen.rows and
+                   screen.lines[score_row + 3 + height][col] == '|'):
+                height += 1
+            if not MIN_SIDE <= height <= MAX_SIDE:
+                continue
+            width = screen.line(score_row + 3)[col:].rstrip().count('|') - 1
+            if not MIN_SIDE <= width <= MAX_SIDE:
+                continue
+
+            self.layout = (score_row, col, height, width)
+            self.rows = [None] * height
+            return True
+        return False
+
+    def _layout_intact(self) -> bool:
+        score_row, col, _, _ = self.layout
+        return self.screen.line(score_row)[col:col + 6] == 'Score:'
+
+    def _parse_row(self, text: str, width: int) -> Optional[List[int]]:
+        cells = text.rstrip().split('|')[1:-1]
+        if len(cells) != width:
+            return None
+        try:
+            return [int(cell) if cell.strip() else 0 for cell in cells]
+        except ValueError:
+            return None
+
+    def update(self) -> bool:
+        """Apply redrawn screen rows; True if the score or board was redrawn and is complete"""
+        dirty = self.screen.take_dirty()
+        if not dirty:
+            return False
+
+        if self.layout is None or not self._layout_intact():
+            self.layout = None
+            if not self._find_layout():
+                return False
+            score_row, _, height, _ = self.layout
+            dirty = set(range(score_row, score_row + 3 + height))
+
+        score_row, col, height, width = self.layout
+        redrawn = False
+        for row in dirty:
+            offset = row - score_row
+            if offset == 0:
+                match = SCORE.search(self.screen.line(row), col)
+                self.score = int(match.group(1)) if match else self.score
+                redrawn = True
+            elif offset == 1:
+                match = HIGH_SCORE.search(self.screen.line(row), col)
+                self.high_score = int(match.group(1)) if match else self.high_score
+            elif 3 <= offset < 3 + height:
+                self.rows[offset - 3] = self._parse_row(self.screen.line(row)[col:], width)
+                redrawn = True
+
+        return redrawn and self.board is not None
+
+
+def read_board(text: str, rows: Optional[int] = None,
+               cols: Optional[int] = None) -> Optional[Tuple[Board, Optional[int]]]:
+    """(board, score) from a complete captured output stream, or None
+
+    The screen defaults to screen_size(), which fits the largest board.
+    """
+    default_rows, default_cols = screen_size()
+    extractor = BoardExtractor(Screen(rows or default_rows, cols or default_cols))
+    extractor.screen.feed(text)
+    extractor.update()
+    board = extractor.board
+    return (board, extractor.score) if board is not None else None
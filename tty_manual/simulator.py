@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Batch Simulator for 2048 - Vectorized re-implementation of engine.c
+
+Boards are (N, 16) uint8 arrays of tile exponents in row-major order
+(0 = empty, 1 = 2, 2 = 4, ...), so thousands of games advance per numpy call.
+Rules follow engine.c exactly:
+  - gravitate, merge from the leading edge, gravitate (standard 2048 merges)
+  - a move that changes nothing is ignored and spawns nothing
+  - one new tile per move: 2 with probability 3/4, 4 with probability 1/4
+    (rand() & 3 ? 1 : 2), placed uniformly on an empty cell
+  - three initial tiles
+  - the game ends when no move is possible or a 2048 tile appears
+"""
+
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+
+MOVES = 'wasd'  # Same order as ai.c; direction index = MOVES.index(key)
+UP, LEFT, DOWN, RIGHT = range(4)
+WIN_EXPONENT = 11  # merge_goal() for merge_std.c (2048)
+SPAWN_FOUR_PROBABILITY = 0.25
+
+# Reference policy used by ManualTestRunner's spam phase (40% s, 30% d, 20% a, 10% w)
+SPAM_WEIGHTS = {'s': 0.4, 'd': 0.3, 'a': 0.2, 'w': 0.1}
+
+
+def _build_row_tables() -> Tuple[np.ndarray, np.ndarray]:
+    """Result of sliding every 16-bit row (4 nibbles, cell 0 lowest) to the left"""
+    results = np.zeros(65536, dtype=np.uint16)
+    gains = np.zeros(65536, dtype=np.uint32)
+
+    for code in range(65536):
+        cells = [(code >> (4 * i)) & 0xF for i in range(4)]
+        tiles = [c for c in cells if c]
+        merged = []
+        gain = 0
+        i = 0
+        while i < len(tiles):
+            if i + 1 < len(tiles) and tiles[i] == tiles[i + 1]:
+                value = min(tiles[i] + 1, 15)
+                merged.append(value)
+                gain += 1 << value
+                i += 2
+            else:
+                merged.append(tiles[i])
+                i += 1
+        merged += [0] * (4 - len(merged))
+        results[code] = sum(c << (4 * i) for i, c in enumerate(merged))
+        gains[code] = gain
+
+    return results, gains
+
+
+ROW_LEFT, ROW_GAIN = _build_row_tables()
+ROW_SHIFTS = np.array([0, 4, 8, 12], dtype=np.uint32)
+
+
+def _lines(boards: np.ndarray, direction: int) -> np.ndarray:
+    """View boards as (N, 4, 4) lines ordered so the move slides toward index 0"""
+    grid = boards.reshape(-1, 4, 4)
+    if direction == LEFT:
+        return grid
+    if direction == RIGHT:
+        return grid[:, :, ::-1]
+    if direction == UP:
+        return grid.transpose(0, 2, 1)
+    if direction == DOWN:
+        return grid.transpose(0, 2, 1)[:, :, ::-1]
+    raise ValueError(f"invalid direction: {direction}")
+
+
+def move_boards(boards: np.ndarray, direction: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Apply one direction to every board (no spawn)
+
+    Returns (new_boards, score_gained, moved_mask).
+    """
+    lines = _lines(boards, direction)
+    codes = (lines.astype(np.uint32) << ROW_SHIFTS).sum(axis=2)
+    new_codes = ROW_LEFT[codes].astype(np.uint32)
+    gained = ROW_GAIN[codes].sum(axis=1)
+
+    new_lines = ((new_codes[:, :, None] >> ROW_SHIFTS) & 0xF).astype(np.uint8)
+    result = np.empty_like(boards).reshape(-1, 4, 4)
+    _lines(result.reshape(-1, 16), direction)[...] = new_lines
+    result = result.reshape(-1, 16)
+
+    moved = (codes != new_codes).any(axis=1)
+    return result, gained.astype(np.int64), moved
+
+
+def spawn_tiles(boards: np.ndarray, rng: np.random.Generator,
+                mask: Optional[np.ndarray] = None) -> None:
+    """Place one random tile on an empty cell of each (masked) board, in place"""
+    empty = boards == 0
+    if mask is not None:
+        empty &= mask[:, None]
+    counts = empty.sum(axis=1)
+    rows = np.flatnonzero(counts)
+    if len(rows) == 0:
+        return
+
+    picks = (rng.random(len(rows)) * counts[rows]).astype(np.int64)
+    cumulative = np.cumsum(empty[rows], axis=1)
+    cells = (cumulative > picks[:, None]).argmax(axis=1)
+    values = np.where(rng.random(len(rows)) < SPAWN_FOUR_PROBABILITY, 2, 1)
+    boards[rows, cells] = values
+
+
+def new_boards(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Fresh games with the engine's three initial tiles"""
+    boards = np.zeros((n, 16), dtype=np.uint8)
+    for _ in range(3):
+        spawn_tiles(boards, rng)
+    return boards
+
+
+def can_move(boards: np.ndarray) -> np.ndarray:
+    """Mask of boards with at least one legal move"""
+    grid = boards.reshape(-1, 4, 4)
+    return ((boards == 0).any(axis=1) |
+            (grid[:, :, :-1] == grid[:, :, 1:]).any(axis=(1, 2)) |
+            (grid[:, :-1, :] == grid[:, 1:, :]).any(axis=(1, 2)))
+
+
+def is_finished(boards: np.ndarray) -> np.ndarray:
+    """Mask of boards where gamestate_end_condition() would stop the game"""
+    return ~can_move(boards) | (boards >= WIN_EXPONENT).any(axis=1)
+
+
+def to_exponents(board) -> np.ndarray:
+    """Convert a list-of-rows board of tile values to a (16,) exponent row"""
+    values = np.asarray(board, dtype=np.int64).reshape(16)
+    exponents = np.zeros(16, dtype=np.uint8)
+    nonzero = values > 0
+    exponents[nonzero] = np.log2(values[nonzero]).astype(np.uint8)
+    return exponents
+
+
+def to_values(boards: np.ndarray) -> np.ndarray:
+    """Convert (N, 16) exponents to (N, 4, 4) tile values"""
+    boards = boards.astype(np.int64)
+    return np.where(boards > 0, 1 << boards, 0).reshape(-1, 4, 4)
+
+
+def sample_moves(weights: Dict[str, float], n: int, rng: np.random.Generator) -> np.ndarray:
+    """Draw n direction indices from a {key: weight} distribution"""
+    keys = list(weights)
+    p = np.array([weights[k] for k in keys], dtype=float)
+    directions = np.array([MOVES.index(k) for k in keys])
+    return directions[rng.choice(len(keys), size=n, p=p / p.sum())]
+
+
+class BatchSimulator:
+    """Advances N independent games in lockstep"""
+
+    def __init__(self, n_games: int, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+        self.boards = new_boards(n_games, self.rng)
+        self.scores = np.zeros(n_games, dtype=np.int64)
+        self.moves = np.zeros(n_games, dtype=np.int64)
+        self.alive = ~is_finished(self.boards)
+
+    def step(self, directions: np.ndarray) -> np.ndarray:
+        """Send one key per game (direction indices); returns the moved mask
+
+        Finished games are left untouched. Like the real binary, a key that
+        does not change the board still counts as a keypress but spawns nothing.
+        """
+        directions = np.broadcast_to(np.asarray(directions), self.boards.shape[:1])
+        moved_any = np.zeros(len(self.boards), dtype=bool)
+
+        for direction in range(4):
+            selected = np.flatnonzero(self.alive & (directions == direction))
+            if len(selected) == 0:
+                continue
+            result, gained, moved = move_boards(self.boards[selected], direction)
+            self.boards[selected] = result
+            self.scores[selected] += gained
+            moved_any[selected] = moved
+
+        self.moves[self.alive] += 1
+        spawn_tiles(self.boards, self.rng, moved_any)
+        self.alive &= ~is_finished(self.boards)
+        return moved_any
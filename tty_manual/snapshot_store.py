@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Snapshot Store for 2048 - Deduplicated board snapshots shared by sessions
+
+ManualTestRunner used to write move_XXXX.txt and move_XXXX.json under
+each session's boards/ directory, two small files per snapshot. A store is
+one directory shared by every session (logs/snapshots by default) holding
+two append-only files:
+
+  boards.bin  one packed board key (uint64, board_io.pack_board) per
+              distinct board, in first-seen order
+  index.bin   one 48-byte record per snapshot: session (16-byte UUID),
+              move, score, high score, board key, wall time (ns)
+
+A board repeated within or across sessions is stored once. Opening a
+store reads both files into dicts, so lookups by key or by
+(session, move) are O(1). Each record is appended with one O_APPEND
+write, so several processes can add to the same store. Opening a store
+for writing drops a torn trailing record left by a crash.
+
+Only 4x4 boards with tiles up to 32768 have a packed key; the runner
+writes any other board as legacy files. export_session() and
+`snapshot-store export` rebuild the move_XXXX.txt/.json layout;
+bulk_analyzer and board_corpus read a store directory directly through
+store_items().
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+import click
+import numpy as np
+
+from .board_io import MOVE_NAME, Board, pack_board, unpack_board
+from .tty_reader import format_board_snapshot
+
+DEFAULT_STORE = Path("logs/snapshots")
+BOARDS_FILE = 'boards.bin'
+INDEX_FILE = 'index.bin'
+
+KEY_DTYPE = np.dtype('<u8')
+INDEX_DTYPE = np.dtype([('session', 'V16'), ('move', '<u4'), ('score', '<u4'), ('high_score', '<u4'),
+                        ('pad', 'V4'), ('key', '<u8'), ('time_ns', '<i8')])
+
+_OPEN_STORES: Dict[Path, 'SnapshotStore'] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def _read_records(path: Path, dtype: np.dtype, truncate: bool) -> np.ndarray:
+    """Whole records of an append-only file, optionally truncating a torn tail"""
+    if not path.exists():
+        return np.empty(0, dtype)
+    size = path.stat().st_size
+    whole = size - size % dtype.itemsize
+    if truncate and whole != size:
+        os.truncate(path, whole)
+    return np.fromfile(path, dtype, whole // dtype.itemsize)
+
+
+class SnapshotStore:
+    """Content-addressed board snapshots with a (session, move) index"""
+
+    def __init__(self, path=DEFAULT_STORE, writable: bool = True):
+        self.path = Path(path)
+        self.writable = writable
+        if writable:
+            self.path.mkdir(parents=True, exist_ok=True)
+        elif not (self.path / INDEX_FILE).exists():
+            raise FileNotFoundError(f"no snapshot store at {self.path}")
+        self.lock = threading.Lock()
+        keys = _read_records(self.path / BOARDS_FILE, KEY_DTYPE, writable)
+        self.boards: Dict[int, int] = {}  # Key -> position in boards.bin
+        for position, key in enumerate(keys.tolist()):
+            self.boards.setdefault(key, position)
+        self._board_count = len(keys)
+        self.index: Dict[str, Dict[int, Tuple[int, int, int, int]]] = {}  # Session -> move -> entry
+        self.snapshot_count = 0
+        for record in _read_records(self.path / INDEX_FILE, INDEX_DTYPE, writable):
+            session = str(uuid.UUID(bytes=record['session'].tobytes()))
+            self._add_entry(session, int(record['move']), (int(record['key']), int(record['score']),
+                                                           int(record['high_score']), int(record['time_ns'])))
+        self._boards_fd = self._index_fd = None
+        if writable:
+            flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+            self._boards_fd = os.open(self.path / BOARDS_FILE, flags, 0o644)
+            self._index_fd = os.open(self.path / INDEX_FILE, flags, 0o644)
+
+    def _add_entry(self, session: str, move: int, entry: Tuple[int, int, int, int]) -> None:
+        """entry is (key, score, high score, wall time ns)"""
+        moves = self.index.setdefault(session, {})
+        if move not in moves:
+            self.snapshot_count += 1
+        moves[move] = entry
+
+    def __len__(self) -> int:
+        """Snapshots in the index"""
+        return self.snapshot_count
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.boards
+
+    def put(self, session: str, move: int, board: Board, score: int = 0, high_score: int = 0,
+            time_ns: Optional[int] = None) -> bool:
+        """Record a snapshot; returns True if its board was new to the store
+
+        Raises ValueError for boards without a packed key (see pack_board).
+        """
+        key = pack_board(board)
+        time_ns = time.time_ns() if time_ns is None else time_ns
+        record = np.zeros(1, INDEX_DTYPE)
+        record['session'] = np.void(uuid.UUID(session).bytes)
+        record['move'], record['score'], record['high_score'] = move, score or 0, high_score or 0
+        record['key'], record['time_ns'] = key, time_ns
+        with self.lock:
+            new = key not in self.boards
+            if new:
+                os.write(self._boards_fd, np.array([key], KEY_DTYPE).tobytes())
+                self.boards[key] = self._board_count
+                self._board_count += 1
+            os.write(self._index_fd, record.tobytes())
+            self._add_entry(session, move, (key, score or 0, high_score or 0, time_ns))
+        return new
+
+    def get(self, session: str, move: int) -> Optional[Dict]:
+        """The snapshot taken at a session's move, as a get_board_dict()-style dict"""
+        entry = self.index.get(session, {}).get(move)
+        if entry is None:
+            return None
+        key, score, high_score, time_ns = entry
+        return {'board': unpack_board(key), 'score': score, 'high_score': high_score,
+                'timestamp': datetime.fromtimestamp(time_ns / 1e9, timezone.utc).isoformat()}
+
+    def sessions(self) -> List[str]:
+        return sorted(self.index)
+
+    def moves(self, session: str) -> List[int]:
+        return sorted(self.index.get(session, {}))
+
+    def snapshots(self, session: str) -> Iterator[Tuple[int, Dict]]:
+        """(move, snapshot) pairs of one session in move order"""
+        for move in self.moves(session):
+            yield move, self.get(session, move)
+
+    def close(self) -> None:
+        for fd in (self._boards_fd, self._index_fd):
+            if fd is not None:
+                os.close(fd)
+        self._boards_fd = self._index_fd = None
+
+
+def open_store(path=DEFAULT_STORE) -> SnapshotStore:
+    """The process-wide writable store at path (shared by every runner in the process)"""
+    path = Path(path).resolve()
+    with _OPEN_LOCK:
+        if path not in _OPEN_STORES:
+            _OPEN_STORES[path] = SnapshotStore(path)
+        return _OPEN_STORES[path]
+
+
+def is_store(path) -> bool:
+    """Whether path is a snapshot store directory"""
+    return (Path(path) / INDEX_FILE).is_file()
+
+
+def store_items(path) -> Iterator[Tuple[str, Dict]]:
+    """(source, board record) for every snapshot in a store, sessions in order
+
+    Sources are <store>/<session>/move_XXXX, stable across reads, so a
+    corpus skips snapshots it already ingested.
+    """
+    store = SnapshotStore(path, writable=False)
+    for session in store.sessions():
+        for move, snapshot in store.snapshots(session):
+            yield (str(Path(path) / session / f"move_{move:04d}"),
+                   {'board': snapshot['board'], 'score': snapshot['score'], 'move': move})
+
+
+def export_session(store: SnapshotStore, session: str, directory) -> int:
+    """Write a session's snapshots as the legacy move_XXXX.txt/.json files"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    count = 0
+    for move, snapshot in store.snapshots(session):
+        base = directory / f"move_{move:04d}"
+        base.with_suffix('.txt').write_text(
+            format_board_snapshot(snapshot['board'], snapshot['score'], snapshot['high_score']))
+        with open(base.with_suffix('.json'), 'w') as f:
+            json.dump(snapshot, f, indent=2)
+        count += 1
+    return count
+
+
+def move_number(path: Path) -> int:
+    """Move of a move_XXXX.json/.txt snapshot file (-1 for other names)"""
+    match = MOVE_NAME.search(path.name)
+    return int(match.group(1)) if match else -1
+
+
+@click.group()
+def main():
+    """Inspect and export the deduplicated board snapshot store"""
+
+
+@main.command('info')
+@click.option('--store', 'store_dir', default=str(DEFAULT_STORE), help='Store directory')
+def info_command(store_dir):
+    """Show snapshot, board and session counts"""
+    store = SnapshotStore(store_dir, writable=False)
+    size = sum((store.path / name).stat().st_size for name in (BOARDS_FILE, INDEX_FILE)
+               if (store.path / name).exists())
+    click.echo(f"Snapshots: {len(store)} from {len(store.sessions())} sessions")
+    click.echo(f"Distinct boards: {len(store.boards)} "
+               f"({1 - len(store.boards) / max(len(store), 1):.0%} of snapshots deduplicated)")
+    click.echo(f"Size: {size:,} bytes in 2 files")
+
+
+@main.command('export')
+@click.argument('sessions', nargs=-1)
+@click.option('--store', 'store_dir', default=str(DEFAULT_STORE), help='Store directory')
+@click.option('--output', '-o', default='logs',
+              help='Writes <output>/manual_test_<session>/boards/move_XXXX.{txt,json}')
+def export_command(sessions, store_dir, output):
+    """Rebuild the per-file snapshot layout for SESSIONS (default: all)"""
+    store = SnapshotStore(store_dir, writable=False)
+    for session in sessions or store.sessions():
+        count = export_session(store, session, Path(output) / f"manual_test_{session}" / "boards")
+        click.echo(f"{session}: {count} snapshots")
+
+
+@main.command('migrate')
+@click.argument('log_dirs', nargs=-1, required=True)
+@click.option('--store', 'store_dir', default=str(DEFAULT_STORE), help='Store directory')
+@click.option('--remove', is_flag=True, help='Delete the JSON/text files once stored')
+def migrate_command(log_dirs, store_dir, remove):
+    """Move existing logs/manual_test_<guid>/boards files into the store"""
+    store = SnapshotStore(store_dir)
+    stored = skipped = 0
+    for log_dir in map(Path, log_dirs):
+        session = log_dir.name.replace('manual_test_', '', 1)
+        for json_file in sorted((log_dir / 'boards').glob('move_*.json')):
+            if move_number(json_file) in store.index.get(session, {}):
+                skipped += 1  # Already migrated
+                continue
+            try:
+                with open(json_file) as f:
+                    data = json.load(f)
+                move = move_number(json_file)
+                when = datetime.fromisoformat(data['timestamp']).timestamp() if data.get('timestamp') else None
+                store.put(session, move, data['board'], data.get('score'), data.get('high_score'),
+                          int(when * 1e9) if when is not None else None)
+            except (OSError, ValueError, KeyError, TypeError):
+                skipped += 1  # Not a UUID session, unparseable file, or a board without a key
+                continue
+            stored += 1
+            if remove:
+                json_file.unlink()
+                json_file.with_suffix('.txt').unlink(missing_ok=True)
+    store.close()
+    click.echo(f"Stored {stored} snapshots ({skipped} skipped); store has {len(store.boards)} distinct boards")
+
+
+if __name__ == "__main__":
+    main()
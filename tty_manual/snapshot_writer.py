@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Snapshot Writer for 2048 - Log and snapshot I/O off the control loop
+
+ManualTestRunner writes a board snapshot every 10 moves and a move-log
+record every move, all inside the move loop. SnapshotWriter
+runs those writes on one background thread behind a bounded queue, so a
+slow disk delays the files instead of the next key.
+
+Jobs are plain callables, run in submission order. When the queue is full:
+  - droppable jobs (board snapshots, sampled every 10 moves anyway) are
+    dropped and counted;
+  - other jobs (move-log records, which must stay complete and ordered)
+    wait for room, and the wait is counted as a stall.
+close() drains the queue; the runner calls it when it writes the summary,
+which also happens after Ctrl-C.
+
+The CLI benchmarks the runner's control-loop I/O with and without the
+writer thread.
+"""
+
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Optional
+import click
+
+DEFAULT_MAX_PENDING = 256
+DEFAULT_BATCH = 32
+DEFAULT_INTERVAL = 0.1  # Seconds a queued write may wait for a batch
+
+
+def write_snapshot_files(base: Path, text: str, data: str) -> None:
+    """Write move_XXXX.txt and move_XXXX.json for one snapshot (base has no suffix)"""
+    base.with_suffix('.txt').write_text(text)
+    base.with_suffix('.json').write_text(data)
+
+
+class SnapshotWriter:
+    """Runs file writes on a background thread behind a bounded queue
+
+    The thread wakes once `batch` jobs are waiting or every `interval`
+    seconds, not per job: each wake-up costs the control loop a thread
+    switch, which on a single core is a whole scheduler slice.
+    """
+
+    def __init__(self, max_pending: int = DEFAULT_MAX_PENDING, batch: int = DEFAULT_BATCH,
+                 interval: float = DEFAULT_INTERVAL):
+        self.max_pending = max_pending
+        self.batch = min(batch, max_pending)
+        self.interval = interval
+        self._jobs: deque = deque()
+        self._condition = threading.Condition()
+        self.stats = {'queued': 0, 'written': 0, 'dropped': 0, 'stalls': 0, 'stall_s': 0.0,
+                      'errors': 0, 'max_pending': 0}
+        self.last_error: Optional[str] = None
+        self.closed = False
+        self._thread = threading.Thread(target=self._run, name='snapshot-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, job: Callable[[], None], droppable: bool = False) -> bool:
+        """Queue a write; returns False if it was dropped"""
+        with self._condition:
+            if not self.closed:
+                if len(self._jobs) >= self.max_pending:
+                    if droppable:
+                        self.stats['dropped'] += 1
+                        return False
+                    start = time.perf_counter()
+                    self._condition.notify_all()
+                    self._condition.wait_for(lambda: len(self._jobs) < self.max_pending or self.closed)
+                    self.stats['stalls'] += 1
+                    self.stats['stall_s'] += time.perf_counter() - start
+                if not self.closed:
+                    self._jobs.append(job)
+                    self.stats['queued'] += 1
+                    self.stats['max_pending'] = max(self.stats['max_pending'], len(self._jobs))
+                    if len(self._jobs) >= self.batch:
+                        self._condition.notify_all()
+                    return True
+        self._call(job)  # Late writes (after close) run inline
+        return True
+
+    def _call(self, job: Callable[[], None]) -> None:
+        try:
+            job()
+        except Exception as e:  # A failed write must not kill the thread
+            with self._condition:
+                self.stats['errors'] += 1
+                self.last_error = repr(e)
+        else:
+            with self._condition:
+                self.stats['written'] += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._jobs) >= self.batch or self.closed,
+                                         self.interval)
+                jobs = list(self._jobs)
+                self._jobs.clear()
+                self._condition.notify_all()  # Wake stalled submitters
+                finished = self.closed
+            for job in jobs:
+                self._call(job)
+            if finished:
+                return
+
+    def close(self, timeout: Optional[float] = None) -> Dict:
+        """Write everything still queued, stop the thread and return the stats"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        with self._condition:
+            return dict(self.stats, last_error=self.last_error)
+
+
+def percentiles_ms(durations) -> Dict[str, float]:
+    """p50/p95/p99/max of a list of durations in seconds, as milliseconds"""
+    ordered = sorted(durations)
+    if not ordered:
+        return {'count': 0}
+
+    def at(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {'count': len(ordered), 'p50_ms': at(0.5), 'p95_ms': at(0.95), 'p99_ms': at(0.99),
+            'max_ms': ordered[-1] * 1000}
+
+
+@click.command()
+@click.option('--games', '-g', default=3, help='Games per mode')
+@click.option('--game-binary', default='2048-cli-0.9.1/2048', help='Path to 2048 binary')
+@click.option('--keep-logs', is_flag=True, help="Keep the benchmark games' log directories")
+def main(games, game_binary, keep_logs):
+    """Benchmark the runner's control-loop I/O with and without the writer thread"""
+    import contextlib
+    import io
+    import shutil
+    import tempfile
+    from .manual_test_runner import ManualTestRunner
+    from .tty_reader import launch_args
+
+    click.echo(f"{'I/O':12} {'calls':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}   "
+               f"move p50/p95 (ms)   writer")
+    store = tempfile.mkdtemp(prefix='snapshot-bench-')
+    for name, background in (('synchronous', False), ('background', True)):
+        io_times, latencies, stats = [], [], []
+        for _ in range(games):
+            # Spam the whole game: no inspections, no advisor
+            runner = ManualTestRunner(spam_moves=10 ** 6, game_binary=game_binary,
+                                      game_args=launch_args((), True), settle=0.0,
+                                      background_io=background, snapshot_store=store)
+            with contextlib.redirect_stdout(io.StringIO()):
+                runner.run()
+            io_times.extend(runner.io_times)
+            latencies.extend(runner.reader.move_latencies)
+            if runner.writer_stats:
+                stats.append(runner.writer_stats)
+            if not keep_logs:
+                shutil.rmtree(runner.log_dir, ignore_errors=True)
+        io_ms, move_ms = percentiles_ms(io_times), percentiles_ms(latencies)
+        writer = (f"{sum(s['dropped'] for s in stats)} dropped, {sum(s['stalls'] for s in stats)} stalls, "
+                  f"max {max(s['max_pending'] for s in stats)} queued" if stats else '-')
+        click.echo(f"{name:12} {io_ms['count']:>6} {io_ms.get('p50_ms', 0):8.3f} {io_ms.get('p95_ms', 0):8.3f} "
+                   f"{io_ms.get('p99_ms', 0):8.3f} {io_ms.get('max_ms', 0):8.3f}   "
+                   f"{move_ms.get('p50_ms', 0):6.2f} / {move_ms.get('p95_ms', 0):6.2f}     {writer}")
+    if not keep_logs:
+        shutil.rmtree(store, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Tournament Scheduler for 2048 - Policy comparisons across cores and hosts
+
+A tournament plays `games` simulated games for every policy. The games
+are split into chunks of (policy, chunk) jobs. A coordinator hands jobs
+out over a multiprocessing.connection socket. Workers are local
+processes or `tournament worker --connect host:port` on other machines.
+Each worker pulls a job whenever it is idle, so fast hosts simply take
+more chunks.
+
+Once the queue is empty, an idle worker steals the oldest chunk still
+running elsewhere (one extra copy per chunk). Whichever copy finishes
+first counts, so a slow or dead host never holds up the end of a run. A
+worker that disconnects has its chunks put back at the front of the
+queue.
+
+Every finished chunk is appended to a JSONL checkpoint as mergeable
+statistics, and a restarted run skips chunks already recorded there.
+Chunk i of every policy uses the same simulator seed, so policies are
+compared on paired games.
+"""
+
+import ipaddress
+import json
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import click
+import numpy as np
+
+from .policies import POLICIES, evaluate, get_policy
+
+DEFAULT_ADDRESS = ('127.0.0.1', 20480)
+DEFAULT_AUTHKEY = b'2048-tournament'  # Public: only accepted on loopback addresses
+
+Job = Tuple[str, int]  # (policy name, chunk index)
+
+
+def chunk_seed(base_seed: int, chunk: int) -> int:
+    """Simulator seed of a chunk, shared by every policy so games are paired"""
+    return int(np.random.SeedSequence([base_seed, chunk]).generate_state(1)[0])
+
+
+def play_chunk(config: Dict, job: Job) -> Dict:
+    """Play one chunk and summarize it as mergeable statistics"""
+    name, chunk = job
+    games = min(config['chunk_size'], config['games'] - chunk * config['chunk_size'])
+    seed = chunk_seed(config['seed'], chunk)
+    policy_seed = seed ^ zlib.crc32(name.encode())
+    start = time.perf_counter()
+    results = evaluate(get_policy(name, policy_seed), games, config['max_moves'], seed, chunk=games)
+    scores = results['score'].astype(np.float64)
+    return {
+        'games': games,
+        'score_sum': float(scores.sum()),
+        'score_squares': float((scores ** 2).sum()),
+        'score_max': int(scores.max()),
+        'moves': int(results['moves'].sum()),
+        'stalled': int(results['stalled'].sum()),
+        'max_tiles': {str(tile): int(count) for tile, count in
+                      zip(*np.unique(results['max_tile'], return_counts=True))},
+        'time_s': time.perf_counter() - start,
+    }
+
+
+def merge_stats(chunks: List[Dict]) -> Dict:
+    """Combine chunk statistics into one policy summary"""
+    games = sum(c['games'] for c in chunks)
+    total = sum(c['score_sum'] for c in chunks)
+    squares = sum(c['score_squares'] for c in chunks)
+    tiles = Counter()
+    for c in chunks:
+        tiles.update({int(tile): count for tile, count in c['max_tiles'].items()})
+    mean = total / games if games else 0.0
+    std = (max(0.0, squares / games - mean ** 2)) ** 0.5 if games else 0.0
+    return {
+        'games': games,
+        'score_mean': mean,
+        'score_std': std,
+        'score_stderr': std / games ** 0.5 if games else 0.0,
+        'score_max': max((c['score_max'] for c in chunks), default=0),
+        'moves': sum(c['moves'] for c in chunks),
+        'stalled': sum(c['stalled'] for c in chunks),
+        'max_tiles': dict(sorted(tiles.items())),
+        'cpu_s': sum(c['time_s'] for c in chunks),
+    }
+
+
+class Checkpoint:
+    """Append-only JSONL record of finished chunks for one tournament config"""
+
+    def __init__(self, path: Path, config: Dict):
+        self.path = path
+        self.done: Dict[Job, Dict] = {}
+        if path.exists():
+            data = path.read_bytes()
+            complete = data[:data.rfind(b'\n') + 1]  # Every entry ends in a newline; drop a torn tail
+            if len(complete) != len(data):
+                os.truncate(path, len(complete))
+            lines = [json.loads(line) for line in complete.decode().splitlines() if line.strip()]
+            if lines and lines[0].get('config') != config:
+                raise ValueError(f"{path} belongs to a tournament with different settings: "
+                                 f"{lines[0].get('config')}")
+            for entry in lines[1:]:
+                self.done[(entry['policy'], entry['chunk'])] = entry['stats']
+        self._file = open(path, 'a')
+        if not self.done and path.stat().st_size == 0:
+            self._write({'config': config})
+
+    def _write(self, entry: Dict) -> None:
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, job: Job, stats: Dict) -> None:
+        self.done[job] = stats
+        self._write({'policy': job[0], 'chunk': job[1], 'stats': stats})
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class Coordinator:
+    """Serves jobs to workers over a Listener and collects their results"""
+
+    def __init__(self, config: Dict, checkpoint: Checkpoint, address=DEFAULT_ADDRESS,
+                 authkey: bytes = DEFAULT_AUTHKEY, progress=None):
+        self.config = config
+        self.checkpoint = checkpoint
+        self.progress = progress
+        n_chunks = -(-config['games'] // config['chunk_size'])
+        jobs = [(name, chunk) for chunk in range(n_chunks) for name in config['policies']]
+        self.total = len(jobs)
+        self.queue = deque(job for job in jobs if job not in checkpoint.done)
+        self.running: Dict[Job, List] = {}  # Job -> [start time, copies in flight]
+        self.stolen = 0
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        if not self.queue:
+            self.finished.set()
+
+    def serve(self) -> None:
+        """Accept workers until every chunk is done"""
+        threading.Thread(target=self._accept, daemon=True).start()
+        self.finished.wait()
+
+    def _accept(self) -> None:
+        while not self.finished.is_set():
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError):
+                continue
+            threading.Thread(target=self._serve_worker, args=(conn,), daemon=True).start()
+
+    def _next_job(self) -> Optional[Job]:
+        with self.lock:
+            if self.queue:
+                job = self.queue.popleft()
+                self.running[job] = [time.time(), 1]
+                return job
+            # Nothing queued: steal the oldest chunk that has only one copy running
+            candidates = [(started, job) for job, (started, copies) in self.running.items() if copies == 1]
+            if candidates:
+                job = min(candidates)[1]
+                self.running[job][1] += 1
+                self.stolen += 1
+                return job
+            return None
+
+    def _serve_worker(self, conn) -> None:
+        mine: List[Job] = []
+        try:
+            while True:
+                message = conn.recv()
+                if message[0] == 'done':
+                    _, job, stats = message
+                    mine.remove(job)
+                    self._finish(job, stats)
+                job = None
+                while job is None and not self.finished.is_set():
+                    job = self._next_job()
+                    if job is None:
+                        time.sleep(0.2)  # Every chunk is running twice; wait for one to end
+                conn.send(None if job is None else (self.config, job))
+                if job is None:
+                    return
+                mine.append(job)
+        except (EOFError, OSError):
+            with self.lock:
+                # Lost worker: put its chunks back at the front of the queue
+                for job in mine:
+                    entry = self.running.get(job)
+                    if entry is None:
+                        continue
+                    entry[1] -= 1
+                    if entry[1] == 0:
+                        del self.running[job]
+                        self.queue.appendleft(job)
+        finally:
+            conn.close()
+
+    def _finish(self, job: Job, stats: Dict) -> None:
+        with self.lock:
+            if job in self.checkpoint.done:
+                return  # The other copy of a stolen chunk finished first
+            self.running.pop(job, None)
+            self.checkpoint.record(job, stats)
+            done = len(self.checkpoint.done)
+            if done == self.total:
+                self.finished.set()
+        if self.progress:
+            self.progress(done, self.total, job, stats)
+
+    def close(self) -> None:
+        self.finished.set()
+        self.listener.close()
+
+
+def run_worker(address, authkey: bytes = DEFAULT_AUTHKEY, retry_s: float = 5.0) -> int:
+    """Pull and play chunks from a coordinator until it has none left; returns chunks played"""
+    deadline = time.time() + retry_s
+    while True:
+        try:
+            conn = Client(tuple(address), authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.2)
+    played = 0
+    with conn:
+        try:
+            conn.send(('ready',))
+            while True:
+                work = conn.recv()
+                if work is None:
+                    break
+                config, job = work
+                stats = play_chunk(config, job)
+                played += 1
+                conn.send(('done', job, stats))
+        except (EOFError, OSError):
+            pass  # The coordinator finished (or went away) while this chunk was running
+    return played
+
+
+def _parse_address(text: str) -> Tuple[str, int]:
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def _authkey(address: Tuple[str, int]) -> bytes:
+    """TOURNAMENT_AUTHKEY, required for any non-loopback address
+
+    Coordinator and workers exchange pickles, so the connection's key is
+    all that keeps other hosts from running code in them; the built-in key
+    is public and is only used on loopback.
+    """
+    key = os.environ.get('TOURNAMENT_AUTHKEY', '').encode()
+    if key:
+        return key
+    host = address[0]
+    try:
+        loopback = host == 'localhost' or ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback:
+        raise click.ClickException(f"{host} is not a loopback address; set TOURNAMENT_AUTHKEY to a "
+                                   f"secret shared by the coordinator and its workers")
+    return DEFAULT_AUTHKEY
+
+
+@click.group()
+def main():
+    """Compare policies over millions of simulated games on many cores and hosts"""
+
+
+@main.command('run')
+@click.argument('names', nargs=-1)
+@click.option('--games', '-g', default=100000, help='Games per policy')
+@click.option('--chunk-size', default=10000, help='Games per job')
+@click.option('--max-moves', default=5000, help='Key cap per game')
+@click.option('--seed', default=0, help='Base seed (chunk i uses the same seed for every policy)')
+@click.option('--workers', '-w', default=0, help='Local worker processes (0 = one per CPU)')
+@click.option('--listen', default='127.0.0.1:20480',
+              help='Coordinator address for remote workers (non-loopback needs TOURNAMENT_AUTHKEY)')
+@click.option('--checkpoint', default='tournament.jsonl', type=click.Path(),
+              help='Finished chunks; rerun with the same file to resume')
+@click.option('--output', '-o', type=click.Path(), help='Write per-policy summaries as JSON')
+def run_command(names, games, chunk_size, max_moves, seed, workers, listen, checkpoint, output):
+    """Coordinate a tournament and play it with local (and any remote) workers"""
+    names = list(names or POLICIES)
+    unknown = [name for name in names if name not in POLICIES]
+    if unknown:
+        raise click.BadParameter(f"unknown policies: {', '.join(unknown)} (known: {', '.join(POLICIES)})")
+    config = {'policies': names, 'games': games, 'chunk_size': chunk_size,
+              'max_moves': max_moves, 'seed': seed}
+    address = _parse_address(listen)
+    authkey = _authkey(address)
+    try:
+        record = Checkpoint(Path(checkpoint), config)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    start = time.perf_counter()
+    resumed = len(record.done)
+
+    def progress(done, total, job, stats):
+        rate = (done - resumed) * chunk_size / (time.perf_counter() - start)
+        click.echo(f"[{done}/{total}] {job[0]} chunk {job[1]}: {stats['games']} games in "
+                   f"{stats['time_s']:.1f}s ({rate:,.0f} games/s overall)", err=True)
+
+    coordinator = Coordinator(config, record, address, authkey, progress)
+    if resumed:
+        click.echo(f"Resuming: {resumed}/{coordinator.total} chunks already in {checkpoint}", err=True)
+    local = [multiprocessing.Process(target=run_worker, args=(coordinator.address, authkey), daemon=True)
+             for _ in range(workers or os.cpu_count() or 1)]
+    for process in local:
+        process.start()
+    try:
+        coordinator.serve()
+    except KeyboardInterrupt:
+        click.echo(f"\nInterrupted; {len(record.done)} chunks saved in {checkpoint}", err=True)
+        return
+    finally:
+        coordinator.close()
+        record.close()
+        for process in local:
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.terminate()
+
+    summaries = {}
+    for name in names:
+        chunks = [stats for (policy, _), stats in record.done.items() if policy == name]
+        summaries[name] = summary = merge_stats(chunks)
+        click.echo(f"{name:12} {summary['games']:>9} games: score {summary['score_mean']:.1f} "
+                   f"± {summary['score_stderr']:.1f}, max {summary['score_max']}, "
+                   f"{summary['stalled']} stalled")
+    click.echo(f"Played in {time.perf_counter() - start:.1f}s; {coordinator.stolen} chunks stolen",
+               err=True)
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'config': config, 'policies': summaries}, f, indent=2)
+
+
+@main.command('worker')
+@click.option('--connect', default='127.0.0.1:20480', help='Coordinator address (host:port)')
+@click.option('--processes', '-p', default=0, help='Worker processes on this host (0 = one per CPU)')
+def worker_command(connect, processes):
+    """Join a running tournament from this host"""
+    address = _parse_address(connect)
+    authkey = _authkey(address)
+    with multiprocessing.Pool(processes or os.cpu_count() or 1) as pool:
+        played = pool.starmap(run_worker, [(address, authkey, 60.0)] * (processes or os.cpu_count() or 1))
+    click.echo(f"Played {sum(played)} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,56 +15,393 @@ import json
 from datetime import datetime, timezone
 import click
 
+from .board_io import MIN_SIDE, MAX_SIDE
+from .board_analyzer import grid_move
+from .simulator import MOVES
+from .screen import Screen, BoardExtractor, screen_size
+from .frame_layout import FrameLayout, parse_scores
+
+# One complete gfx_terminal.c frame: score line, hi line, border, rows, border
+FRAME_PATTERN = re.compile(r'Score:[^\n]*\n[^\n]*Hi:[^\n]*\n-{4,}\r?\n(?:\|[^\n]*\n)+-{4,}\r?\n')
+
+# Quiet period that marks the end of a move's animation. draw_then_sleep()
+# pauses 160 / width ms between frames (40 ms on 4x4), so a longer gap means
+# the final frame has been drawn.
+ANIMATION_SETTLE = 0.06
+
+# curses flushes one refresh in several writes; a frame read through the
+# screen emulator counts as complete once output pauses this long
+SCREEN_QUIET = 0.01
+
+# The terminal size reported to the game (curses lays out its window from
+# it) is screen_size() of the board side the game is launched with
+
+# Score the engine prints on exit, after the last frame
+FINAL_SCORE = re.compile(r'\n(\d+)\r?\n$')
+FINAL_SCORE_BYTES = re.compile(FINAL_SCORE.pattern.encode())
+
+# Keys per write() when pipelining; stays under the pty's 4 KiB input queue
+PIPELINE_CHUNK = 1024
+
+# Game options of the turbo launch profile: no move animation, so every
+# move draws exactly one frame and needs no settle time
+TURBO_ARGS = ('-A',)
+
+# Upper bound on buffered output when no complete frame is being found
+MAX_BUFFER = 65536
+
+# Bytes requested per read() of the pty
+READ_SIZE = 4096
+
+# Paced send_moves(): unread output above which the reader counts as falling
+# behind (more than one read can take), and the most keys written ahead
+BACKLOG_TARGET = READ_SIZE
+MAX_IN_FLIGHT = 32
+
+
+def find_last_frame(text, start=0):
+    """Most recent complete frame in text[start:], searching backwards
+
+    Only the 'Score:' anchors from the end of the text are tried, so the
+    cost depends on the size of the last frame, not on the text length.
+    """
+    end = len(text)
+    while True:
+        pos = text.rfind('Score:', start, end)
+        if pos < 0:
+            return None
+        match = FRAME_PATTERN.match(text, pos)
+        if match:
+            return match
+        end = pos
+
+
+def _border_end(buffer, pos, end):
+    """End of a '----' border line starting at pos, or -1"""
+    newline = buffer.find(b'\n', pos, end)
+    stop = newline - 1 if newline > 0 and buffer[newline - 1] == 13 else newline  # Drop '\r'
+    if newline < 0 or stop - pos < 4 or buffer.count(b'-', pos, stop) != stop - pos:
+        return -1
+    return newline + 1
+
+
+def frame_end(buffer, pos, end):
+    """End of the complete frame starting at buffer[pos] ('Score:'), or -1
+
+    The bytes counterpart of FRAME_PATTERN, checked with find() and
+    count() on the buffer so no match objects or copies are created.
+    """
+    score_end = buffer.find(b'\n', pos, end)
+    if score_end < 0:
+        return -1
+    hi_end = buffer.find(b'\n', score_end + 1, end)
+    if hi_end < 0 or buffer.find(b'Hi:', score_end + 1, hi_end) < 0:
+        return -1
+    row = _border_end(buffer, hi_end + 1, end)
+    if row < 0 or not buffer.startswith(b'|', row, end):
+        return -1
+    while buffer.startswith(b'|', row, end):
+        row = buffer.find(b'\n', row, end) + 1
+        if not row:
+            return -1
+    return _border_end(buffer, row, end)
+
+
+def find_last_frame_span(buffer, start, end):
+    """(start, end) of the most recent complete frame in buffer[start:end], or None"""
+    stop = end
+    while True:
+        pos = buffer.rfind(b'Score:', start, stop)
+        if pos < 0:
+            return None
+        frame = frame_end(buffer, pos, end)
+        if frame >= 0:
+            return pos, frame
+        stop = pos
+
+
+def parse_frame(buffer, start, end):
+    """(board, score, high_score) of the frame at buffer[start:end]
+
+    Reads the bytes in place: only the score digits and the cell fields
+    are turned into ints, nothing else is decoded or copied.
+    """
+    score, high_score, top = parse_scores(buffer, start, end)
+    board = []
+    bar = buffer.find(b'\n|', top, end) + 1
+    while bar:
+        line_end = buffer.find(b'\n', bar, end)
+        cells = buffer[bar + 1:buffer.rfind(b'|', bar, line_end)].split(b'|')
+        board.append([0 if digits.isspace() else int(digits) for digits in cells])
+        bar = buffer.find(b'\n|', line_end, end) + 1
+    return board, score, high_score
+
+
+def _is_spawn_of(predicted, board) -> bool:
+    """Whether board is the predicted grid plus exactly one new 2 or 4 tile"""
+    if len(board) != len(predicted) or any(len(a) != len(b) for a, b in zip(board, predicted)):
+        return False
+    changed = [(old, new) for row_old, row_new in zip(predicted, board)
+               for old, new in zip(row_old, row_new) if old != new]
+    return len(changed) == 1 and changed[0][0] == 0 and changed[0][1] in (2, 4)
+
+
+def classify_frame(previous, move, board) -> str:
+    """Classify a frame drawn after `move` was played on `previous`
+
+    The engine draws the final frame of a move only after spawning, so it
+    is the moved board plus exactly one new tile ('final'). Frames drawn
+    by draw_then_sleep() between gravitate and merge passes have no new
+    tile ('intermediate'). A key that moves nothing has no final frame
+    ('noop', whatever the board).
+    """
+    grid = tuple(map(tuple, previous))
+    predicted = grid_move(grid, MOVES.index(move))
+    if predicted == grid:
+        return 'noop'
+    return 'final' if _is_spawn_of(predicted, board) else 'intermediate'
+
+
+def launch_args(game_args=(), turbo=False):
+    """Game options for a launch, with the turbo profile's options added"""
+    args = list(game_args)
+    if turbo:
+        args += [arg for arg in TURBO_ARGS if arg not in args]
+    return args
+
+
+def board_side(game_args=()) -> int:
+    """Board side a game launched with these options plays (-s N, as options.c reads it)"""
+    side = MIN_SIDE
+    args = list(game_args)
+    for i, arg in enumerate(args):
+        if arg.startswith('-') and not arg.startswith('--') and 's' in arg[1:]:
+            value = arg[arg.index('s', 1) + 1:] or (args[i + 1] if i + 1 < len(args) else '')
+            if value.isdigit() and MIN_SIDE < int(value) <= MAX_SIDE:
+                side = int(value)
+    return side
+
+
+class Pacer:
+    """Inter-move delay that adapts to the game's render throughput (AIMD)
+
+    Every drawn move reports the time since the previous one and the
+    backlog, the bytes of output not read yet (FIONREAD). While the backlog
+    stays small the delay shrinks by a tenth of the measured frame time;
+    once it grows the delay doubles (to at least one frame time). Writes
+    then settle just under the rate the game and the reader can sustain,
+    with at most max_in_flight keys written ahead of their frames.
+    """
+
+    def __init__(self, backlog_target: int = BACKLOG_TARGET, max_in_flight: int = MAX_IN_FLIGHT,
+                 max_delay: float = 0.5):
+        self.backlog_target = backlog_target
+        self.max_in_flight = max_in_flight
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self.frame_time = None  # Moving average of seconds per drawn move
+        self.slowdowns = 0
+
+    def observe(self, frame_interval: float, backlog: int) -> None:
+        if self.frame_time is None:
+            self.frame_time = frame_interval
+        else:
+            self.frame_time += (frame_interval - self.frame_time) / 8
+        if backlog > self.backlog_target:
+            self.delay = min(self.max_delay, max(self.delay * 2, self.frame_time))
+            self.slowdowns += 1
+        else:
+            self.delay = max(0.0, self.delay - self.frame_time / 10)
+
+    def moves_per_second(self) -> float:
+        return 1 / self.frame_time if self.frame_time else 0.0
+
+
 class TTYReader:
     """Reads 2048 game output from a pseudo-terminal"""
     
-    def __init__(self, game_binary="2048-cli-0.9.1/2048"):
+    def __init__(self, game_binary="2048-cli-0.9.1/2048", game_args=(), screen=False):
         self.game_binary = game_binary
+        self.game_args = list(game_args)
+        # Screen emulation reads any front end (curses, colour); otherwise frames are regex-parsed
+        self.screen_size = screen_size(board_side(self.game_args))
+        self.screen = Screen(*self.screen_size) if screen else None
+        self.extractor = BoardExtractor(self.screen) if screen else None
         self.master_fd = None
         self.slave_fd = None
         self.process = None
         self.current_board = None
         self.current_score = 0
         self.high_score = 0
-        self.output_buffer = ""
+        # Raw output from the start of the last complete frame, read in place
+        self._buffer = bytearray(MAX_BUFFER + READ_SIZE)
+        self._view = memoryview(self._buffer)
+        self._length = 0         # Bytes of _buffer in use
+        self.layout = None       # Cell offsets learned from the first frame
+        self.buffer_offset = 0   # Stream position of _buffer[0]
+        self.move_latencies = []
+        self.move_timeouts = 0
+        self.noop_moves = 0           # Keys not sent because the engine would ignore them
+        self.intermediate_frames = 0  # Animation frames skipped while waiting for final ones
+        self.pacer = Pacer()
+        self.frame_listener = None  # Called with (board, score) of every complete frame (raw mode)
+        self._scan_position = 0     # Stream position up to which frames were delivered
         
     def start_game(self):
         """Start 2048 in a pseudo-terminal"""
+        self._spawn()
+        print(f"Started game with PID {self.process.pid}")
+        
+    def _spawn(self):
+        """Launch the game on a new non-blocking pty master"""
         # Create pseudo-terminal
         self.master_fd, self.slave_fd = pty.openpty()
+        import fcntl
+        import struct
+        import termios
+        fcntl.ioctl(self.slave_fd, termios.TIOCSWINSZ,
+                    struct.pack('HHHH', *self.screen_size, 0, 0))
         
         # Start game process
+        env = dict(os.environ)
+        if self.screen:
+            env['TERM'] = 'xterm'  # What Screen emulates
         self.process = subprocess.Popen(
-            [self.game_binary],
+            [self.game_binary] + self.game_args,
             stdin=self.slave_fd,
             stdout=self.slave_fd,
             stderr=self.slave_fd,
-            close_fds=True
+            close_fds=True,
+            env=env
         )
         
         # Close slave in parent
         os.close(self.slave_fd)
         
         # Make master non-blocking
-        import fcntl
         flags = fcntl.fcntl(self.master_fd, fcntl.F_GETFL)
         fcntl.fcntl(self.master_fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
         
-        print(f"Started game with PID {self.process.pid}")
-        
     def read_output(self, timeout=0.1):
-        """Read available output from the game"""
+        """Read available output from the game; returns it decoded ("" if none arrived)
+
+        The chunk is copied out for the caller; the reader's own loops use
+        poll_output(), which reads in place and returns only a count.
+        """
         try:
             r, _, _ = select.select([self.master_fd], [], [], timeout)
             if r:
-                data = os.read(self.master_fd, 4096)
+                data = os.read(self.master_fd, READ_SIZE)
                 if data:
-                    decoded = data.decode('utf-8', errors='ignore')
-                    self.output_buffer += decoded
-                    return decoded
+                    self.feed(data)
+                    return data.decode('utf-8', errors='ignore')
         except OSError:
             pass
         return ""
+
+    def poll_output(self, timeout=0.1):
+        """Wait up to `timeout` for output and read it in place; returns the number of bytes read"""
+        try:
+            r, _, _ = select.select([self.master_fd], [], [], timeout)
+            if r:
+                return self.read_chunk()
+        except OSError:
+            pass
+        return 0
+
+    def read_chunk(self):
+        """Read what the pty has (up to READ_SIZE bytes); 0 at end of output
+
+        In raw mode the bytes land directly in the preallocated buffer.
+        Raises BlockingIOError if nothing is available.
+        """
+        if self.screen:
+            data = os.read(self.master_fd, READ_SIZE)
+            if data:
+                self.feed(data)
+            return len(data)
+        if self._length > MAX_BUFFER:
+            self._discard(self._length - MAX_BUFFER)
+        count = os.readv(self.master_fd, [self._view[self._length:self._length + READ_SIZE]])
+        if count:
+            self._length += count
+            self._scan()
+        return count
+
+    def feed(self, data):
+        """Append output (bytes or str), dropping everything before the last complete frame"""
+        if isinstance(data, str):
+            data = data.encode()
+        if self.screen:
+            self.screen.feed(data.decode('utf-8', errors='ignore'))
+            self.buffer_offset += len(data)
+            return
+        for i in range(0, len(data), READ_SIZE):
+            chunk = data[i:i + READ_SIZE]
+            if self._length > MAX_BUFFER:
+                self._discard(self._length - MAX_BUFFER)
+            self._buffer[self._length:self._length + len(chunk)] = chunk
+            self._length += len(chunk)
+            self._scan()
+
+    def _scan(self):
+        """Deliver new frames to frame_listener and drop output before the last frame"""
+        if self.frame_listener is not None:
+            pos = self._buffer.find(b'Score:', max(0, self._scan_position - self.buffer_offset), self._length)
+            while pos >= 0:
+                end = frame_end(self._buffer, pos, self._length)
+                if end >= 0:
+                    self._scan_position = self.buffer_offset + end
+                    board, score, _ = self._parse_frame(pos, end)
+                    self.frame_listener(board, score)
+                pos = self._buffer.find(b'Score:', pos + 1, self._length)
+
+        frame = find_last_frame_span(self._buffer, 0, self._length)
+        if frame is not None and frame[0]:
+            self._discard(frame[0])
+
+    def _parse_frame(self, start, end):
+        """Parse buffer[start:end] at the learned offsets, relearning them if the frame does not fit"""
+        if self.layout is not None:
+            parsed = self.layout.parse(self._buffer, start, end)
+            if parsed is not None:
+                return parsed
+        self.layout = FrameLayout.learn(self._buffer, start, end)
+        return parse_frame(self._buffer, start, end)
+
+    def _discard(self, count):
+        """Drop the first `count` bytes of the buffer, moving the rest down in place"""
+        self._view[:self._length - count] = self._view[count:self._length]
+        self._length -= count
+        self.buffer_offset += count
+
+    def exit_score(self):
+        """Score the engine printed after its last frame on exit, or None"""
+        if self.screen:
+            text = self.screen.line(max(0, self.screen.cursor_row - 1)).strip()
+            return int(text) if text.isdigit() else None
+        match = FINAL_SCORE_BYTES.search(self._buffer, 0, self._length)
+        return int(match.group(1)) if match else None
+
+    @property
+    def output_buffer(self):
+        """Buffered raw output as text (from the start of the last complete frame)"""
+        return self._buffer[:self._length].decode('utf-8', errors='ignore')
+
+    def backlog(self):
+        """Bytes the game has written to the pty that have not been read yet"""
+        import fcntl
+        import struct
+        import termios
+        try:
+            raw = fcntl.ioctl(self.master_fd, termios.FIONREAD, b'\0\0\0\0')
+        except OSError:
+            return 0
+        return struct.unpack('i', raw)[0]
+
+    def stream_position(self):
+        """Total bytes of output received so far"""
+        return self.buffer_offset + self._length
     
     def send_move(self, move):
         """Send a move to the game (w/a/s/d)"""
@@ -73,10 +410,268 @@ class TTYReader:
             return True
         return False
     
+    def drain_output(self):
+        """Consume output that is already pending without waiting"""
+        while self.poll_output(0):
+            pass
+        if self.screen:
+            self.parse_board_state()  # Consume redraws so the next frame is a new one
+
+    def wait_for_frame(self, timeout=1.0, settle=0.0, since=None, move=None):
+        """Block until a complete frame has arrived after stream position `since`
+
+        With settle > 0, keep reading until no output arrives for `settle`
+        seconds, so the last frame of an animated move is the one parsed.
+        If `move` was just played on current_board (raw parser only), frames
+        are classified instead: the wait ends at the move's final frame
+        without any settle time, and animation frames before it are counted
+        in intermediate_frames; only the final frame ends that wait. Returns
+        the time of the last complete frame (perf_counter), or None if no
+        complete frame (in classified mode: no final frame) arrived before
+        the timeout or the game exited.
+        """
+        if since is None:
+            since = self.stream_position()
+        if self.screen:
+            settle = max(settle, SCREEN_QUIET)
+        final = []
+        classified = move is not None and self.current_board is not None and not self.screen
+        if classified:
+            predicted = grid_move(tuple(map(tuple, self.current_board)), MOVES.index(move))
+
+            def on_frame(board, score):
+                if _is_spawn_of(predicted, board):
+                    final.append((board, score))
+                else:
+                    self.intermediate_frames += 1
+
+            self._scan_position = since
+            self.frame_listener = on_frame
+        deadline = time.perf_counter() + timeout
+        frame_time = None
+        last_output = None
+
+        try:
+            while not final:
+                now = time.perf_counter()
+                if frame_time is None or classified:
+                    wait = deadline - now
+                else:
+                    wait = min(deadline, last_output + settle) - now
+                if wait <= 0:
+                    break
+
+                if self.poll_output(wait):
+                    last_output = time.perf_counter()
+                    if self._frame_arrived(since):
+                        frame_time = last_output
+                elif self.process and self.process.poll() is not None:
+                    break  # Game exited, nothing more will be drawn
+        finally:
+            self.frame_listener = None
+
+        if classified:
+            if not final:
+                return None  # Only animation frames (or none) before the timeout or exit
+            self.current_board, self.current_score = final[0]
+            return last_output
+        if frame_time is not None:
+            self.parse_board_state()
+        return frame_time
+
+    def _frame_arrived(self, since):
+        """Whether a complete frame has been drawn since stream position `since`"""
+        if self.screen:
+            return self.extractor.update()
+        return find_last_frame_span(self._buffer, max(0, since - self.buffer_offset), self._length) is not None
+
+    def send_move_and_wait(self, move, timeout=1.0, settle=0.0):
+        """Send a move and return once the game has drawn a complete new frame
+
+        Returns the latency in seconds from the write to the (last) frame,
+        or None if no frame arrived in time (e.g. the game ended). Latencies
+        are accumulated for latency_stats(). With the raw parser and a known
+        board, the move's final frame is recognised (see classify_frame), so
+        `settle` only applies when the board is unknown; a key the engine
+        would ignore is not sent and returns None.
+        """
+        self.drain_output()
+        known = self.current_board is not None and not self.screen and move in MOVES
+        if known and classify_frame(self.current_board, move, self.current_board) == 'noop':
+            self.noop_moves += 1
+            return None
+        since = self.stream_position()
+        if not self.send_move(move):
+            return None
+        start = time.perf_counter()
+
+        frame_time = self.wait_for_frame(timeout, settle, since, move if known else None)
+        if frame_time is None:
+            if not (self.process and self.process.poll() is not None):
+                self.move_timeouts += 1  # The game ending is not a timeout
+            return None
+        latency = frame_time - start
+        self.move_latencies.append(latency)
+        return latency
+
+    def send_moves(self, moves, timeout=1.0, paced=False):
+        """Pipeline a batch of moves and split the output back into per-move results
+
+        All keys are written up front (in PIPELINE_CHUNK writes), or with
+        paced=True one at a time, spaced by the pacer's adaptive delay so
+        that neither unread output nor unanswered keys pile up. Each key is
+        then matched to its frame by replaying the move on the last known
+        board: a key that changes nothing is a no-op (the engine draws no
+        final frame for it), otherwise its final frame is the predicted board
+        plus exactly one spawned 2 or 4. Animation frames in between never
+        have that shape and are skipped. Needs the raw frame parser (not
+        screen emulation).
+
+        Returns one dict per processed key with 'move', 'moved', 'board',
+        'score' and 'frames_skipped'. Processing stops early if the game
+        ends (the last key's record then has 'game_over' and no board) or a
+        frame does not arrive within `timeout` ('timeout' is set).
+        """
+        if self.screen:
+            raise ValueError("pipelined moves need the raw frame parser")
+        if self.current_board is None:
+            raise ValueError("no current board to replay moves on")
+
+        self.drain_output()
+        frames = []
+        results = []
+        self._scan_position = self.stream_position()
+        self.frame_listener = lambda board, score: frames.append((board, score))
+
+        keys = ''.join(m for m in moves if m in 'wasd').encode()
+        written = 0
+        next_write = time.perf_counter()
+
+        def pump(processed):
+            """Write the keys that are due; returns seconds until the next one"""
+            nonlocal written, next_write
+            if not paced:
+                for i in range(written, len(keys), PIPELINE_CHUNK):
+                    self._write_all(keys[i:i + PIPELINE_CHUNK])
+                written = len(keys)
+            room = min(len(keys), processed + self.pacer.max_in_flight) - written
+            if room <= 0:
+                return None
+            now = time.perf_counter()
+            if now < next_write:
+                return next_write - now
+            delay = self.pacer.delay
+            due = room if delay == 0 else min(room, 1 + int((now - next_write) / delay))
+            self._write_all(keys[written:written + due])
+            written += due
+            next_write = max(next_write, now - delay) + due * delay
+            return None
+
+        try:
+            board = tuple(map(tuple, self.current_board))
+            score = self.current_score
+            next_frame = 0
+            drawn_at = time.perf_counter()
+            for index, key in enumerate(keys.decode()):
+                pump(index)
+                predicted = grid_move(board, MOVES.index(key))
+                record = {'move': key, 'moved': predicted != board, 'frames_skipped': 0}
+                results.append(record)
+                if predicted == board:
+                    record.update(board=[list(r) for r in board], score=score)
+                    continue
+
+                deadline = time.perf_counter() + timeout
+                while True:
+                    while next_frame < len(frames):
+                        parsed, frame_score = frames[next_frame]
+                        next_frame += 1
+                        if _is_spawn_of(predicted, parsed):
+                            board = tuple(map(tuple, parsed))
+                            score = frame_score
+                            if paced:
+                                now = time.perf_counter()
+                                self.pacer.observe(now - drawn_at, self.backlog())
+                                drawn_at = now
+                            break
+                        record['frames_skipped'] += 1
+                        self.intermediate_frames += 1
+                    else:
+                        remaining = deadline - time.perf_counter()
+                        if self.process.poll() is not None and not self.poll_output(0):
+                            final = self.exit_score()
+                            record.update(board=None, score=score if final is None else final,
+                                          game_over=True)
+                            return results
+                        if remaining <= 0:
+                            record.update(board=None, score=score, timeout=True)
+                            self.move_timeouts += 1
+                            return results
+                        due = pump(index)
+                        self.poll_output(remaining if due is None else min(remaining, due))
+                        continue
+                    break
+                record.update(board=[list(r) for r in board], score=score)
+            return results
+        finally:
+            self.frame_listener = None
+            drawn = [record for record in results if record.get('board') is not None]
+            if drawn:
+                self.current_board = drawn[-1]['board']
+                self.current_score = drawn[-1]['score']
+
+    def _write_all(self, data):
+        """Write to the non-blocking master, reading output while the pty is full"""
+        while data:
+            try:
+                written = os.write(self.master_fd, data)
+                data = data[written:]
+            except BlockingIOError:
+                written = 0
+            if data:
+                self.poll_output(0.01)
+
+    def latency_stats(self):
+        """Summary of per-move latencies (milliseconds) from send_move_and_wait()"""
+        latencies = sorted(self.move_latencies)
+        if not latencies:
+            return {'moves': 0, 'timeouts': self.move_timeouts, 'noop_moves': self.noop_moves,
+                    'intermediate_frames': self.intermediate_frames}
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+        return {
+            'moves': len(latencies),
+            'timeouts': self.move_timeouts,
+            'noop_moves': self.noop_moves,
+            'intermediate_frames': self.intermediate_frames,
+            'mean_ms': sum(latencies) / len(latencies) * 1000,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': latencies[-1] * 1000,
+            'moves_per_second': len(latencies) / sum(latencies)
+        }
+
     def parse_board_state(self, output=None):
-        """Parse the board state from terminal output"""
+        """Parse the most recent complete board state from terminal output"""
+        if output is None and self.screen:
+            self.extractor.update()
+            if self.extractor.board is None:
+                return False
+            self.current_board = self.extractor.board
+            self.current_score = self.extractor.score or 0
+            self.high_score = self.extractor.high_score or 0
+            return True
         if output is None:
-            output = self.output_buffer
+            frame = find_last_frame_span(self._buffer, 0, self._length)
+            if frame is None:
+                return False
+            self.current_board, self.current_score, self.high_score = self._parse_frame(*frame)
+            return True
+        frame = find_last_frame(output)
+        if frame is not None:
+            output = frame.group(0)
             
         # Look for the board pattern
         # Score: XXX
@@ -114,7 +709,7 @@ class TTYReader:
             elif in_board and '|' in line:
                 board_lines.append(line)
         
-        if len(board_lines) == 4:
+        if MIN_SIDE <= len(board_lines) <= MAX_SIDE:  # Games started with -s N
             board = []
             for line in board_lines:
                 # Parse cells from line like: |    2 |      |    4 |    8 |
@@ -146,47 +741,111 @@ class TTYReader:
         """Save current board state to file"""
         if self.current_board:
             with open(filepath, 'w') as f:
-                f.write(f"Score: {self.current_score}\n")
-                f.write(f"Hi: {self.high_score}\n")
-                f.write("-" * 29 + "\n")
-                
-                for row in self.current_board:
-                    f.write("|")
-                    for cell in row:
-                        if cell == 0:
-                            f.write("      |")
-                        else:
-                            f.write(f"{cell:5} |")
-                    f.write("\n")
-                    
-                f.write("-" * 29 + "\n")
+                f.write(format_board_snapshot(self.current_board, self.current_score, self.high_score))
                 
     def cleanup(self):
         """Clean up resources"""
         if self.master_fd:
             os.close(self.master_fd)
+            self.master_fd = None
         if self.process:
             self.process.terminate()
             self.process.wait()
 
 
+def format_board_snapshot(board, score, high_score) -> str:
+    """Text rendering of a board as save_board_snapshot writes it"""
+    lines = [f"Score: {score}", f"Hi: {high_score}", "-" * 29]
+    for row in board:
+        lines.append("|" + "".join("      |" if cell == 0 else f"{cell:5} |" for cell in row))
+    lines.append("-" * 29)
+    return "\n".join(lines) + "\n"
+
+
+def measure_latency(game_binary="2048-cli-0.9.1/2048", game_args=(), moves=40, seed=0,
+                    trace_allocations=False):
+    """Play `moves` random moves in a fresh game and return its latency_stats()
+
+    'wall_ms_per_move' is the full time per move seen by a caller,
+    including any settle wait after the final frame. With
+    trace_allocations, tracemalloc also records the median peak of memory
+    allocated within a move ('alloc_bytes_per_move'), which slows the
+    moves down.
+    """
+    import random
+    import statistics
+    import tracemalloc
+    rng = random.Random(seed)
+    peaks = []
+    settle = 0.0 if '-A' in game_args else ANIMATION_SETTLE
+    reader = TTYReader(game_binary, game_args)
+    try:
+        reader._spawn()
+        if reader.wait_for_frame(timeout=2.0, settle=settle, since=0) is None:
+            raise RuntimeError(f"{game_binary} drew no initial frame")
+        if trace_allocations:
+            tracemalloc.start()
+        played = 0
+        start = time.perf_counter()
+        while played < moves and reader.process.poll() is None:
+            if trace_allocations:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+            if reader.send_move_and_wait(rng.choice(MOVES), settle=settle) is not None:
+                played += 1
+                if trace_allocations:
+                    peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        elapsed = time.perf_counter() - start
+    finally:
+        if trace_allocations:
+            tracemalloc.stop()
+        reader.cleanup()
+    stats = reader.latency_stats()
+    stats['wall_ms_per_move'] = elapsed / played * 1000 if played else 0.0
+    if peaks:
+        stats['alloc_bytes_per_move'] = statistics.median(peaks)
+    return stats
+
+
 @click.command()
 @click.option('--game-binary', default='2048-cli-0.9.1/2048', help='Path to 2048 binary')
 @click.option('--moves', '-m', multiple=True, help='Moves to execute (w/a/s/d)')
 @click.option('--output', '-o', help='Save board snapshot to file')
 @click.option('--interactive', '-i', is_flag=True, help='Interactive mode')
-def main(game_binary, moves, output, interactive):
+@click.option('--settle', default=ANIMATION_SETTLE,
+              help='Quiet time (s) that ends a move animation (0 for games run with -A)')
+@click.option('--game-args', default='', help="Extra game options, e.g. '-A -c'")
+@click.option('--screen', is_flag=True, help='Read the board through the terminal emulator (curses/colour builds)')
+@click.option('--turbo', is_flag=True, help='Launch with animation disabled (-A); no settle time needed')
+@click.option('--compare-profiles', type=int, metavar='MOVES',
+              help='Measure per-move latency with and without the turbo profile, then exit')
+@click.option('--trace-allocations', is_flag=True, help='With --compare-profiles, also measure memory allocated per move')
+def main(game_binary, moves, output, interactive, settle, game_args, screen, turbo, compare_profiles,
+         trace_allocations):
     """Test TTY reader for 2048 game"""
+    import shlex
+    if compare_profiles:
+        for name, use_turbo in (('default', False), ('turbo', True)):
+            args = launch_args(shlex.split(game_args), use_turbo)
+            stats = measure_latency(game_binary, args, compare_profiles, trace_allocations=trace_allocations)
+            click.echo(f"{name:8} {' '.join(args) or '(no options)':14} "
+                       f"{stats['wall_ms_per_move']:8.2f} ms/move wall, "
+                       f"frame p50 {stats.get('p50_ms', 0.0):.2f} ms, p95 {stats.get('p95_ms', 0.0):.2f} ms, "
+                       f"{stats['intermediate_frames']} animation frames skipped")
+            if 'alloc_bytes_per_move' in stats:
+                click.echo(f"{'':24}{stats['alloc_bytes_per_move']:8.0f} bytes allocated per move (peak)")
+        return
+
     click.echo("Starting TTY Reader...")
     
-    reader = TTYReader(game_binary)
+    args = launch_args(shlex.split(game_args), turbo)
+    if '-A' in args:
+        settle = 0.0
+    reader = TTYReader(game_binary, args, screen)
     reader.start_game()
     
     # Wait for initial board
-    time.sleep(0.5)
-    initial_output = reader.read_output()
-    
-    if reader.parse_board_state(initial_output):
+    if reader.wait_for_frame(timeout=2.0, since=0) is not None:
         click.echo(f"Score: {reader.current_score}")
         click.echo(f"High Score: {reader.high_score}")
         click.echo("\nInitial Board:")
@@ -201,12 +860,9 @@ def main(game_binary, moves, output, interactive):
     for move in moves:
         if move in ['w', 'a', 's', 'd']:
             click.echo(f"\nSending move: {move}")
-            reader.send_move(move)
-            time.sleep(0.3)
-            
-            reader.read_output()
-            if reader.parse_board_state():
-                click.echo(f"Score: {reader.current_score}")
+            latency = reader.send_move_and_wait(move, settle=settle)
+            if latency is not None:
+                click.echo(f"Score: {reader.current_score} ({latency * 1000:.1f} ms)")
                 for row in reader.current_board:
                     click.echo(f"  {row}")
     
@@ -218,15 +874,17 @@ def main(game_binary, moves, output, interactive):
             if move == 'q':
                 break
             elif move in ['w', 'a', 's', 'd']:
-                reader.send_move(move)
-                time.sleep(0.3)
-                reader.read_output()
-                if reader.parse_board_state():
+                if reader.send_move_and_wait(move, settle=settle) is not None:
                     click.clear()
                     click.echo(f"Score: {reader.current_score}")
                     for row in reader.current_board:
                         click.echo(f"  {row}")
     
+    stats = reader.latency_stats()
+    if stats['moves']:
+        click.echo(f"\nMove latency: mean {stats['mean_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, "
+                   f"max {stats['max_ms']:.1f} ms ({stats['timeouts']} timeouts)")
+    
     # Save final board if requested
     if output:
         reader.save_board_snapshot(output)